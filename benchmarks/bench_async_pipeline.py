@@ -0,0 +1,66 @@
+"""Benchmark: async pipeline throughput against a simulated generation backend.
+
+Usage: python benchmarks/bench_async_pipeline.py [--stories 200] [--latency 0.2]
+           [--concurrency 1 8 32] [--http]
+"""
+
+import argparse
+import asyncio
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from maze.backend import FakeBackend, HTTPBackend, LimitedBackend, StubServer  # noqa: E402
+from maze.batch_generate import StoryJob, generate_batch_async  # noqa: E402
+from maze.library.loader import ResourceLoader  # noqa: E402
+
+
+async def run_batch(stories: int, backend: LimitedBackend, loader: ResourceLoader) -> float:
+    """Wall time to generate ``stories`` stories through ``backend``."""
+    jobs = (StoryJob(index, f"复仇{index}") for index in range(stories))
+    with tempfile.TemporaryDirectory() as output:
+        start = time.perf_counter()
+        async for _, result in generate_batch_async(jobs, Path(output), backend, loader):
+            if not result.success:
+                raise RuntimeError(result.error)
+        return time.perf_counter() - start
+
+
+async def main_async(args: argparse.Namespace) -> None:
+    loader = ResourceLoader()
+    server = StubServer(latency=args.latency) if args.http else None
+    if server is not None:
+        await server.start()
+
+    print(f"{'concurrency':>11}  {'seconds':>8}  {'stories/s':>10}")
+    try:
+        for concurrency in args.concurrency:
+            if server is not None:
+                inner = HTTPBackend(server.url, pool_size=concurrency)
+            else:
+                inner = FakeBackend(latency=args.latency)
+            backend = LimitedBackend(inner, concurrency=concurrency)
+            elapsed = await run_batch(args.stories, backend, loader)
+            await backend.close()
+            print(f"{concurrency:>11}  {elapsed:>7.2f}s  {args.stories / elapsed:>10.1f}")
+    finally:
+        if server is not None:
+            await server.close()
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--stories", type=int, default=200)
+    parser.add_argument("--latency", type=float, default=0.2)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--http", action="store_true", help="Go through the local stub server")
+    args = parser.parse_args()
+    asyncio.run(main_async(args))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,50 @@
+"""Benchmark: separate gate audits vs. the fused single-pass audit.
+
+Usage: python benchmarks/bench_fused_audit.py [--sizes 100000 1000000] [--repeat 3]
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from corpus import make_corpus  # noqa: E402
+from maze.gates import FusedAudit, IdeaGate, QualityGate, SafetyGate  # noqa: E402
+from maze.library.loader import ResourceLoader  # noqa: E402
+
+
+def best_of(func, repeat: int) -> float:
+    """Best wall time of ``repeat`` runs."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    loader = ResourceLoader()
+    gates = [IdeaGate(loader), QualityGate(loader), SafetyGate(loader)]
+    fused = FusedAudit(gates)
+    path = Path("bench.txt")
+
+    print(f"{'bytes':>10}  {'separate':>10}  {'fused':>10}  {'speedup':>8}")
+    for size in args.sizes:
+        draft = make_corpus(loader, size)
+        separate = best_of(lambda: [gate.audit(draft, path) for gate in gates], args.repeat)
+        combined = best_of(lambda: fused.audit(draft, path), args.repeat)
+        print(f"{size:>10}  {separate:>9.4f}s  {combined:>9.4f}s  {separate / combined:>7.2f}x")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,200 @@
+"""Benchmark suite: gate, loader and end-to-end throughput with regression checks.
+
+Usage: python benchmarks/bench_suite.py [--sizes 1KB 1MB 10MB] [--densities 0.1 0.3 0.9]
+           [--rules 0 1000] [--stories 50] [--repeat 3]
+           [--save-baseline FILE] [--baseline FILE] [--threshold 0.2] [--min-time 0.001]
+
+Drafts come from ``corpus.py``. Each case reports the best wall time of
+``--repeat`` runs. ``--save-baseline`` records the timings as JSON;
+``--baseline`` compares against such a file and exits non-zero when any
+case is slower than its baseline by more than ``--threshold``.
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import platform
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from corpus import (  # noqa: E402
+    format_size, make_corpus, parse_size, sized_safety_gate, write_corpus,
+)
+from maze.core import create_parser, run_audit  # noqa: E402
+from maze.gates import IdeaGate, QualityGate  # noqa: E402
+from maze.library.loader import ResourceLoader  # noqa: E402
+from maze.library.snapshot import build_snapshot, clear_snapshots, library_signature  # noqa: E402
+from maze.pipeline import Pipeline  # noqa: E402
+
+BASELINE_FORMAT = 1
+
+
+def best_of(func: Callable[[], object], repeat: int) -> float:
+    """Best wall time of ``repeat`` runs."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def audit_cli(path: Path, output_dir: Path) -> None:
+    """Run ``maze audit`` on one file in-process, without the cache."""
+    args = create_parser().parse_args(
+        ["audit", "--file", str(path), "--output", str(output_dir), "--no-cache"]
+    )
+    with contextlib.redirect_stdout(io.StringIO()):
+        if run_audit(args) != 0:
+            raise RuntimeError(f"Audit failed: {path}")
+
+
+def generate_stories(loader: ResourceLoader, stories: int, output_dir: Path) -> None:
+    """Run ``stories`` pipelines one after another."""
+    for index in range(stories):
+        result = Pipeline(f"复仇{index}", "", "auto", output_dir, loader=loader).run()
+        if not result.success:
+            raise RuntimeError(result.error)
+
+
+def run_cases(args: argparse.Namespace, workdir: Path) -> dict[str, dict[str, float]]:
+    """Time every case; return ``{case: {"seconds": ..., "rate": ...}}``."""
+    loader = ResourceLoader()
+    library = loader.library_path.resolve()
+    results = {}
+
+    def record(name: str, seconds: float, amount: float, unit: str) -> None:
+        rate = amount / seconds if seconds else float("inf")
+        results[name] = {"seconds": seconds, "rate": rate, "unit": unit}
+        print(f"{name:<34}  {seconds:>10.4f}s  {rate:>12.2f} {unit}", flush=True)
+
+    signature = library_signature(library)
+    record("loader/parse", best_of(lambda: build_snapshot(library, signature), args.repeat),
+           1, "loads/s")
+
+    def cached_load() -> None:
+        clear_snapshots()
+        _ = ResourceLoader().snapshot
+
+    record("loader/cached", best_of(cached_load, args.repeat), 1, "loads/s")
+
+    idea = IdeaGate(loader)
+    path = Path("bench.txt")
+    for size in args.sizes:
+        label = format_size(size)
+        megabytes = size / 1024 ** 2
+
+        for density in args.densities:
+            draft = make_corpus(loader, size, density=density)
+            quality = QualityGate(loader)
+            record(f"quality.audit/{label}/d={density}",
+                   best_of(lambda: quality.audit(draft, path), args.repeat), megabytes, "MB/s")
+
+        draft = make_corpus(loader, size, density=args.densities[0], unsafe=0.01)
+        for rules in args.rules:
+            safety = sized_safety_gate(loader, rules)
+            record(f"safety._scan_content/{label}/r={rules}",
+                   best_of(lambda: safety._scan_content(draft), args.repeat), megabytes, "MB/s")
+        record(f"idea.audit/{label}",
+               best_of(lambda: idea.audit(draft, path), args.repeat), megabytes, "MB/s")
+        del draft
+
+        target = write_corpus(workdir / f"draft_{label}.txt", loader, size)
+        record(f"run_audit/{label}",
+               best_of(lambda: audit_cli(target, workdir / "reports"), args.repeat),
+               megabytes, "MB/s")
+        target.unlink()
+
+    if args.stories:
+        record(f"pipeline.run/{args.stories}",
+               best_of(lambda: generate_stories(loader, args.stories, workdir / "stories"),
+                       args.repeat),
+               args.stories, "stories/s")
+
+    return results
+
+
+def compare(
+    results: dict[str, dict[str, float]],
+    baseline: dict[str, dict[str, float]],
+    threshold: float,
+    min_time: float,
+) -> list[str]:
+    """Cases slower than their baseline by more than ``threshold``.
+
+    Cases whose baseline ran under ``min_time`` are shown but never flagged,
+    since timer noise swamps them.
+    """
+    regressions = []
+    print(f"\n{'case':<34}  {'baseline':>10}  {'current':>10}  {'change':>8}")
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+        before, after = baseline[name]["seconds"], result["seconds"]
+        change = after / before - 1 if before else 0.0
+        flag = "  REGRESSION" if change > threshold and before >= min_time else ""
+        print(f"{name:<34}  {before:>9.4f}s  {after:>9.4f}s  {change:>+7.1%}{flag}")
+        if flag:
+            regressions.append(name)
+    return regressions
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=parse_size, nargs="+",
+                        default=[parse_size(s) for s in ("1KB", "1MB", "10MB")],
+                        help="Draft sizes in bytes, e.g. 1KB 1MB 100MB")
+    parser.add_argument("--densities", type=float, nargs="+", default=[0.1, 0.3, 0.9],
+                        help="Share of sentences carrying a lexicon word")
+    parser.add_argument("--rules", type=int, nargs="+", default=[0, 1000],
+                        help="Synthetic keywords added to the safety rule set")
+    parser.add_argument("--stories", type=int, default=50,
+                        help="Stories for the pipeline case (0 to skip)")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--save-baseline", metavar="FILE", help="Write timings as JSON")
+    parser.add_argument("--baseline", metavar="FILE", help="Compare against saved timings")
+    parser.add_argument("--threshold", type=float, default=0.2,
+                        help="Allowed slowdown before a case counts as a regression")
+    parser.add_argument("--min-time", type=float, default=0.001,
+                        help="Baseline seconds below which a case is too noisy to flag")
+    args = parser.parse_args()
+
+    baseline = None
+    if args.baseline:
+        data = json.loads(Path(args.baseline).read_text(encoding="utf-8"))
+        if data.get("format") != BASELINE_FORMAT:
+            print(f"[ERROR] Unsupported baseline: {args.baseline}", file=sys.stderr)
+            return 2
+        baseline = data["results"]
+
+    print(f"{'case':<34}  {'best':>11}  {'rate':>12}")
+    with tempfile.TemporaryDirectory() as workdir:
+        results = run_cases(args, Path(workdir))
+
+    if args.save_baseline:
+        Path(args.save_baseline).write_text(json.dumps({
+            "format": BASELINE_FORMAT,
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "results": results,
+        }, indent=2), encoding="utf-8")
+        print(f"\n[OK] Baseline: {args.save_baseline}")
+
+    if baseline is not None:
+        regressions = compare(results, baseline, args.threshold, args.min_time)
+        if regressions:
+            print(f"\n[FAIL] {len(regressions)} case(s) regressed past "
+                  f"{args.threshold:.0%}", file=sys.stderr)
+            return 1
+        print(f"\n[OK] No regressions past {args.threshold:.0%}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,126 @@
+"""Synthetic Chinese drafts for benchmarks.
+
+Drafts are built from the library itself: filler sentences carrying lexicon
+words at a chosen density, lock-meme materials and, optionally, safety
+keywords. Output is deterministic for a given seed, so timings from
+different runs audit the same text.
+"""
+
+import random
+import re
+from pathlib import Path
+from typing import Iterator
+
+from maze.gates import SafetyGate
+from maze.library.loader import ResourceLoader
+
+FILLER = "他站在窗前看着远处的灯火城市的夜晚总是安静得让人心慌风从街角吹过来带着雨后的凉意"
+PUNCTUATION = "，。！？\n"
+
+SIZE_UNITS = {"": 1, "B": 1, "KB": 1024, "MB": 1024 ** 2, "GB": 1024 ** 3}
+
+
+def parse_size(text: str) -> int:
+    """Byte count from ``"512"``, ``"1KB"``, ``"100MB"`` and the like."""
+    match = re.fullmatch(r"\s*(\d+(?:\.\d+)?)\s*([KMG]?B?)\s*", text.upper())
+    if not match:
+        raise ValueError(f"Invalid size: {text}")
+    return int(float(match.group(1)) * SIZE_UNITS[match.group(2)])
+
+
+def format_size(size: int) -> str:
+    """Short label for a byte count, e.g. ``1KB`` or ``100MB``."""
+    for unit in ("GB", "MB", "KB"):
+        if size >= SIZE_UNITS[unit] and size % SIZE_UNITS[unit] == 0:
+            return f"{size // SIZE_UNITS[unit]}{unit}"
+    return f"{size}B"
+
+
+def iter_sentences(
+    loader: ResourceLoader,
+    density: float = 0.3,
+    unsafe: float = 0.0,
+    seed: int = 0,
+) -> Iterator[str]:
+    """Endless sentences; ``density`` and ``unsafe`` are per-sentence odds.
+
+    A sentence carries a lexicon word with probability ``density`` and a
+    safety keyword with probability ``unsafe``; one in ten also names a
+    lock-meme material.
+    """
+    rng = random.Random(seed)
+    words = sorted(loader.lexicon_words)
+    materials = [m["content"] for m in loader.materials.get("lock_memes", [])]
+    unsafe_words = [word for words in SafetyGate(loader).keyword_rules().values() for word in words]
+
+    while True:
+        sentence = "".join(rng.choice(FILLER) for _ in range(rng.randint(8, 24)))
+        if words and rng.random() < density:
+            sentence += rng.choice(words)
+        if materials and rng.random() < 0.1:
+            sentence += rng.choice(materials)
+        if unsafe and rng.random() < unsafe:
+            sentence += rng.choice(unsafe_words)
+        yield sentence + rng.choice(PUNCTUATION)
+
+
+def make_corpus(
+    loader: ResourceLoader,
+    size: int,
+    density: float = 0.3,
+    unsafe: float = 0.0,
+    seed: int = 0,
+) -> str:
+    """A draft of at least ``size`` UTF-8 bytes."""
+    parts = []
+    total = 0
+    for sentence in iter_sentences(loader, density, unsafe, seed):
+        if total >= size:
+            break
+        parts.append(sentence)
+        total += len(sentence.encode("utf-8"))
+    return "".join(parts)
+
+
+def write_corpus(
+    path: Path,
+    loader: ResourceLoader,
+    size: int,
+    density: float = 0.3,
+    unsafe: float = 0.0,
+    seed: int = 0,
+) -> Path:
+    """Write a draft of at least ``size`` bytes without holding it in memory."""
+    total = 0
+    with open(path, "w", encoding="utf-8") as f:
+        for sentence in iter_sentences(loader, density, unsafe, seed):
+            if total >= size:
+                break
+            f.write(sentence)
+            total += len(sentence.encode("utf-8"))
+    return path
+
+
+def synthetic_keywords(count: int) -> list[str]:
+    """``count`` distinct three-character words that never occur in filler."""
+    base = 0x9000
+    return [
+        chr(base + i % 256) + chr(base + 256 + i // 256 % 256) + chr(base + 512 + i // 65536)
+        for i in range(count)
+    ]
+
+
+def sized_safety_gate(loader: ResourceLoader, extra_rules: int) -> SafetyGate:
+    """Safety gate with ``extra_rules`` synthetic keywords added to its rule set."""
+    if not extra_rules:
+        return SafetyGate(loader)
+
+    extra = synthetic_keywords(extra_rules)
+
+    class SizedSafetyGate(SafetyGate):
+        def keyword_rules(self) -> dict[str, list[str]]:
+            rules = super().keyword_rules()
+            rules["synthetic"] = extra
+            return rules
+
+    return SizedSafetyGate(loader)
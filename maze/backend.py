@@ -0,0 +1,384 @@
+"""Pluggable text generation backends for the async pipeline."""
+
+import asyncio
+import hashlib
+import json
+import random
+from typing import AsyncIterator, Callable, Protocol
+from urllib.parse import urlsplit
+
+
+class BackendError(Exception):
+    """A generation request failed.
+
+    ``retriable`` is False for errors that will not go away on retry, such
+    as a rejected request.
+    """
+
+    def __init__(self, message: str, retriable: bool = True) -> None:
+        super().__init__(message)
+        self.retriable = retriable
+
+
+class GenerationBackend(Protocol):
+    """Anything that turns a prompt into generated text.
+
+    Backends may also offer ``stream(prompt)``, an async iterator of text
+    chunks; see :func:`stream_text`.
+    """
+
+    async def complete(self, prompt: str) -> str:
+        ...
+
+
+async def stream_text(backend: GenerationBackend, prompt: str) -> AsyncIterator[str]:
+    """Generated text in chunks, as one chunk if the backend cannot stream."""
+    stream = getattr(backend, "stream", None)
+    if stream is None:
+        yield await backend.complete(prompt)
+        return
+    chunks = stream(prompt)
+    try:
+        async for chunk in chunks:
+            yield chunk
+    finally:
+        # Release the backend's stream (and its slot) when the caller stops early.
+        aclose = getattr(chunks, "aclose", None)
+        if aclose is not None:
+            await aclose()
+
+
+def stub_completion(prompt: str) -> str:
+    """Deterministic placeholder text standing in for a model response."""
+    digest = hashlib.sha256(prompt.encode("utf-8")).hexdigest()[:8]
+    return f"这是一个由占位后端生成的草稿（{digest}）。\n\n雨停了，那把伞还靠在门边。\n"
+
+
+class FakeBackend:
+    """In-process backend with configurable latency and failures.
+
+    Useful for measuring pipeline throughput and exercising retries without
+    a network. The first ``fail_first`` calls fail, and after that each call
+    fails with probability ``failure_rate``. ``stream`` delivers the text in
+    ``chunks`` pieces spread over the latency.
+    """
+
+    def __init__(
+        self,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        failure_rate: float = 0.0,
+        fail_first: int = 0,
+        responder: Callable[[str], str] = stub_completion,
+        seed: int | None = None,
+        chunks: int = 1,
+    ) -> None:
+        self.latency = latency
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self.fail_first = fail_first
+        self.responder = responder
+        self.chunks = chunks
+        self.calls = 0
+        self.chunks_sent = 0
+        self._random = random.Random(seed)
+
+    async def complete(self, prompt: str) -> str:
+        return "".join([chunk async for chunk in self.stream(prompt)])
+
+    async def stream(self, prompt: str) -> AsyncIterator[str]:
+        self.calls += 1
+        failed = self.calls <= self.fail_first or self._random.random() < self.failure_rate
+        text = self.responder(prompt)
+        delay = (self.latency + self._random.uniform(0, self.jitter)) / self.chunks
+        size = -(-len(text) // self.chunks) or 1
+        for start in range(0, max(len(text), 1), size):
+            await asyncio.sleep(delay)
+            if failed:
+                raise BackendError("Simulated backend failure")
+            self.chunks_sent += 1
+            yield text[start:start + size]
+
+
+class HTTPBackend:
+    """JSON-over-HTTP backend with a pool of keep-alive connections.
+
+    Each request POSTs ``{"prompt": ...}`` to ``url`` and expects
+    ``{"text": ...}`` back. At most ``pool_size`` connections are open at
+    once; idle ones are reused by later requests.
+    """
+
+    def __init__(
+        self,
+        url: str,
+        pool_size: int = 8,
+        headers: dict[str, str] | None = None,
+    ) -> None:
+        parts = urlsplit(url)
+        if parts.scheme not in ("http", "https") or not parts.hostname:
+            raise ValueError(f"Unsupported backend URL: {url}")
+        self.host = parts.hostname
+        self.port = parts.port or (443 if parts.scheme == "https" else 80)
+        self.ssl = parts.scheme == "https"
+        self.path = parts.path or "/"
+        if parts.query:
+            self.path += f"?{parts.query}"
+        self.headers = headers or {}
+        self.pool_size = pool_size
+        self.connections_opened = 0
+        self._idle: list[tuple[asyncio.StreamReader, asyncio.StreamWriter]] = []
+        self._slots: asyncio.Semaphore | None = None
+
+    async def complete(self, prompt: str) -> str:
+        body = json.dumps({"prompt": prompt}, ensure_ascii=False).encode("utf-8")
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.pool_size)
+
+        async with self._slots:
+            reader, writer = await self._connect()
+            try:
+                status, keep_alive, payload = await self._exchange(reader, writer, body)
+            except BaseException:
+                writer.close()
+                raise
+            if keep_alive:
+                self._idle.append((reader, writer))
+            else:
+                writer.close()
+
+        if status != 200:
+            retriable = status == 429 or status >= 500
+            raise BackendError(f"Backend returned HTTP {status}", retriable=retriable)
+        try:
+            return json.loads(payload)["text"]
+        except (ValueError, KeyError, TypeError) as e:
+            raise BackendError(f"Malformed backend response: {e}", retriable=False) from e
+
+    async def _connect(self) -> tuple[asyncio.StreamReader, asyncio.StreamWriter]:
+        while self._idle:
+            reader, writer = self._idle.pop()
+            if not reader.at_eof() and not writer.is_closing():
+                return reader, writer
+            writer.close()
+        self.connections_opened += 1
+        return await asyncio.open_connection(self.host, self.port, ssl=self.ssl or None)
+
+    async def _exchange(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter, body: bytes
+    ) -> tuple[int, bool, bytes]:
+        lines = [
+            f"POST {self.path} HTTP/1.1",
+            f"Host: {self.host}:{self.port}",
+            "Content-Type: application/json; charset=utf-8",
+            f"Content-Length: {len(body)}",
+            "Connection: keep-alive",
+        ]
+        lines.extend(f"{name}: {value}" for name, value in self.headers.items())
+        writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1") + body)
+        await writer.drain()
+
+        try:
+            status_line = await reader.readuntil(b"\r\n")
+            status = int(status_line.split()[1])
+            headers = await _read_headers(reader)
+            if "content-length" not in headers:
+                raise BackendError("Backend response has no Content-Length", retriable=False)
+            payload = await reader.readexactly(int(headers["content-length"]))
+        except (asyncio.IncompleteReadError, IndexError, ValueError) as e:
+            raise BackendError(f"Bad response from backend: {e}") from e
+        keep_alive = headers.get("connection", "keep-alive").lower() != "close"
+        return status, keep_alive, payload
+
+    async def close(self) -> None:
+        """Close every idle pooled connection."""
+        while self._idle:
+            _, writer = self._idle.pop()
+            writer.close()
+
+
+async def _read_headers(reader: asyncio.StreamReader) -> dict[str, str]:
+    """Read HTTP headers up to the blank line, keyed by lower-case name."""
+    headers = {}
+    while True:
+        line = await reader.readuntil(b"\r\n")
+        if line == b"\r\n":
+            return headers
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+
+
+class LimitedBackend:
+    """Wraps a backend with a concurrency cap, timeouts and retries.
+
+    At most ``concurrency`` requests run at once. Each attempt is cancelled
+    after ``timeout`` seconds; failed attempts are retried up to ``retries``
+    times with exponential backoff and jitter, capped at ``max_backoff``.
+    """
+
+    def __init__(
+        self,
+        backend: GenerationBackend,
+        concurrency: int = 8,
+        retries: int = 3,
+        timeout: float = 60.0,
+        backoff: float = 0.5,
+        max_backoff: float = 8.0,
+    ) -> None:
+        self.backend = backend
+        self.concurrency = concurrency
+        self.retries = retries
+        self.timeout = timeout
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self._semaphore: asyncio.Semaphore | None = None
+
+    async def complete(self, prompt: str) -> str:
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+
+        attempt = 0
+        while True:
+            try:
+                async with self._semaphore:
+                    return await asyncio.wait_for(self.backend.complete(prompt), self.timeout)
+            except asyncio.TimeoutError:
+                error = BackendError(f"Backend timed out after {self.timeout}s")
+            except OSError as e:
+                error = BackendError(f"Backend connection failed: {e}")
+            except BackendError as e:
+                error = e
+
+            if not error.retriable or attempt >= self.retries:
+                raise error
+            delay = min(self.max_backoff, self.backoff * 2 ** attempt)
+            await asyncio.sleep(delay * random.uniform(0.5, 1.0))
+            attempt += 1
+
+    async def stream(self, prompt: str) -> AsyncIterator[str]:
+        """Stream from the wrapped backend under the same cap and timeout.
+
+        Each chunk must arrive within ``timeout``. Streams are not retried,
+        since part of the text has already been handed out.
+        """
+        if getattr(self.backend, "stream", None) is None:
+            yield await self.complete(prompt)
+            return
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+
+        async with self._semaphore:
+            chunks = self.backend.stream(prompt).__aiter__()
+            while True:
+                try:
+                    chunk = await asyncio.wait_for(chunks.__anext__(), self.timeout)
+                except StopAsyncIteration:
+                    return
+                except asyncio.TimeoutError:
+                    raise BackendError(f"Backend timed out after {self.timeout}s") from None
+                except OSError as e:
+                    raise BackendError(f"Backend connection failed: {e}") from e
+                yield chunk
+
+    async def close(self) -> None:
+        """Close the wrapped backend's connections, if it has any."""
+        close = getattr(self.backend, "close", None)
+        if close is not None:
+            await close()
+
+
+class StubServer:
+    """Local HTTP server that answers generation requests after a delay.
+
+    Speaks the protocol :class:`HTTPBackend` expects, with keep-alive, so
+    throughput can be measured end to end offline::
+
+        async with StubServer(latency=0.2) as server:
+            backend = HTTPBackend(server.url)
+    """
+
+    def __init__(
+        self,
+        latency: float = 0.0,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        responder: Callable[[str], str] = stub_completion,
+    ) -> None:
+        self.latency = latency
+        self.host = host
+        self.port = port
+        self.responder = responder
+        self.requests = 0
+        self._server: asyncio.AbstractServer | None = None
+        self._handlers: dict[asyncio.Task, asyncio.StreamWriter] = {}
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.host}:{self.port}/generate"
+
+    async def start(self) -> None:
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    async def close(self) -> None:
+        """Stop listening and drop open client connections."""
+        if self._server is None:
+            return
+        self._server.close()
+        for writer in self._handlers.values():
+            writer.close()
+        await asyncio.gather(*self._handlers, return_exceptions=True)
+        await self._server.wait_closed()
+        self._server = None
+
+    async def __aenter__(self) -> "StubServer":
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.close()
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        task = asyncio.current_task()
+        self._handlers[task] = writer
+        try:
+            while True:
+                await reader.readuntil(b"\r\n")
+                headers = await _read_headers(reader)
+                body = await reader.readexactly(int(headers.get("content-length", 0)))
+
+                self.requests += 1
+                await asyncio.sleep(self.latency)
+                try:
+                    prompt = json.loads(body)["prompt"]
+                    status, payload = 200, {"text": self.responder(prompt)}
+                except (ValueError, KeyError, TypeError):
+                    status, payload = 400, {"error": "expected {\"prompt\": ...}"}
+
+                data = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+                writer.write(
+                    f"HTTP/1.1 {status} {'OK' if status == 200 else 'Bad Request'}\r\n"
+                    "Content-Type: application/json; charset=utf-8\r\n"
+                    f"Content-Length: {len(data)}\r\n"
+                    "Connection: keep-alive\r\n\r\n".encode("latin-1") + data
+                )
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            del self._handlers[task]
+            writer.close()
+
+
+def make_backend(spec: str, pool_size: int = 8) -> GenerationBackend:
+    """Build a backend from a CLI spec: ``fake``, ``fake:<latency>`` or a URL.
+
+    Raises ValueError for a malformed spec.
+    """
+    name, _, arg = spec.partition(":")
+    if name == "fake":
+        try:
+            latency = float(arg) if arg else 0.0
+        except ValueError:
+            raise ValueError(f"Invalid fake backend latency: {arg!r}") from None
+        return FakeBackend(latency=latency)
+    return HTTPBackend(spec, pool_size=pool_size)
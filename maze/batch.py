@@ -0,0 +1,258 @@
+"""Parallel batch audit over directories and glob patterns."""
+
+import glob
+import os
+import time
+from collections import Counter, deque
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Iterable, Iterator
+
+from . import metrics
+from .metrics import Metrics
+from .cache import AuditCache, hash_file
+from .gates.fused import FusedAudit, select_gates
+from .library.loader import ResourceLoader
+from .stream import audit_stream, should_stream
+
+if TYPE_CHECKING:
+    from concurrent.futures import Future
+
+    from .gates import GateResult
+
+
+@dataclass
+class FileAudit:
+    """Gate results for a single audited file."""
+    path: Path
+    gate_names: list[str] = field(default_factory=list)
+    results: list["GateResult"] = field(default_factory=list)
+    error: str | None = None
+    metrics: Metrics | None = None
+    seconds: float = 0.0
+
+    @property
+    def passed(self) -> bool:
+        return self.error is None and all(result.passed for result in self.results)
+
+
+@dataclass
+class BatchSummary:
+    """Aggregate counts over a batch audit."""
+    files: int = 0
+    passed: int = 0
+    failed: int = 0
+    errors: int = 0
+    gate_failures: Counter = field(default_factory=Counter)
+    issue_counts: Counter = field(default_factory=Counter)
+
+    def add(self, audit: FileAudit) -> None:
+        """Fold one file's results into the summary."""
+        self.files += 1
+        if audit.error is not None:
+            self.errors += 1
+            return
+        if audit.passed:
+            self.passed += 1
+        else:
+            self.failed += 1
+        for name, result in zip(audit.gate_names, audit.results):
+            if not result.passed:
+                self.gate_failures[name] += 1
+            self.issue_counts.update(result.issues)
+
+
+def is_batch_target(target: str) -> bool:
+    """Whether an audit target names a directory or a glob pattern."""
+    return Path(target).is_dir() or glob.has_magic(target)
+
+
+def iter_targets(target: str, pattern: str = "*.txt") -> Iterator[Path]:
+    """Lazily yield the files named by a directory or glob target."""
+    if glob.has_magic(target):
+        for name in glob.iglob(target, recursive=True):
+            path = Path(name)
+            if path.is_file():
+                yield path
+        return
+
+    for root, dirs, files in os.walk(target):
+        dirs.sort()
+        for name in sorted(files):
+            path = Path(root) / name
+            if path.match(pattern):
+                yield path
+
+
+def audit_file(
+    audit: FusedAudit,
+    path: Path,
+    cache: AuditCache | None = None,
+    stream: bool = False,
+    chunk_size: int | None = None,
+) -> list["GateResult"]:
+    """Audit one file, reusing cached results when its content is unchanged.
+
+    Large files (or any file with ``stream``) are scanned in chunks.
+    """
+    content_hash = None
+    if cache is not None:
+        content_hash = hash_file(path)
+        cached = [cache.get(content_hash, gate, path) for gate in audit.gates]
+        if all(result is not None for result in cached):
+            metrics.count("cache_hits")
+            return cached
+
+    metrics.count("files_scanned")
+    metrics.count("bytes_scanned", path.stat().st_size)
+    if stream or should_stream(path):
+        kwargs = {"chunk_size": chunk_size} if chunk_size else {}
+        results = audit_stream(audit, path, **kwargs)
+    else:
+        results = audit.audit(path.read_text(encoding="utf-8"), path)
+
+    if cache is not None:
+        for gate, result in zip(audit.gates, results):
+            cache.put(content_hash, gate, result, path)
+    return results
+
+
+# Per-process audit state, set up once by _init_worker.
+_worker_audit: FusedAudit | None = None
+_worker_cache: AuditCache | None = None
+_worker_rule_timing: bool | None = None
+
+
+def _init_worker(
+    loader: ResourceLoader,
+    gate: str,
+    cache_dir: Path | None = None,
+    positional: bool = False,
+    formula: str | None = None,
+    rule_timing: bool | None = None,
+    dedupe_index: str | None = None,
+) -> None:
+    """Build the gates once per worker from the parent's loaded library.
+
+    ``rule_timing`` is None unless the parent records metrics, in which case
+    each file's metrics are collected and sent back with its result.
+    """
+    global _worker_audit, _worker_cache, _worker_rule_timing
+    _worker_audit = FusedAudit(
+        select_gates(loader, gate, positional, formula, dedupe_index=dedupe_index)
+    )
+    _worker_cache = AuditCache(cache_dir) if cache_dir is not None else None
+    _worker_rule_timing = rule_timing
+
+
+def timed_audit(
+    audit: FusedAudit,
+    path: Path,
+    cache: AuditCache | None = None,
+    stream: bool = False,
+    chunk_size: int | None = None,
+) -> FileAudit:
+    """Audit one file, recording read and decode errors and the wall time."""
+    names = [gate.name for gate in audit.gates]
+    start = time.perf_counter()
+    try:
+        results = audit_file(audit, path, cache, stream, chunk_size)
+    except (OSError, UnicodeDecodeError) as e:
+        return FileAudit(
+            path=path, gate_names=names, error=str(e), seconds=time.perf_counter() - start
+        )
+    return FileAudit(
+        path=path, gate_names=names, results=results, seconds=time.perf_counter() - start
+    )
+
+
+def _audit_file(path: Path) -> FileAudit:
+    """Audit one file inside a worker."""
+    registry = None
+    if _worker_rule_timing is not None:
+        registry = metrics.enable(Metrics(_worker_rule_timing))
+    try:
+        result = timed_audit(_worker_audit, path, _worker_cache)
+    finally:
+        if registry is not None:
+            metrics.disable()
+    result.metrics = registry
+    return result
+
+
+def audit_paths(
+    paths: Iterable[Path],
+    loader: ResourceLoader,
+    gate: str = "all",
+    jobs: int | None = None,
+    window: int | None = None,
+    cache_dir: Path | None = None,
+    positional: bool = False,
+    formula: str | None = None,
+    dedupe_index: str | None = None,
+) -> Iterator[FileAudit]:
+    """Audit files across a process pool, yielding results in input order.
+
+    The library is loaded once in the parent and handed to each worker. At
+    most ``window`` files are in flight at a time, so memory stays bounded
+    no matter how many paths are supplied. With ``cache_dir`` the workers
+    share one on-disk result cache. ``positional`` and ``formula`` are passed
+    on to the quality gate, ``dedupe_index`` to the idea gate. A worker that
+    crashes turns the files it had in flight into error results; the rest
+    of the batch runs on a fresh pool.
+    """
+    jobs = jobs or os.cpu_count() or 1
+
+    # Load the library snapshot before forking so workers inherit it.
+    _ = loader.snapshot
+
+    if jobs == 1:
+        _init_worker(loader, gate, cache_dir, positional, formula, dedupe_index=dedupe_index)
+        for path in paths:
+            yield _audit_file(path)
+        return
+
+    parent_metrics = metrics.active()
+    rule_timing = parent_metrics.rule_timing if parent_metrics is not None else None
+
+    def collect(path: Path, future: "Future[Any]") -> FileAudit:
+        try:
+            audit = future.result()
+        except Exception as e:
+            # A crashed worker (BrokenProcessPool) or an unexpected error
+            # fails this file only; the batch carries on.
+            return FileAudit(path=path, error=f"Worker failed: {e!r}")
+        if audit.metrics is not None and parent_metrics is not None:
+            parent_metrics.merge(audit.metrics)
+        audit.metrics = None
+        return audit
+
+    from concurrent.futures import ProcessPoolExecutor
+    from concurrent.futures.process import BrokenProcessPool
+
+    def start_pool() -> ProcessPoolExecutor:
+        return ProcessPoolExecutor(
+            max_workers=jobs,
+            initializer=_init_worker,
+            initargs=(loader, gate, cache_dir, positional, formula, rule_timing, dedupe_index),
+        )
+
+    window = window or jobs * 4
+    pending: deque[tuple[Path, "Future[Any]"]] = deque()
+    executor = start_pool()
+    try:
+        for path in paths:
+            try:
+                future = executor.submit(_audit_file, path)
+            except BrokenProcessPool:
+                # Files already in flight report the crash; later ones get a new pool.
+                executor.shutdown(wait=False, cancel_futures=True)
+                executor = start_pool()
+                future = executor.submit(_audit_file, path)
+            pending.append((path, future))
+            if len(pending) >= window:
+                yield collect(*pending.popleft())
+        while pending:
+            yield collect(*pending.popleft())
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
@@ -0,0 +1,253 @@
+"""Concurrent batch story generation from a list of themes."""
+
+import asyncio
+import json
+import os
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from itertools import islice
+from pathlib import Path
+from typing import Any, AsyncIterator, Iterable, Iterator
+
+from .checkpoint import iter_states
+from .library.loader import ResourceLoader
+from .pipeline import Pipeline, PipelineResult, new_story_id
+
+# Manifests written beside the generated and the resumed stories
+MANIFEST_NAME = "manifest.jsonl"
+RESUME_MANIFEST_NAME = "manifest_resume.jsonl"
+
+# Jobs whose auto formula is resolved per selector pass
+CLASSIFY_CHUNK = 1024
+
+
+@dataclass
+class StoryJob:
+    """One story to generate in a batch; with ``story_id`` it is resumed."""
+    index: int
+    theme: str
+    constraints: str = ""
+    formula: str = "auto"
+    story_id: str | None = None
+
+
+def read_themes(path: Path, constraints: str = "", formula: str = "auto") -> Iterator[StoryJob]:
+    """Lazily yield one job per non-blank, non-comment line of a theme file."""
+    index = 0
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            theme = line.strip()
+            if not theme or theme.startswith("#"):
+                continue
+            yield StoryJob(index, theme, constraints, formula)
+            index += 1
+
+
+def resume_jobs(output_dir: Path) -> Iterator[StoryJob]:
+    """One job per checkpointed story in ``output_dir`` that did not finish."""
+    index = 0
+    for state in iter_states(output_dir):
+        if state.finished:
+            continue
+        yield StoryJob(index, state.theme, state.constraints, state.formula, state.story_id)
+        index += 1
+
+
+def classify_jobs(
+    jobs: Iterable[StoryJob], loader: ResourceLoader, chunk: int = CLASSIFY_CHUNK
+) -> Iterator[StoryJob]:
+    """Resolve the ``auto`` formula of fresh jobs, a chunk of themes per pass.
+
+    The chosen formula is then recorded in the manifest. Jobs are still
+    consumed lazily, at most ``chunk`` ahead.
+    """
+    jobs = iter(jobs)
+    while batch := list(islice(jobs, chunk)):
+        auto = [job for job in batch if job.formula == "auto" and job.story_id is None]
+        if auto:
+            formulas = loader.formula_selector.select_many(job.theme for job in auto)
+            for job, formula in zip(auto, formulas):
+                job.formula = formula
+        yield from batch
+
+
+def job_story_id(batch_id: str, job: StoryJob) -> str:
+    """Story ID of a fresh job: the batch's ID plus the job's index."""
+    return f"{batch_id}_{job.index:06d}"
+
+
+def _pipeline(
+    job: StoryJob, loader: ResourceLoader, output_dir: Path, batch_id: str, **options: Any
+) -> Pipeline:
+    """Pipeline for a job: resumed from its checkpoint, or fresh."""
+    if job.story_id is not None:
+        return Pipeline.resume(job.story_id, output_dir, loader, **options)
+    return Pipeline(
+        theme=job.theme,
+        constraints=job.constraints,
+        formula=job.formula,
+        output_dir=output_dir,
+        loader=loader,
+        story_id=job_story_id(batch_id, job),
+        **options,
+    )
+
+
+def manifest_record(job: StoryJob, result: PipelineResult) -> dict[str, Any]:
+    """Machine-readable manifest entry for one generated story."""
+    return {
+        "index": job.index,
+        "theme": job.theme,
+        "formula": job.formula,
+        "story_id": result.story_id,
+        "success": result.success,
+        "error": result.error,
+        "spec_path": str(result.spec_path) if result.spec_path else None,
+        "draft_path": str(result.draft_path) if result.draft_path else None,
+        "final_path": str(result.final_path) if result.final_path else None,
+        "redactions": result.redactions,
+    }
+
+
+def _run_job(
+    job: StoryJob, loader: ResourceLoader, output_dir: Path, batch_id: str, **options: Any
+) -> PipelineResult:
+    """Run one pipeline, turning unexpected errors into a failed result."""
+    try:
+        return _pipeline(job, loader, output_dir, batch_id, **options).run()
+    except Exception as e:
+        return PipelineResult(
+            success=False, error=f"Unexpected error: {e}",
+            story_id=job.story_id or job_story_id(batch_id, job),
+        )
+
+
+def generate_batch(
+    jobs: Iterable[StoryJob],
+    output_dir: Path,
+    loader: ResourceLoader | None = None,
+    workers: int | None = None,
+    window: int | None = None,
+    **options: Any,
+) -> Iterator[tuple[StoryJob, PipelineResult]]:
+    """Run many pipelines concurrently, yielding results in input order.
+
+    All pipelines share one loader, so the library is parsed once. Pipelines
+    run on threads; at most ``window`` jobs are in flight at a time, so a
+    theme list of any length is consumed lazily. ``options`` are passed on
+    to each :class:`Pipeline`.
+    """
+    loader = loader or ResourceLoader()
+    workers = workers or min(32, (os.cpu_count() or 1) + 4)
+    window = window or workers * 4
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    # Load the library once before the workers start sharing it.
+    _ = loader.snapshot
+    jobs = classify_jobs(jobs, loader)
+    batch_id = new_story_id()
+
+    pending: deque[tuple[StoryJob, Future[PipelineResult]]] = deque()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for job in jobs:
+            future = executor.submit(_run_job, job, loader, output_dir, batch_id, **options)
+            pending.append((job, future))
+            if len(pending) >= window:
+                job, future = pending.popleft()
+                yield job, future.result()
+        while pending:
+            job, future = pending.popleft()
+            yield job, future.result()
+
+
+async def generate_batch_async(
+    jobs: Iterable[StoryJob],
+    output_dir: Path,
+    backend: Any,
+    loader: ResourceLoader | None = None,
+    window: int = 256,
+    **options: Any,
+) -> AsyncIterator[tuple[StoryJob, PipelineResult]]:
+    """Run pipelines as asyncio tasks against one backend, in input order.
+
+    Network concurrency is capped by the backend (see
+    :class:`~maze.backend.LimitedBackend`); ``window`` only bounds how many
+    tasks exist at once. ``options`` are passed on to each :class:`Pipeline`.
+    """
+    loader = loader or ResourceLoader()
+    output_dir.mkdir(parents=True, exist_ok=True)
+    _ = loader.snapshot
+    jobs = classify_jobs(jobs, loader)
+    batch_id = new_story_id()
+
+    async def run(job: StoryJob) -> PipelineResult:
+        try:
+            pipeline = _pipeline(job, loader, output_dir, batch_id, **options)
+            return await pipeline.run_async(backend)
+        except Exception as e:
+            return PipelineResult(
+                success=False, error=f"Unexpected error: {e}",
+                story_id=job.story_id or job_story_id(batch_id, job),
+            )
+
+    pending: deque[tuple[StoryJob, asyncio.Task[PipelineResult]]] = deque()
+    try:
+        for job in jobs:
+            pending.append((job, asyncio.ensure_future(run(job))))
+            if len(pending) >= window:
+                job, task = pending.popleft()
+                yield job, await task
+        while pending:
+            job, task = pending.popleft()
+            yield job, await task
+    finally:
+        for _, task in pending:
+            task.cancel()
+
+
+class ManifestWriter:
+    """Appends one JSON line per result and counts outcomes."""
+
+    def __init__(self, path: Path) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._file = open(path, "w", encoding="utf-8")
+        self.succeeded = 0
+        self.failed = 0
+
+    def add(self, job: StoryJob, result: PipelineResult) -> None:
+        self._file.write(json.dumps(manifest_record(job, result), ensure_ascii=False) + "\n")
+        self._file.flush()
+        if result.success:
+            self.succeeded += 1
+        else:
+            self.failed += 1
+
+    def close(self) -> None:
+        self._file.close()
+
+    def __enter__(self) -> "ManifestWriter":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+def write_manifest(
+    results: Iterable[tuple[StoryJob, PipelineResult]], path: Path
+) -> tuple[int, int]:
+    """Write one JSON line per result as it arrives; return (succeeded, failed)."""
+    with ManifestWriter(path) as manifest:
+        for job, result in results:
+            manifest.add(job, result)
+    return manifest.succeeded, manifest.failed
+
+
+async def write_manifest_async(
+    results: AsyncIterator[tuple[StoryJob, PipelineResult]], path: Path
+) -> tuple[int, int]:
+    """Async counterpart of :func:`write_manifest`."""
+    with ManifestWriter(path) as manifest:
+        async for job, result in results:
+            manifest.add(job, result)
+    return manifest.succeeded, manifest.failed
@@ -0,0 +1,163 @@
+"""Best-of-N draft generation with early rejection of failing candidates."""
+
+import asyncio
+from contextlib import aclosing
+from dataclasses import dataclass, field
+from typing import Any
+
+from .backend import BackendError, stream_text
+from .gates import FusedAudit, QualityGate, SafetyGate
+from .gates.document import Document
+from .library.loader import ResourceLoader
+
+# Default score a candidate must reach to stop the search early
+DEFAULT_MIN_SCORE = 0.5
+
+
+@dataclass
+class Candidate:
+    """One draft generated for a best-of-N search.
+
+    ``status`` is ``scored`` for a complete draft that passed the early
+    checks, ``rejected`` when an early check failed, ``failed`` when the
+    backend gave up, and ``cancelled`` when the search stopped first.
+    """
+    index: int
+    content: str = ""
+    status: str = "pending"
+    issues: list[str] = field(default_factory=list)
+    score: float = 0.0
+
+
+@dataclass
+class BestOfResult:
+    """Outcome of a best-of-N search."""
+    best: Candidate | None
+    candidates: list[Candidate]
+
+    @property
+    def completed(self) -> int:
+        """Candidates generated in full."""
+        return sum(candidate.status == "scored" for candidate in self.candidates)
+
+
+class EarlyCheck:
+    """Safety and format checks over a draft as it streams in.
+
+    Only safety matches the final review would fail count; those it redacts
+    are left for the review to rewrite.
+
+    Text is checked a line at a time, once each line is complete, so line
+    anchored format patterns see the same text as a full audit would.
+    """
+
+    def __init__(self, audit: FusedAudit) -> None:
+        self.audit = audit
+        self.buffer = ""
+
+    def feed(self, chunk: str) -> list[str]:
+        """Add streamed text; return issues found in newly completed lines."""
+        self.buffer += chunk
+        cut = self.buffer.rfind("\n") + 1
+        if not cut:
+            return []
+        lines, self.buffer = self.buffer[:cut], self.buffer[cut:]
+        return self._check(lines)
+
+    def finish(self) -> list[str]:
+        """Check whatever is left after the last line break."""
+        lines, self.buffer = self.buffer, ""
+        return self._check(lines) if lines else []
+
+    def _check(self, text: str) -> list[str]:
+        safety, quality = self.audit.gates
+        safety_report, quality_report = self.audit.scan(text)
+        return safety.blocking_issues(safety_report) + quality.format_issues(quality_report)
+
+
+async def _generate(
+    candidate: Candidate,
+    prompt: str,
+    backend: Any,
+    audit: FusedAudit,
+) -> Candidate:
+    """Stream one candidate, stopping as soon as an early check fails."""
+    check = EarlyCheck(audit)
+    parts = []
+    try:
+        async with aclosing(stream_text(backend, prompt)) as chunks:
+            async for chunk in chunks:
+                parts.append(chunk)
+                issues = check.feed(chunk)
+                if issues:
+                    break
+            else:
+                issues = check.finish()
+    except BackendError as e:
+        candidate.status = "failed"
+        candidate.issues = [f"Generation backend failed: {e}"]
+        return candidate
+
+    candidate.content = "".join(parts)
+    if issues:
+        candidate.status = "rejected"
+        candidate.issues = issues
+        return candidate
+
+    _, quality = audit.gates
+    _, report = audit.scan(candidate.content)
+    candidate.score = quality.score(report, Document(candidate.content))
+    candidate.status = "scored"
+    return candidate
+
+
+async def best_of_n(
+    spec_content: str,
+    backend: Any,
+    loader: ResourceLoader,
+    n: int = 4,
+    min_score: float = DEFAULT_MIN_SCORE,
+) -> BestOfResult:
+    """Generate up to ``n`` drafts for one SPEC concurrently and keep the best.
+
+    Each draft is checked for safety and format problems while it streams,
+    and abandoned at the first one. The search stops, cancelling the drafts
+    still generating, as soon as a complete draft scores at least
+    ``min_score``; otherwise the best-scoring complete draft wins.
+    """
+    audit = FusedAudit([SafetyGate(loader), QualityGate(loader)])
+    prompt = QualityGate(loader).draft_prompt(spec_content)
+    candidates = [Candidate(index) for index in range(n)]
+    tasks = {
+        asyncio.ensure_future(_generate(candidate, prompt, backend, audit)): candidate
+        for candidate in candidates
+    }
+
+    best = None
+    try:
+        pending = set(tasks)
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                candidate = task.result()
+                if candidate.status == "scored" and (best is None or candidate.score > best.score):
+                    best = candidate
+            if best is not None and best.score >= min_score:
+                break
+    finally:
+        for task, candidate in tasks.items():
+            if not task.done():
+                task.cancel()
+                candidate.status = "cancelled"
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    return BestOfResult(best=best, candidates=candidates)
+
+
+def best_of_issues(result: BestOfResult) -> list[str]:
+    """Why a search found no usable draft, one line per candidate."""
+    return [
+        f"Candidate {candidate.index + 1} {candidate.status}: {'; '.join(candidate.issues)}"
+        for candidate in result.candidates
+        if candidate.issues
+    ]
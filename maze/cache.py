@@ -0,0 +1,200 @@
+"""Persistent audit result cache keyed by content and rule-set hashes."""
+
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
+
+from . import __version__
+
+if TYPE_CHECKING:
+    from .gates import GateResult
+
+# Bump when the stored result layout changes, invalidating older entries
+CACHE_FORMAT = 2
+
+# Default cache size limit
+DEFAULT_MAX_BYTES = 64 << 20
+
+# Fraction of the limit to shrink to once eviction kicks in
+EVICT_TO = 0.8
+
+
+def default_cache_dir() -> Path:
+    """Per-user cache directory for audit results."""
+    base = os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache"
+    return Path(base) / "maze" / "audit"
+
+
+def hash_file(path: Path, block_size: int = 1 << 20) -> str:
+    """SHA-256 of a file's bytes, read in blocks."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        while block := f.read(block_size):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def library_fingerprint(library_path: Path) -> str:
+    """Hash of every JSON resource in a library directory."""
+    digest = hashlib.sha256()
+    for path in sorted(Path(library_path).glob("*.json")):
+        digest.update(path.name.encode("utf-8"))
+        digest.update(path.read_bytes())
+    return digest.hexdigest()
+
+
+def gate_fingerprint(gate: Any, library: str) -> str:
+    """Hash of everything a gate's result depends on besides the content.
+
+    Covers the package version, the gate's source and that of the keyword
+    matching and normalization it scans through, its upper-case rule tables
+    and thresholds (as overridden by the rule pack), its instance options,
+    its compiled rules and the library contents.
+    """
+    import inspect
+
+    from . import matcher, normalize
+
+    gate_type = type(gate)
+    # Read through the instance, so tables overridden by a rule pack count.
+    tables = {
+        name: getattr(gate, name) for name in vars(gate_type) if name.isupper()
+    }
+    options = {
+        name: value for name, value in vars(gate).items()
+        if name != "loader" and not name.startswith("_")
+    }
+    digest = hashlib.sha256()
+    for part in (
+        __version__,
+        str(CACHE_FORMAT),
+        gate_type.__qualname__,
+        inspect.getsource(gate_type),
+        inspect.getsource(matcher),
+        inspect.getsource(normalize),
+        repr(sorted(tables.items())),
+        repr(sorted(options.items())),
+        repr(gate.keyword_rules()),
+        repr(gate.pattern_rules()),
+        library,
+    ):
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+class AuditCache:
+    """On-disk cache of gate results with size-based LRU eviction.
+
+    Each entry is one small JSON file named by the hash of the content and
+    the gate fingerprint, so a lookup is a single file open. A gate whose
+    result also depends on the file's path or on outside state offers
+    ``cache_context(path)``, which is added to the key. Hits refresh the
+    entry's mtime; when the cache grows past ``max_bytes`` the least recently
+    used entries are removed. Writes are atomic renames, so several processes
+    can share one cache directory.
+    """
+
+    def __init__(self, directory: Path, max_bytes: int = DEFAULT_MAX_BYTES) -> None:
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self._size: int | None = None
+        self._fingerprints: dict[Any, tuple[tuple, str]] = {}
+
+    def fingerprint(self, gate: Any) -> str:
+        """Memoised fingerprint of a gate instance.
+
+        Recomputed whenever the rule pack or the library snapshot changes,
+        so long-running processes stop serving results for edited rules.
+        """
+        loader = gate.loader
+        state = (getattr(loader.rules, "digest", None), loader.snapshot.signature)
+        memo = self._fingerprints.get(gate)
+        if memo is None or memo[0] != state:
+            library = library_fingerprint(loader.library_path)
+            memo = self._fingerprints[gate] = (state, gate_fingerprint(gate, library))
+        return memo[1]
+
+    def _entry(self, content_hash: str, gate: Any, path: Path | None) -> Path:
+        context = getattr(gate, "cache_context", None)
+        extra = context(path) if context is not None and path is not None else ""
+        key = hashlib.sha256(
+            f"{content_hash}:{self.fingerprint(gate)}:{extra}".encode("utf-8")
+        ).hexdigest()
+        return self.directory / key[:2] / f"{key}.json"
+
+    def get(
+        self, content_hash: str, gate: Any, path: Path | None = None
+    ) -> "GateResult | None":
+        """Cached result of a gate for some content (read from ``path``), if present."""
+        from .gates import GateResult
+
+        entry = self._entry(content_hash, gate, path)
+        try:
+            data = json.loads(entry.read_text(encoding="utf-8"))
+            os.utime(entry)
+        except (OSError, ValueError):
+            return None
+        return GateResult(
+            passed=data["passed"], issues=data["issues"], metrics=data.get("metrics")
+        )
+
+    def put(
+        self, content_hash: str, gate: Any, result: "GateResult", path: Path | None = None
+    ) -> None:
+        """Store a gate result and evict old entries if over the size limit."""
+        entry = self._entry(content_hash, gate, path)
+        entry.parent.mkdir(parents=True, exist_ok=True)
+        data = json.dumps(
+            {
+                "gate": gate.name,
+                "passed": result.passed,
+                "issues": result.issues,
+                "metrics": result.metrics,
+            },
+            ensure_ascii=False,
+        ).encode("utf-8")
+
+        import tempfile
+
+        fd, tmp = tempfile.mkstemp(dir=entry.parent, suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp, entry)
+
+        if self._size is None:
+            self._size = self._measure()
+        else:
+            self._size += len(data)
+        if self._size > self.max_bytes:
+            self.evict()
+
+    def _entries(self) -> list[tuple[float, int, Path]]:
+        entries = []
+        for path in self.directory.glob("*/*.json"):
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+        return entries
+
+    def _measure(self) -> int:
+        return sum(size for _, size, _ in self._entries())
+
+    def evict(self) -> None:
+        """Drop least recently used entries until under the size target."""
+        entries = sorted(self._entries())
+        size = sum(size for _, size, _ in entries)
+        target = int(self.max_bytes * EVICT_TO)
+        for _, entry_size, path in entries:
+            if size <= target:
+                break
+            try:
+                path.unlink()
+            except OSError:
+                continue
+            size -= entry_size
+        self._size = size
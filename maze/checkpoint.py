@@ -0,0 +1,79 @@
+"""Per-story checkpoint records for resumable pipeline runs."""
+
+import json
+import os
+import tempfile
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Iterator
+
+# Pipeline stages in order, with the artifact each one writes
+STAGES = ("spec", "draft", "final")
+ARTIFACTS = {
+    "spec": "SPEC_{}.json",
+    "draft": "draft_v1_{}.txt",
+    "final": "final_trap_{}.txt",
+}
+
+
+def state_path(output_dir: Path, story_id: str) -> Path:
+    """Checkpoint record kept beside a story's artifacts."""
+    return output_dir / f"state_{story_id}.json"
+
+
+def artifact_path(output_dir: Path, story_id: str, stage: str) -> Path:
+    """File a stage writes its output to."""
+    return output_dir / ARTIFACTS[stage].format(story_id)
+
+
+@dataclass
+class StoryState:
+    """What a story's pipeline run has finished so far.
+
+    ``completed`` lists finished stages in order; ``status`` is ``running``
+    until the run ends as ``done`` or ``failed``. ``redactions`` logs the
+    spans the safety review rewrote in the final text.
+    """
+    story_id: str
+    theme: str
+    constraints: str = ""
+    formula: str = "auto"
+    completed: list[str] = field(default_factory=list)
+    status: str = "running"
+    error: str | None = None
+    redactions: list[dict[str, Any]] = field(default_factory=list)
+    updated: str = ""
+
+    @property
+    def finished(self) -> bool:
+        return self.completed == list(STAGES)
+
+    def is_complete(self, stage: str) -> bool:
+        return stage in self.completed
+
+    def save(self, output_dir: Path) -> None:
+        """Write the record atomically so a killed run never leaves it torn."""
+        self.updated = datetime.now().isoformat()
+        output_dir.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=output_dir, prefix=".state_", suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(asdict(self), f, ensure_ascii=False, indent=2)
+        os.replace(tmp, state_path(output_dir, self.story_id))
+
+
+def load_state(output_dir: Path, story_id: str) -> StoryState | None:
+    """Read a story's checkpoint record, if it has one."""
+    try:
+        data = json.loads(state_path(output_dir, story_id).read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+    return StoryState(**data)
+
+
+def iter_states(output_dir: Path) -> Iterator[StoryState]:
+    """Every readable checkpoint record in an output directory, by story ID."""
+    for path in sorted(output_dir.glob("state_*.json")):
+        state = load_state(output_dir, path.stem[len("state_"):])
+        if state is not None:
+            yield state
@@ -0,0 +1,140 @@
+"""Thin client for the audit daemon started by ``maze serve``.
+
+This module imports only the standard library, so an editor plugin can call
+``python -m maze.client audit -f draft.txt`` on every save without paying
+for the gates and library. When no daemon is listening the request is
+handled in-process instead, with the same JSON response.
+"""
+
+import argparse
+import json
+import os
+import socket
+import sys
+import tempfile
+from pathlib import Path
+from typing import Any
+
+# Bytes read per recv while waiting for a response line
+RECV_SIZE = 1 << 16
+
+
+def default_socket_path() -> Path:
+    """Per-user daemon socket: ``$MAZE_SOCKET`` or one in the temp directory."""
+    if os.environ.get("MAZE_SOCKET"):
+        return Path(os.environ["MAZE_SOCKET"])
+    user = os.getuid() if hasattr(os, "getuid") else os.environ.get("USERNAME", "user")
+    return Path(tempfile.gettempdir()) / f"maze-{user}.sock"
+
+
+def connect(
+    socket_path: Path | None = None, port: int | None = None, timeout: float | None = None
+) -> socket.socket:
+    """Open a connection to the daemon on a localhost port or a Unix socket."""
+    if port is not None:
+        return socket.create_connection(("127.0.0.1", port), timeout=timeout)
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.settimeout(timeout)
+    try:
+        sock.connect(str(socket_path or default_socket_path()))
+    except OSError:
+        sock.close()
+        raise
+    return sock
+
+
+def send(sock: socket.socket, request: dict[str, Any]) -> dict[str, Any]:
+    """Send one request over an open connection and return the response."""
+    sock.sendall(json.dumps(request, ensure_ascii=False).encode("utf-8") + b"\n")
+    buffer = b""
+    while not buffer.endswith(b"\n"):
+        data = sock.recv(RECV_SIZE)
+        if not data:
+            raise ConnectionError("Daemon closed the connection mid-response")
+        buffer += data
+    return json.loads(buffer)
+
+
+def call(
+    request: dict[str, Any],
+    socket_path: Path | None = None,
+    port: int | None = None,
+    timeout: float | None = None,
+) -> dict[str, Any]:
+    """Send a request to the daemon, handling it in-process if none is running.
+
+    Only a failure to connect falls back; once the daemon has the request,
+    errors are raised rather than running the request twice.
+    """
+    try:
+        sock = connect(socket_path, port, timeout)
+    except OSError:
+        from .server import AuditService
+        return AuditService().handle(request)
+    with sock:
+        return send(sock, request)
+
+
+def create_parser() -> argparse.ArgumentParser:
+    """Argument parser for the thin client."""
+    parser = argparse.ArgumentParser(
+        prog="maze-client",
+        description="Send audit and generate requests to a running 'maze serve'",
+    )
+    parser.add_argument("--socket", default=None, help="Daemon socket (default: per-user)")
+    parser.add_argument("--port", type=int, default=None, help="Daemon localhost port")
+    parser.add_argument("--timeout", type=float, default=None, help="Seconds to wait")
+    subparsers = parser.add_subparsers(dest="op", required=True)
+
+    audit_parser = subparsers.add_parser("audit", help="Audit one draft")
+    audit_parser.add_argument("--file", "-f", required=True, help="Path to draft file")
+    audit_parser.add_argument(
+        "--gate", "-g", default="all", choices=["idea", "quality", "safety", "all"]
+    )
+    audit_parser.add_argument("--positional", action="store_true")
+    audit_parser.add_argument("--formula", default=None)
+
+    generate_parser = subparsers.add_parser("generate", help="Generate a story")
+    generate_parser.add_argument("--theme", "-t", required=True)
+    generate_parser.add_argument("--constraints", "-c", default="")
+    generate_parser.add_argument("--formula", "-f", default="auto")
+    generate_parser.add_argument("--output", "-o", default="./output")
+
+    subparsers.add_parser("ping", help="Check that the daemon is up")
+    return parser
+
+
+def build_request(args: argparse.Namespace) -> dict[str, Any]:
+    """Request for parsed client arguments, with paths made absolute."""
+    if args.op == "audit":
+        return {
+            "op": "audit",
+            "path": str(Path(args.file).resolve()),
+            "gate": args.gate,
+            "positional": args.positional,
+            "formula": args.formula,
+        }
+    if args.op == "generate":
+        return {
+            "op": "generate",
+            "theme": args.theme,
+            "constraints": args.constraints,
+            "formula": args.formula,
+            "output": str(Path(args.output).resolve()),
+        }
+    return {"op": "ping"}
+
+
+def main() -> int:
+    """Client entry point; prints the JSON response."""
+    args = create_parser().parse_args()
+    socket_path = Path(args.socket) if args.socket else None
+    response = call(build_request(args), socket_path, args.port, args.timeout)
+    print(json.dumps(response, ensure_ascii=False, indent=2))
+    if not response.get("ok"):
+        return 1
+    return 0 if response.get("passed", True) else 2
+
+
+if __name__ == "__main__":
+    sys.exit(main())
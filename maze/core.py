@@ -1,11 +1,17 @@
-"""CLI entry point for the Maze Narrative Engine."""
+"""CLI entry point for the Maze Narrative Engine.
+
+Only the argument parser is built at import time. Each command imports the
+modules it needs when it runs, so ``maze --help`` or a single-gate audit
+does not pay for the pipeline, the other gates or the process pool.
+"""
 
 import argparse
 import sys
 from pathlib import Path
+from typing import IO, TYPE_CHECKING
 
-from .pipeline import Pipeline
-from .gates import IdeaGate, QualityGate, SafetyGate
+if TYPE_CHECKING:
+    from .pipeline import Pipeline, PipelineResult
 
 
 def create_parser() -> argparse.ArgumentParser:
@@ -13,15 +19,28 @@ def create_parser() -> argparse.ArgumentParser:
     parser = argparse.ArgumentParser(
         prog="maze",
         description="The Maze Narrative Engine - Trap-Based Story Generator",
-        epilog="Use 'maze generate --help' or 'maze audit --help' for more info.",
+        epilog="Use 'maze generate --help', 'maze audit --help' or 'maze serve --help' "
+               "for more info.",
     )
 
     subparsers = parser.add_subparsers(dest="command", help="Available commands")
 
     # Generate command
     generate_parser = subparsers.add_parser("generate", help="Generate a new story")
-    generate_parser.add_argument(
-        "--theme", "-t", required=True, help="Story theme or concept"
+    theme_group = generate_parser.add_mutually_exclusive_group(required=True)
+    theme_group.add_argument(
+        "--theme", "-t", help="Story theme or concept"
+    )
+    theme_group.add_argument(
+        "--themes", help="File with one theme per line; generates a story for each"
+    )
+    theme_group.add_argument(
+        "--resume", metavar="STORY_ID",
+        help="Resume a story in --output, skipping the gates it already passed"
+    )
+    theme_group.add_argument(
+        "--resume-all", action="store_true",
+        help="Resume every unfinished story in --output"
     )
     generate_parser.add_argument(
         "--constraints", "-c", default="", help="User constraints (e.g., 'NO AI')"
@@ -32,20 +51,209 @@ def create_parser() -> argparse.ArgumentParser:
     generate_parser.add_argument(
         "--formula", "-f", default="auto", help="Formula to use (cool/sweet/regret/auto)"
     )
+    generate_parser.add_argument(
+        "--jobs", "-j", type=int, default=None,
+        help="Concurrent pipelines for --themes (default: cores + 4, at most 32)"
+    )
+    generate_parser.add_argument(
+        "--backend", default=None,
+        help="Generate drafts through a backend: an HTTP URL, 'fake' or 'fake:<latency>'"
+    )
+    generate_parser.add_argument(
+        "--concurrency", type=int, default=8,
+        help="Maximum in-flight backend requests (default: 8)"
+    )
+    generate_parser.add_argument(
+        "--timeout", type=float, default=60.0,
+        help="Seconds before a backend request is retried (default: 60)"
+    )
+    generate_parser.add_argument(
+        "--retries", type=int, default=3,
+        help="Retries per backend request, with exponential backoff (default: 3)"
+    )
+    generate_parser.add_argument(
+        "--candidates", "-n", type=int, default=1,
+        help="Drafts to generate per SPEC with --backend, keeping the best (default: 1)"
+    )
+    generate_parser.add_argument(
+        "--min-score", type=float, default=None,
+        help="Quality score (0-1) that ends a best-of-N search early (default: 0.5)"
+    )
+    generate_parser.add_argument(
+        "--seed", type=int, default=None,
+        help="Seed material sampling so the same theme always gets the same SPEC"
+    )
 
     # Audit command
     audit_parser = subparsers.add_parser("audit", help="Audit an existing draft")
-    audit_parser.add_argument(
-        "--file", "-f", required=True, help="Path to draft file or directory"
+    target_group = audit_parser.add_mutually_exclusive_group(required=True)
+    target_group.add_argument(
+        "--file", "-f", help="Path to draft file or directory"
+    )
+    target_group.add_argument(
+        "--watch", metavar="DIR",
+        help="Audit DIR, then re-audit files as they change until interrupted"
+    )
+    target_group.add_argument(
+        "--worker", metavar="QUEUE",
+        help="Claim and audit shards from a work-queue directory until none are left"
+    )
+    target_group.add_argument(
+        "--merge", metavar="QUEUE",
+        help="Combine the shard results of a finished work queue into one report"
     )
     audit_parser.add_argument(
         "--gate", "-g", default="all", choices=["idea", "quality", "safety", "all"],
         help="Which gate to audit (default: all)"
     )
     audit_parser.add_argument(
-        "--output", "-o", default="./audit_reports", help="Output directory for audit reports"
+        "--output", "-o", default="./audit_reports",
+        help="Output directory for audit reports; '-' streams json/ndjson records to stdout"
+    )
+    audit_parser.add_argument(
+        "--format", default="markdown", choices=["markdown", "json", "ndjson"],
+        help="Report format: Markdown, or JSON/NDJSON records written as files finish"
+    )
+    audit_parser.add_argument(
+        "--jobs", "-j", type=int, default=None,
+        help="Worker processes for directory/glob audits (default: all cores)"
+    )
+    audit_parser.add_argument(
+        "--pattern", default=None,
+        help="File pattern to match when auditing a directory "
+             "(default: *.txt; *.txt and *.json with --watch)"
+    )
+    audit_parser.add_argument(
+        "--debounce", type=float, default=0.2,
+        help="With --watch, seconds of quiet before a burst of saves is audited (default: 0.2)"
+    )
+    audit_parser.add_argument(
+        "--poll", action="store_true",
+        help="With --watch, poll file stats instead of using inotify"
+    )
+    audit_parser.add_argument(
+        "--stream", action="store_true",
+        help="Read the file in chunks instead of loading it whole (automatic for large files)"
+    )
+    audit_parser.add_argument(
+        "--chunk-size", type=int, default=None,
+        help="Characters per chunk when streaming (default: 1M)"
+    )
+    audit_parser.add_argument(
+        "--cache-dir", default=None,
+        help="Directory for cached audit results (default: ~/.cache/maze/audit)"
+    )
+    audit_parser.add_argument(
+        "--no-cache", action="store_true", help="Always re-scan; do not read or write the cache"
+    )
+    audit_parser.add_argument(
+        "--positional", action="store_true",
+        help="Check density per window and explanatory language in the ending only"
+    )
+    audit_parser.add_argument(
+        "--formula", default=None,
+        help="Formula whose stages to report in positional mode (e.g. cool)"
+    )
+    audit_parser.add_argument(
+        "--rule-pack", default=None, metavar="NAME",
+        help="Rule pack under library/rules/, or a path to one "
+             "(default: $MAZE_RULE_PACK or 'default')"
+    )
+    audit_parser.add_argument(
+        "--dedupe-index", default=None, metavar="FILE",
+        help="Flag SPECs and drafts that nearly duplicate ones in this index (see 'maze dedupe')"
+    )
+    audit_parser.add_argument(
+        "--queue", default=None, metavar="DIR",
+        help="With --file, split the corpus into shards in work-queue DIR instead of auditing "
+             "(then run 'maze audit --worker DIR' on any number of nodes)"
+    )
+    audit_parser.add_argument(
+        "--shard-size", type=int, default=None,
+        help="Files per shard with --queue (default: 200)"
+    )
+    audit_parser.add_argument(
+        "--lease", type=float, default=None, metavar="SECONDS",
+        help="With --worker, seconds without progress before another worker "
+             "takes over a shard (default: 300)"
     )
 
+    # Dedupe command
+    dedupe_parser = subparsers.add_parser(
+        "dedupe", help="Find near-duplicate SPECs and drafts, and index them"
+    )
+    dedupe_parser.add_argument(
+        "target", help="File, directory or glob of SPEC_*.json / final_trap_*.txt files"
+    )
+    dedupe_parser.add_argument(
+        "--index", required=True, metavar="FILE", help="Dedupe index file (created if missing)"
+    )
+    dedupe_parser.add_argument(
+        "--threshold", type=float, default=0.7,
+        help="Estimated similarity (0-1) reported as a near-duplicate (default: 0.7)"
+    )
+    dedupe_parser.add_argument(
+        "--pattern", action="append", default=None,
+        help="File pattern to index in a directory; repeatable "
+             "(default: SPEC_*.json and final_trap_*.txt)"
+    )
+    dedupe_parser.add_argument(
+        "--no-add", action="store_true", help="Only report duplicates; leave the index unchanged"
+    )
+
+    # Report command
+    report_parser = subparsers.add_parser(
+        "report", help="Render saved audit records as a Markdown report"
+    )
+    report_parser.add_argument(
+        "records", help="Records written by 'maze audit --format json|ndjson'"
+    )
+    report_parser.add_argument(
+        "--output", "-o", default="./audit_reports/Audit_Report.md",
+        help="Markdown report to write"
+    )
+
+    # Serve command
+    serve_parser = subparsers.add_parser(
+        "serve", help="Run a daemon that answers audit and generate requests"
+    )
+    serve_parser.add_argument(
+        "--socket", default=None,
+        help="Unix socket to listen on (default: $MAZE_SOCKET or a per-user temp path)"
+    )
+    serve_parser.add_argument(
+        "--port", type=int, default=None, help="Listen on this localhost port instead"
+    )
+    serve_parser.add_argument(
+        "--workers", type=int, default=4, help="Requests handled at once (default: 4)"
+    )
+    serve_parser.add_argument(
+        "--cache-dir", default=None,
+        help="Directory for cached audit results (default: ~/.cache/maze/audit)"
+    )
+    serve_parser.add_argument(
+        "--no-cache", action="store_true", help="Always re-scan; do not read or write the cache"
+    )
+    serve_parser.add_argument(
+        "--rule-pack", default=None, metavar="NAME",
+        help="Rule pack under library/rules/, or a path to one; edits are picked up live"
+    )
+    serve_parser.add_argument(
+        "--output-root", default=None, metavar="DIR",
+        help="Generate requests write only below DIR (required for generate with --port)"
+    )
+
+    for command_parser in (generate_parser, audit_parser):
+        command_parser.add_argument(
+            "--metrics", metavar="PATH", default=None,
+            help="Write timings and rule-hit counters (Prometheus text for .prom, "
+                 "else JSON lines)"
+        )
+        command_parser.add_argument(
+            "--metrics-rules", action="store_true",
+            help="With --metrics, also time every rule on its own (extra scans)"
+        )
+
     return parser
 
 
@@ -54,17 +262,21 @@ def run_generate(args: argparse.Namespace) -> int:
     output_dir = Path(args.output)
     output_dir.mkdir(parents=True, exist_ok=True)
 
-    pipeline = Pipeline(
-        theme=args.theme,
-        constraints=args.constraints,
-        formula=args.formula,
-        output_dir=output_dir,
-    )
+    if args.candidates > 1 and not args.backend:
+        print("[ERROR] --candidates needs a generation --backend", file=sys.stderr)
+        return 1
+
+    if args.backend:
+        import asyncio
+        return asyncio.run(run_generate_async(args, output_dir))
+
+    if args.themes or args.resume_all:
+        return run_batch_generate(args, output_dir)
 
     try:
-        result = pipeline.run()
+        result = _story_pipeline(args, output_dir).run()
         if result.success:
-            print(f"[OK] Story generated: {result.output_path}")
+            print(_generated_message(result))
             return 0
         else:
             print(f"[FAIL] Generation failed: {result.error}", file=sys.stderr)
@@ -74,63 +286,559 @@ def run_generate(args: argparse.Namespace) -> int:
         return 1
 
 
+def _generated_message(result: "PipelineResult") -> str:
+    """Success line for one story, noting any spans the safety review rewrote."""
+    message = f"[OK] Story generated: {result.output_path}"
+    if result.redactions:
+        message += f" ({len(result.redactions)} span(s) redacted by the safety review)"
+    return message
+
+
+def _story_pipeline(args: argparse.Namespace, output_dir: Path) -> "Pipeline":
+    """Pipeline for a single story: resumed with --resume, else fresh."""
+    from .pipeline import Pipeline
+
+    options = {"candidates": args.candidates, "min_score": args.min_score, "seed": args.seed}
+    if args.resume:
+        return Pipeline.resume(args.resume, output_dir, **options)
+    return Pipeline(
+        theme=args.theme,
+        constraints=args.constraints,
+        formula=args.formula,
+        output_dir=output_dir,
+        **options,
+    )
+
+
+def _story_jobs(args: argparse.Namespace, output_dir: Path):
+    """Batch jobs and manifest path for --themes or --resume-all, or None."""
+    from .batch_generate import (
+        MANIFEST_NAME, RESUME_MANIFEST_NAME, read_themes, resume_jobs,
+    )
+
+    if args.resume_all:
+        return resume_jobs(output_dir), output_dir / RESUME_MANIFEST_NAME
+    themes = Path(args.themes)
+    if not themes.is_file():
+        print(f"[ERROR] Theme file not found: {themes}", file=sys.stderr)
+        return None
+    return read_themes(themes, args.constraints, args.formula), output_dir / MANIFEST_NAME
+
+
+async def run_generate_async(args: argparse.Namespace, output_dir: Path) -> int:
+    """Generate one story or a theme list through an async backend."""
+    from .backend import LimitedBackend, make_backend
+    from .batch_generate import generate_batch_async, write_manifest_async
+
+    batch = None
+    if args.themes or args.resume_all:
+        batch = _story_jobs(args, output_dir)
+        if batch is None:
+            return 1
+
+    try:
+        generation_backend = make_backend(args.backend, pool_size=args.concurrency)
+    except ValueError as e:
+        print(f"[ERROR] {e}", file=sys.stderr)
+        return 1
+    backend = LimitedBackend(
+        generation_backend,
+        concurrency=args.concurrency,
+        retries=args.retries,
+        timeout=args.timeout,
+    )
+    try:
+        if batch is None:
+            try:
+                result = await _story_pipeline(args, output_dir).run_async(backend)
+            except Exception as e:
+                print(f"[ERROR] Unexpected error: {e}", file=sys.stderr)
+                return 1
+            if result.success:
+                print(_generated_message(result))
+                return 0
+            print(f"[FAIL] Generation failed: {result.error}", file=sys.stderr)
+            return 1
+
+        jobs, manifest_path = batch
+        succeeded, failed = await write_manifest_async(
+            generate_batch_async(
+                jobs, output_dir, backend,
+                candidates=args.candidates, min_score=args.min_score, seed=args.seed,
+            ),
+            manifest_path,
+        )
+    finally:
+        await backend.close()
+
+    print(f"[OK] Generated {succeeded} stories ({failed} failed)")
+    print(f"[OK] Manifest: {manifest_path}")
+    return 0 if failed == 0 else 1
+
+
+def run_batch_generate(args: argparse.Namespace, output_dir: Path) -> int:
+    """Generate or resume a batch of stories, writing a manifest."""
+    from .batch_generate import generate_batch, write_manifest
+
+    batch = _story_jobs(args, output_dir)
+    if batch is None:
+        return 1
+
+    jobs, manifest_path = batch
+    succeeded, failed = write_manifest(
+        generate_batch(jobs, output_dir, workers=args.jobs, seed=args.seed), manifest_path
+    )
+
+    print(f"[OK] Generated {succeeded} stories ({failed} failed)")
+    print(f"[OK] Manifest: {manifest_path}")
+    return 0 if failed == 0 else 1
+
+
 def run_audit(args: argparse.Namespace) -> int:
-    """Execute the audit process."""
+    """Execute the audit process.
+
+    Every audit produces a stream of records (see :mod:`maze.report`),
+    written as JSON or NDJSON as each file finishes, or rendered into the
+    Markdown report.
+    """
+    import time
+    from .batch import BatchSummary, is_batch_target
     from .library.loader import ResourceLoader
+    from .report import file_records, header_record, summary_record
+
+    if args.worker:
+        return run_queue_worker(args)
+    if args.merge:
+        return run_merge(args)
+    if _bad_rule_pack(args) or _bad_dedupe_index(args):
+        return 1
+    if args.watch:
+        return run_watch(args)
+    if args.queue:
+        return run_enqueue(args)
 
     target = Path(args.file)
+    batch = is_batch_target(args.file)
+    if not batch and not target.is_file():
+        print(f"[ERROR] File not found: {target}", file=sys.stderr)
+        return 1
+
+    loader = ResourceLoader(rule_pack=args.rule_pack)
+    audits = _batch_audits(args, loader) if batch else _file_audits(args, loader, target)
+    summary = BatchSummary()
+
+    def records():
+        yield header_record(args.file, args.gate, batch)
+        start = time.perf_counter()
+        for audit in audits:
+            summary.add(audit)
+            yield from file_records(audit)
+        yield summary_record(summary, time.perf_counter() - start)
+
+    report_path, status = _write_records(args, records())
+
+    if not batch:
+        if summary.errors:
+            print(f"[ERROR] Could not audit {target}", file=sys.stderr)
+            return 1
+    elif summary.files == 0:
+        print(f"[ERROR] No files matched: {args.file}", file=sys.stderr)
+        return 1
+    else:
+        print(
+            f"[OK] Audited {summary.files} files "
+            f"({summary.passed} passed, {summary.failed} failed, {summary.errors} errors)",
+            file=status,
+        )
+    if report_path is not None:
+        print(f"[OK] Audit report: {report_path}", file=status)
+    return 0
+
+
+def _write_records(args: argparse.Namespace, records) -> tuple[Path | None, IO[str]]:
+    """Write an audit's records per --output and --format.
+
+    Returns the report path (None when streaming to stdout) and the stream
+    status lines should go to, so they never mix with records on stdout.
+    """
+    from .report import REPORT_NAMES, RecordWriter, write_markdown
+
+    if args.output == "-" and args.format != "markdown":
+        writer = RecordWriter(sys.stdout, args.format)
+        for record in records:
+            writer.write(record)
+        writer.close()
+        return None, sys.stderr
+
     output_dir = Path(args.output)
     output_dir.mkdir(parents=True, exist_ok=True)
+    report_path = output_dir / REPORT_NAMES[args.format]
+    if args.format == "markdown":
+        write_markdown(records, report_path)
+    else:
+        with open(report_path, "w", encoding="utf-8") as f:
+            writer = RecordWriter(f, args.format)
+            for record in records:
+                writer.write(record)
+            writer.close()
+    return report_path, sys.stdout
 
-    loader = ResourceLoader()
-    report_path = output_dir / "Audit_Report.md"
 
-    gates_to_run = []
-    if args.gate in ("idea", "all"):
-        gates_to_run.append(IdeaGate(loader))
-    if args.gate in ("quality", "all"):
-        gates_to_run.append(QualityGate(loader))
-    if args.gate in ("safety", "all"):
-        gates_to_run.append(SafetyGate(loader))
+def run_enqueue(args: argparse.Namespace) -> int:
+    """Split a directory or glob into shards in a new work queue."""
+    from .batch import is_batch_target, iter_targets
+    from .library.loader import ResourceLoader
+    from .workqueue import DEFAULT_SHARD_SIZE, QueueError, WorkQueue
 
-    if not target.is_file():
-        print(f"[ERROR] File not found: {target}", file=sys.stderr)
+    if not is_batch_target(args.file):
+        print("[ERROR] --queue needs a directory or glob to shard", file=sys.stderr)
+        return 1
+    options = {
+        "target": args.file,
+        "gate": args.gate,
+        "positional": args.positional,
+        "formula": args.formula,
+        "rule_pack": args.rule_pack,
+        "rules_digest": ResourceLoader(rule_pack=args.rule_pack).rules.digest,
+        "dedupe_index": str(Path(args.dedupe_index).resolve()) if args.dedupe_index else None,
+    }
+    try:
+        queue = WorkQueue.create(
+            Path(args.queue), iter_targets(args.file, args.pattern or "*.txt"), options,
+            shard_size=args.shard_size or DEFAULT_SHARD_SIZE,
+        )
+    except (QueueError, OSError) as e:
+        print(f"[ERROR] {e}", file=sys.stderr)
         return 1
+    manifest = queue.manifest
+    if manifest["files"] == 0:
+        print(f"[ERROR] No files matched: {args.file}", file=sys.stderr)
+        return 1
+    print(
+        f"[OK] Queued {manifest['files']} files in {manifest['shards']} shards: "
+        f"{queue.directory}"
+    )
+    return 0
+
+
+def run_queue_worker(args: argparse.Namespace) -> int:
+    """Audit shards from a work queue until every shard is finished."""
+    from .library.loader import ResourceLoader
+    from .workqueue import DEFAULT_LEASE_SECONDS, QueueError, WorkQueue, run_worker
+
+    queue = WorkQueue(Path(args.worker))
+    try:
+        rule_pack = queue.manifest.get("rule_pack")
+        done = run_worker(
+            queue, ResourceLoader(rule_pack=rule_pack),
+            lease_seconds=args.lease or DEFAULT_LEASE_SECONDS,
+            jobs=args.jobs, cache_dir=_cache_dir(args),
+        )
+    except (QueueError, ValueError) as e:
+        print(f"[ERROR] {e}", file=sys.stderr)
+        return 1
+    print(f"[OK] Audited {len(done)} shards; queue complete: {queue.directory}")
+    return 0
+
+
+def run_merge(args: argparse.Namespace) -> int:
+    """Write the combined report of a finished work queue."""
+    from .workqueue import QueueError, WorkQueue, merged_records
+
+    queue = WorkQueue(Path(args.merge))
+    try:
+        status = queue.status()
+    except QueueError as e:
+        print(f"[ERROR] {e}", file=sys.stderr)
+        return 1
+    unfinished = status["shards"] - status["done"]
+    if unfinished:
+        print(
+            f"[ERROR] {unfinished} of {status['shards']} shards are not finished "
+            f"({status['leased']} leased); run more workers on {queue.directory}",
+            file=sys.stderr,
+        )
+        return 1
+
+    summary = {}
+
+    def records():
+        for record in merged_records(queue):
+            if record["type"] == "summary":
+                summary.update(record)
+            yield record
+
+    report_path, status_file = _write_records(args, records())
+    print(
+        f"[OK] Merged {summary['files']} files from {status['shards']} shards "
+        f"({summary['passed']} passed, {summary['failed']} failed, {summary['errors']} errors)",
+        file=status_file,
+    )
+    if report_path is not None:
+        print(f"[OK] Audit report: {report_path}", file=status_file)
+    return 0
 
-    content = target.read_text(encoding="utf-8")
 
-    with open(report_path, "w", encoding="utf-8") as f:
-        f.write(f"# Audit Report: {target.name}\n\n")
-        f.write(f"**Date**: {__import__('datetime').datetime.now().isoformat()}\n")
-        f.write(f"**Gate**: {args.gate}\n\n---\n\n")
+def run_watch(args: argparse.Namespace) -> int:
+    """Audit a directory, then re-audit changed files until interrupted.
 
-        for gate in gates_to_run:
-            result = gate.audit(content, target)
-            f.write(f"## {gate.name}\n\n")
-            f.write(f"**Status**: {'PASS' if result.passed else 'FAIL'}\n\n")
-            if result.issues:
-                f.write("**Issues**:\n")
-                for issue in result.issues:
-                    f.write(f"- {issue}\n")
-            f.write("\n")
+    Results go to stdout: one line per file, or NDJSON records with
+    ``--format ndjson``.
+    """
+    from .cache import AuditCache
+    from .library.loader import ResourceLoader
+    from .report import RecordWriter, file_records
+    from .watch import WATCH_PATTERNS, AuditWatcher
+
+    root = Path(args.watch)
+    if not root.is_dir():
+        print(f"[ERROR] Directory not found: {root}", file=sys.stderr)
+        return 1
+    if args.format == "json":
+        print("[ERROR] --watch streams records; use --format ndjson", file=sys.stderr)
+        return 1
+
+    cache_dir = _cache_dir(args)
+    watcher = AuditWatcher(
+        root,
+        ResourceLoader(rule_pack=args.rule_pack),
+        gate=args.gate,
+        patterns=(args.pattern,) if args.pattern else WATCH_PATTERNS,
+        positional=args.positional,
+        formula=args.formula,
+        cache=AuditCache(cache_dir) if cache_dir is not None else None,
+        debounce=args.debounce,
+        poll=args.poll,
+        dedupe_index=args.dedupe_index,
+    )
+    writer = RecordWriter(sys.stdout, "ndjson") if args.format == "ndjson" else None
 
+    def show(audits, removed) -> None:
+        for audit in audits:
+            if writer is not None:
+                for record in file_records(audit):
+                    writer.write(record)
+            else:
+                _print_file_audit(audit)
+        for path in removed:
+            if writer is not None:
+                writer.write({"type": "removed", "path": str(path)})
+            else:
+                print(f"[REMOVED] {path}", flush=True)
+
+    kind = type(watcher.watcher).__name__.replace("Watcher", "").lower()
+    print(f"[OK] Watching {root} ({kind}); Ctrl-C to stop", file=sys.stderr)
+    try:
+        show(watcher.initial(), [])
+        while True:
+            show(*watcher.next())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        watcher.close()
+    return 0
+
+
+def _print_file_audit(audit) -> None:
+    """One status line per file, followed by its issues."""
+    if audit.error is not None:
+        print(f"[ERROR] {audit.path}: {audit.error}", flush=True)
+        return
+    print(f"[{'PASS' if audit.passed else 'FAIL'}] {audit.path}", flush=True)
+    for name, result in zip(audit.gate_names, audit.results):
+        for issue in result.issues:
+            print(f"  - {name}: {issue}", flush=True)
+
+
+def _file_audits(args: argparse.Namespace, loader, target: Path):
+    """Audit a single file in-process, honouring --stream and the cache."""
+    from .batch import timed_audit
+    from .cache import AuditCache
+    from .gates.fused import FusedAudit, select_gates
+
+    audit = FusedAudit(select_gates(
+        loader, args.gate, args.positional, args.formula, dedupe_index=args.dedupe_index
+    ))
+    cache_dir = _cache_dir(args)
+    cache = AuditCache(cache_dir) if cache_dir is not None else None
+    yield timed_audit(audit, target, cache, stream=args.stream, chunk_size=args.chunk_size)
+
+
+def _batch_audits(args: argparse.Namespace, loader):
+    """Audit every file under a directory or glob across worker processes."""
+    from .batch import audit_paths, iter_targets
+
+    return audit_paths(
+        iter_targets(args.file, args.pattern or "*.txt"), loader, args.gate, jobs=args.jobs,
+        cache_dir=_cache_dir(args), positional=args.positional, formula=args.formula,
+        dedupe_index=args.dedupe_index,
+    )
+
+
+def run_dedupe(args: argparse.Namespace) -> int:
+    """Report near-duplicates among SPECs and drafts, adding each to the index.
+
+    Files are checked in order against everything indexed before them, so a
+    run over an output directory flags every later copy of a premise.
+    """
+    import sqlite3
+
+    from .dedupe import DEDUPE_PATTERNS, DedupeIndex, document_text, iter_corpus
+
+    patterns = tuple(args.pattern) if args.pattern else DEDUPE_PATTERNS
+    checked = duplicates = 0
+    try:
+        index = DedupeIndex(Path(args.index))
+    except (OSError, ValueError, sqlite3.Error) as e:
+        print(f"[ERROR] {e}", file=sys.stderr)
+        return 1
+    with index:
+        for path in iter_corpus(args.target, patterns):
+            try:
+                content = path.read_text(encoding="utf-8")
+            except (OSError, UnicodeDecodeError) as e:
+                print(f"[ERROR] {path}: {e}", file=sys.stderr)
+                continue
+            key = str(path.resolve())
+            kind, text = document_text(path, content)
+            matches = index.query(text, kind, args.threshold, exclude=key)
+            checked += 1
+            if matches:
+                duplicates += 1
+            for match in matches:
+                print(f"[DUP] {path} ~ {match.key} ({match.similarity:.2f})")
+            if not args.no_add:
+                index.add(key, text, kind)
+        size = len(index)
+
+    if checked == 0:
+        print(f"[ERROR] No files matched: {args.target}", file=sys.stderr)
+        return 1
+    print(f"[OK] Checked {checked} files: {duplicates} near-duplicates, {size} indexed")
+    return 0
+
+
+def run_report(args: argparse.Namespace) -> int:
+    """Render saved JSON or NDJSON audit records as a Markdown report."""
+    from .report import read_records, write_markdown
+
+    source = Path(args.records)
+    if not source.is_file():
+        print(f"[ERROR] File not found: {source}", file=sys.stderr)
+        return 1
+    report_path = Path(args.output)
+    try:
+        write_markdown(read_records(source), report_path)
+    except (ValueError, KeyError) as e:
+        print(f"[ERROR] Malformed audit records in {source}: {e}", file=sys.stderr)
+        return 1
     print(f"[OK] Audit report: {report_path}")
     return 0
 
 
+def _bad_rule_pack(args: argparse.Namespace) -> bool:
+    """Report a rule pack that is missing or malformed; only the default may be absent."""
+    from .library.loader import ResourceLoader
+    from .rules import load_rule_pack, rule_pack_path
+
+    library_path = ResourceLoader().library_path
+    path = rule_pack_path(library_path, args.rule_pack)
+    if not path.is_file():
+        if not args.rule_pack:
+            return False
+        print(f"[ERROR] Rule pack not found: {path}", file=sys.stderr)
+        return True
+    try:
+        load_rule_pack(path, library_path)
+    except ValueError as e:
+        print(f"[ERROR] {e}", file=sys.stderr)
+        return True
+    return False
+
+
+def _bad_dedupe_index(args: argparse.Namespace) -> bool:
+    """Report a --dedupe-index that cannot be opened, e.g. from an older version."""
+    if not args.dedupe_index:
+        return False
+    import sqlite3
+
+    from .dedupe import DedupeIndex
+
+    try:
+        DedupeIndex(Path(args.dedupe_index)).close()
+    except (OSError, ValueError, sqlite3.Error) as e:
+        print(f"[ERROR] {e}", file=sys.stderr)
+        return True
+    return False
+
+
+def _cache_dir(args: argparse.Namespace) -> Path | None:
+    """Resolve the audit cache directory, or None when caching is off."""
+    if args.no_cache:
+        return None
+    from .cache import default_cache_dir
+    return Path(args.cache_dir) if args.cache_dir else default_cache_dir()
+
+
+def run_serve(args: argparse.Namespace) -> int:
+    """Run the audit daemon until interrupted."""
+    from .server import serve
+
+    if _bad_rule_pack(args):
+        return 1
+    try:
+        serve(
+            socket_path=Path(args.socket) if args.socket else None,
+            port=args.port,
+            workers=args.workers,
+            cache_dir=_cache_dir(args),
+            rule_pack=args.rule_pack,
+            output_root=Path(args.output_root) if args.output_root else None,
+        )
+    except OSError as e:
+        print(f"[ERROR] {e}", file=sys.stderr)
+        return 1
+    return 0
+
+
 def main() -> int:
     """Main entry point."""
     parser = create_parser()
     args = parser.parse_args()
 
-    if args.command == "generate":
-        return run_generate(args)
-    elif args.command == "audit":
-        return run_audit(args)
-    else:
+    if args.command == "serve":
+        return run_serve(args)
+    if args.command == "report":
+        return run_report(args)
+    if args.command == "dedupe":
+        return run_dedupe(args)
+    if args.command not in ("generate", "audit"):
         parser.print_help()
         return 0
 
+    if not args.metrics:
+        return run_command(args)
+
+    from . import metrics
+    registry = metrics.enable(metrics.Metrics(rule_timing=args.metrics_rules))
+    try:
+        return run_command(args)
+    finally:
+        metrics.disable()
+        registry.write(Path(args.metrics))
+        # Status goes to stderr, so records streamed to stdout stay parseable.
+        print(f"[OK] Metrics: {args.metrics}", file=sys.stderr)
+
+
+def run_command(args: argparse.Namespace) -> int:
+    """Dispatch a parsed generate or audit command."""
+    from . import metrics
+
+    with metrics.timer("command", command=args.command):
+        if args.command == "generate":
+            return run_generate(args)
+        return run_audit(args)
+
 
 if __name__ == "__main__":
     sys.exit(main())
@@ -0,0 +1,274 @@
+"""Near-duplicate detection across generated SPECs and drafts.
+
+Documents are reduced to MinHash signatures over character shingles, and
+the signatures are banded into locality-sensitive hash buckets kept in a
+SQLite file. A query only compares against documents sharing at least one
+bucket, so lookups stay sub-linear in the corpus size, and new documents
+can be added at any time.
+"""
+
+import glob
+import hashlib
+import json
+import sqlite3
+import threading
+from array import array
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Iterator
+
+from .checkpoint import ARTIFACTS
+
+# Bump when signatures or bucket hashes change
+INDEX_FORMAT = 2
+
+# Characters per shingle; CJK trigrams carry most of a premise's identity
+SHINGLE_SIZE = 3
+
+# Signature length, split into BANDS bands of NUM_PERM // BANDS rows.
+# 16 bands of 4 rows make pairs above ~0.5 Jaccard likely to share a bucket.
+NUM_PERM = 64
+BANDS = 16
+ROWS = NUM_PERM // BANDS
+
+# Default estimated Jaccard similarity reported as a near-duplicate
+DEFAULT_THRESHOLD = 0.7
+
+# Files the dedupe command indexes in a pipeline output directory
+DEDUPE_PATTERNS = (
+    ARTIFACTS["spec"].format("*"),
+    ARTIFACTS["final"].format("*"),
+)
+
+# Bits of a shingle hash left for its value once the bin is taken off
+_VALUE_BITS = 64 - (NUM_PERM - 1).bit_length()
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS docs (
+    id INTEGER PRIMARY KEY,
+    key TEXT NOT NULL UNIQUE,
+    kind TEXT NOT NULL,
+    signature BLOB NOT NULL
+);
+CREATE TABLE IF NOT EXISTS buckets (
+    band INTEGER NOT NULL,
+    bucket INTEGER NOT NULL,
+    doc INTEGER NOT NULL REFERENCES docs(id) ON DELETE CASCADE
+);
+CREATE INDEX IF NOT EXISTS buckets_lookup ON buckets (band, bucket);
+CREATE INDEX IF NOT EXISTS buckets_doc ON buckets (doc);
+"""
+
+
+@dataclass
+class Match:
+    """An indexed document similar to the query."""
+    key: str
+    kind: str
+    similarity: float
+
+
+def premise_text(spec: dict[str, Any]) -> str:
+    """The parts of a SPEC that make its premise: theme, constraints, materials.
+
+    Formula stages come from shared templates, so they are left out.
+    """
+    parts = [str(spec.get("theme", "")), str(spec.get("constraints", ""))]
+    for material in spec.get("injected_materials", []):
+        if isinstance(material, dict):
+            material = material.get("content", "")
+        parts.append(str(material))
+    return "\n".join(parts)
+
+
+def document_text(path: Path, content: str) -> tuple[str, str]:
+    """(kind, text to compare) for a SPEC or draft file's content."""
+    if path.suffix.lower() == ".json":
+        try:
+            spec = json.loads(content)
+        except ValueError:
+            spec = None
+        if isinstance(spec, dict):
+            return "spec", premise_text(spec)
+    return "draft", content
+
+
+def shingles(text: str, size: int = SHINGLE_SIZE) -> set[str]:
+    """Character shingles of the text with whitespace and punctuation removed."""
+    chars = "".join(char for char in text.lower() if char.isalnum())
+    if len(chars) <= size:
+        return {chars} if chars else set()
+    return {chars[i:i + size] for i in range(len(chars) - size + 1)}
+
+
+def _hash(shingle: str) -> int:
+    digest = hashlib.blake2b(shingle.encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "little")
+
+
+def signature(text: str) -> array | None:
+    """MinHash signature of the text, or None if it has no shingles.
+
+    Each shingle is hashed once (one-permutation hashing): the low bits of
+    the hash pick one of NUM_PERM bins, the rest is its value, and every bin
+    keeps its minimum. An empty bin takes the next filled bin's value tagged
+    with the distance, so short texts still get a full signature whose
+    equal positions estimate Jaccard similarity.
+    """
+    texts = shingles(text)
+    if not texts:
+        return None
+    empty = 1 << _VALUE_BITS
+    bins = [empty] * NUM_PERM
+    for h in map(_hash, texts):
+        index = h % NUM_PERM
+        value = h >> (64 - _VALUE_BITS)
+        if value < bins[index]:
+            bins[index] = value
+    sig = array("Q", bytes(8 * NUM_PERM))
+    for index in range(NUM_PERM):
+        distance = 0
+        while bins[(index + distance) % NUM_PERM] == empty:
+            distance += 1
+        sig[index] = bins[(index + distance) % NUM_PERM] | (distance << _VALUE_BITS)
+    return sig
+
+
+def similarity(left: array, right: array) -> float:
+    """Estimated Jaccard similarity of two signatures."""
+    return sum(x == y for x, y in zip(left, right)) / len(left)
+
+
+def band_buckets(sig: array) -> list[tuple[int, int]]:
+    """(band, bucket) pairs of a signature for the LSH tables."""
+    buckets = []
+    for band in range(BANDS):
+        rows = sig[band * ROWS:(band + 1) * ROWS].tobytes()
+        digest = hashlib.blake2b(rows, digest_size=8).digest()
+        buckets.append((band, int.from_bytes(digest, "little", signed=True)))
+    return buckets
+
+
+class DedupeIndex:
+    """Persistent MinHash/LSH index in a SQLite file.
+
+    Documents are keyed by a caller-chosen string (the dedupe command uses
+    resolved file paths); adding a key again replaces its signature.
+    ``revision`` grows with every change, so cached audits that consulted
+    the index can tell when it moved on.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(self.path, check_same_thread=False)
+        self._db.execute("PRAGMA foreign_keys = ON")
+        self._lock = threading.Lock()
+        with self._db:
+            self._db.executescript(SCHEMA)
+            params = self._params()
+            stored = dict(self._db.execute("SELECT key, value FROM meta"))
+            if "params" not in stored:
+                self._db.execute("INSERT INTO meta VALUES ('params', ?)", (params,))
+                self._db.execute("INSERT INTO meta VALUES ('revision', '0')")
+                stored["params"] = params
+        if stored["params"] != params:
+            self._db.close()
+            raise ValueError(
+                f"Dedupe index {self.path} was built with other parameters; "
+                "delete it and rebuild it with 'maze dedupe'"
+            )
+
+    @staticmethod
+    def _params() -> str:
+        return json.dumps({
+            "format": INDEX_FORMAT, "shingle": SHINGLE_SIZE, "perm": NUM_PERM, "bands": BANDS,
+        })
+
+    @property
+    def revision(self) -> int:
+        with self._lock:
+            (value,) = self._db.execute("SELECT value FROM meta WHERE key = 'revision'").fetchone()
+        return int(value)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM docs").fetchone()[0]
+
+    def add(self, key: str, text: str, kind: str = "draft") -> bool:
+        """Index a document; returns False if it has no text to compare."""
+        sig = signature(text)
+        if sig is None:
+            return False
+        with self._lock, self._db:
+            self._db.execute("DELETE FROM docs WHERE key = ?", (key,))
+            doc = self._db.execute(
+                "INSERT INTO docs (key, kind, signature) VALUES (?, ?, ?)",
+                (key, kind, sig.tobytes()),
+            ).lastrowid
+            self._db.executemany(
+                "INSERT INTO buckets (band, bucket, doc) VALUES (?, ?, ?)",
+                [(band, bucket, doc) for band, bucket in band_buckets(sig)],
+            )
+            self._db.execute(
+                "UPDATE meta SET value = CAST(value AS INTEGER) + 1 WHERE key = 'revision'"
+            )
+        return True
+
+    def query(
+        self,
+        text: str,
+        kind: str | None = None,
+        threshold: float = DEFAULT_THRESHOLD,
+        exclude: str | None = None,
+        limit: int = 10,
+    ) -> list[Match]:
+        """Indexed documents at least ``threshold`` similar, most similar first.
+
+        Only documents sharing an LSH bucket with the text are compared.
+        """
+        sig = signature(text)
+        if sig is None:
+            return []
+        buckets = band_buckets(sig)
+        clause = " OR ".join(["(band = ? AND bucket = ?)"] * len(buckets))
+        params = [value for pair in buckets for value in pair]
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT key, kind, signature FROM docs WHERE id IN "
+                f"(SELECT doc FROM buckets WHERE {clause})",
+                params,
+            ).fetchall()
+
+        matches = []
+        for key, doc_kind, blob in rows:
+            if key == exclude or (kind is not None and doc_kind != kind):
+                continue
+            score = similarity(sig, array("Q", blob))
+            if score >= threshold:
+                matches.append(Match(key, doc_kind, score))
+        matches.sort(key=lambda match: (-match.similarity, match.key))
+        return matches[:limit]
+
+    def close(self) -> None:
+        self._db.close()
+
+    def __enter__(self) -> "DedupeIndex":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+def iter_corpus(target: str, patterns: tuple[str, ...] = DEDUPE_PATTERNS) -> Iterator[Path]:
+    """Files named by a target: a file, every glob match, or a directory's
+    files matching any of ``patterns``."""
+    from .batch import iter_targets
+
+    if not Path(target).is_dir():
+        yield from iter_targets(target) if glob.has_magic(target) else [Path(target)]
+        return
+    for path in iter_targets(target, "*"):
+        if any(path.match(pattern) for pattern in patterns):
+            yield path
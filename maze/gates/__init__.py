@@ -1,7 +1,39 @@
-"""Gates module for the 3-Gate Protocol."""
+"""Gates module for the 3-Gate Protocol.
 
-from .idea import IdeaGate, GateResult
-from .quality import QualityGate
-from .safety import SafetyGate
+Gate classes are imported on first access, so importing one gate module
+does not load the others.
+"""
 
-__all__ = ["IdeaGate", "QualityGate", "SafetyGate", "GateResult"]
+import importlib
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from .idea import IdeaGate, GateResult
+    from .quality import QualityGate
+    from .safety import SafetyGate
+    from .fused import FusedAudit, select_gates
+
+# Public name -> submodule defining it
+_EXPORTS = {
+    "IdeaGate": ".idea",
+    "GateResult": ".idea",
+    "QualityGate": ".quality",
+    "SafetyGate": ".safety",
+    "FusedAudit": ".fused",
+    "select_gates": ".fused",
+}
+
+__all__ = ["IdeaGate", "QualityGate", "SafetyGate", "GateResult", "FusedAudit", "select_gates"]
+
+
+def __getattr__(name: str) -> Any:
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> list[str]:
+    return sorted(set(globals()) | set(__all__))
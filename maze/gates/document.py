@@ -0,0 +1,137 @@
+"""Document facts shared by the gates of one audit."""
+
+import re
+from array import array
+from dataclasses import dataclass
+from itertools import accumulate
+
+from ..matcher import Segmenter
+
+# Runs of CJK ideographs; their characters are the draft's word count
+CJK_RUN = re.compile(r"[\u4e00-\u9fff]+")
+
+# Characters per block of a density profile
+PROFILE_BLOCK = 32
+
+
+def count_cjk(text: str, pos: int = 0, endpos: int | None = None) -> int:
+    """Number of CJK ideographs in ``text[pos:endpos]``."""
+    part = text[pos:endpos]
+    return len(part) - len(CJK_RUN.sub("", part))
+
+
+@dataclass
+class DensityProfile:
+    """Prefix sums of CJK characters and lexicon words per block of text.
+
+    Offsets are resolved to whole blocks, so any range count is O(1) and a
+    full sliding-window sweep is O(n / block).
+    """
+    block: int
+    length: int
+    cjk: array
+    hits: array
+
+    @property
+    def blocks(self) -> int:
+        return len(self.cjk) - 1
+
+    def block_of(self, offset: int) -> int:
+        """Nearest block boundary to a character offset."""
+        return min(self.blocks, (offset + self.block // 2) // self.block)
+
+    def count(self, start_block: int, end_block: int) -> tuple[int, int]:
+        """(CJK characters, lexicon words) in a range of blocks."""
+        return (
+            self.cjk[end_block] - self.cjk[start_block],
+            self.hits[end_block] - self.hits[start_block],
+        )
+
+
+class ProfileBuilder:
+    """Accumulates per-block counts in document order."""
+
+    def __init__(self, block: int = PROFILE_BLOCK) -> None:
+        self.block = block
+        self.cjk = array("q")
+        self.hits = array("q")
+
+    def _grow(self, index: int) -> None:
+        if index >= len(self.cjk):
+            extra = index + 1 - len(self.cjk)
+            self.cjk.extend([0] * extra)
+            self.hits.extend([0] * extra)
+
+    def add_cjk(self, start: int, end: int) -> None:
+        """Record a run of CJK characters at ``[start, end)``."""
+        while start < end:
+            index = start // self.block
+            stop = min(end, (index + 1) * self.block)
+            self._grow(index)
+            self.cjk[index] += stop - start
+            start = stop
+
+    def add_hit(self, offset: int) -> None:
+        """Record a lexicon word starting at ``offset``."""
+        index = offset // self.block
+        self._grow(index)
+        self.hits[index] += 1
+
+    def finish(self, length: int) -> DensityProfile:
+        """Turn the block counts into prefix sums over ``length`` characters."""
+        if length:
+            self._grow(-(-length // self.block) - 1)
+        return DensityProfile(
+            block=self.block,
+            length=length,
+            cjk=array("q", accumulate(self.cjk, initial=0)),
+            hits=array("q", accumulate(self.hits, initial=0)),
+        )
+
+
+class Document:
+    """Text-derived facts the gates need beyond their rule hits.
+
+    An in-memory audit builds one from the full text and derives the rest on
+    demand; the streaming audit fills the facts in chunk by chunk and only
+    keeps ``text`` for small documents that may be JSON.
+    """
+
+    def __init__(
+        self,
+        text: str | None = None,
+        length: int | None = None,
+        cjk_chars: int | None = None,
+        lexicon_hits: int | None = None,
+        profile: DensityProfile | None = None,
+    ) -> None:
+        self.text = text
+        self.length = length if length is not None else len(text or "")
+        self._cjk_chars = cjk_chars
+        self._lexicon_hits = lexicon_hits
+        self._profile = profile
+
+    @property
+    def cjk_chars(self) -> int:
+        """Number of CJK ideographs in the document."""
+        if self._cjk_chars is None:
+            self._cjk_chars = count_cjk(self.text or "")
+        return self._cjk_chars
+
+    def lexicon_hits(self, segmenter: Segmenter) -> int:
+        """Number of lexicon words found by maximum-match segmentation."""
+        if self._lexicon_hits is None:
+            self._lexicon_hits = segmenter.count(self.text or "")
+        return self._lexicon_hits
+
+    def profile(self, segmenter: Segmenter) -> DensityProfile:
+        """Per-block CJK and lexicon counts for positional analysis."""
+        if self._profile is None:
+            text = self.text or ""
+            builder = ProfileBuilder()
+            for match in CJK_RUN.finditer(text):
+                builder.add_cjk(match.start(), match.end())
+            for start, _ in segmenter.iter_spans(text):
+                builder.add_hit(start)
+            self._profile = builder.finish(self.length)
+        return self._profile
@@ -0,0 +1,175 @@
+"""Fused single-pass audit across several gates."""
+
+from pathlib import Path
+from typing import Any, Sequence
+
+from .. import metrics
+from ..library.loader import ResourceLoader
+from ..matcher import KeywordHit, MatchReport, RuleScanner, get_scanner
+from ..rules import SECTIONS, RulePack
+from .document import Document
+
+
+def select_gates(
+    loader: ResourceLoader,
+    gate: str = "all",
+    positional: bool = False,
+    formula: str | None = None,
+    dedupe_index: str | None = None,
+) -> list[Any]:
+    """Instantiate the gates named by an audit ``--gate`` choice.
+
+    ``positional`` and ``formula`` configure the quality gate's positional
+    analysis mode; ``dedupe_index`` enables the idea gate's near-duplicate
+    check. Only the modules of the selected gates are imported.
+    """
+    gates: list[Any] = []
+    if gate in ("idea", "all"):
+        from .idea import IdeaGate
+        gates.append(IdeaGate(loader, dedupe_index=dedupe_index))
+    if gate in ("quality", "all"):
+        from .quality import QualityGate
+        gates.append(QualityGate(loader, positional=positional, formula=formula))
+    if gate in ("safety", "all"):
+        from .safety import SafetyGate
+        gates.append(SafetyGate(loader))
+    return gates
+
+
+def hit_record(hit: KeywordHit) -> dict[str, Any]:
+    """JSON form of one rule hit."""
+    return {"start": hit.start, "end": hit.end, "category": hit.category, "keyword": hit.keyword}
+
+
+class FusedAudit:
+    """Runs the audits of several gates off one shared rule scan.
+
+    The keyword and pattern rules of every gate are compiled into a single
+    scanner, the draft is scanned once, and each gate builds its result from
+    the hits that belong to it. Results are identical to calling each gate's
+    ``audit`` in turn, except that each result's ``metrics["hits"]`` lists
+    the offsets of the gate's rule hits, and ``metrics["hits_omitted"]``
+    counts any a bounded streaming scan did not keep.
+    """
+
+    def __init__(self, gates: Sequence[Any]) -> None:
+        self.gates = list(gates)
+        self._scanner: RuleScanner | None = None
+        self._rules_digest: str | None = None
+        # Hit categories are prefixed with the gate's index, or with its rule
+        # pack section when the pack's precompiled scanner is used.
+        self._prefixes = {str(index): index for index in range(len(self.gates))}
+        for index, gate in enumerate(self.gates):
+            self._prefixes.setdefault(getattr(gate, "RULE_SECTION", ""), index)
+
+    @property
+    def scanner(self) -> RuleScanner:
+        """The combined scanner, rebuilt only when the rule pack changes."""
+        pack = getattr(self.loader, "rules", None)
+        digest = pack.digest if isinstance(pack, RulePack) else None
+        if self._scanner is None or digest != self._rules_digest:
+            self._scanner = self._compile(pack if digest else None)
+            self._rules_digest = digest
+        return self._scanner
+
+    def _compile(self, pack: RulePack | None) -> RuleScanner:
+        """The pack's precompiled scanner if these gates use exactly its
+        rules, else a scanner for just these gates' rules."""
+        sections = [getattr(gate, "RULE_SECTION", None) for gate in self.gates]
+        if pack is not None and sorted(sections) == sorted(SECTIONS):
+            scanner = pack.compiled()
+            if all(
+                pack.rules[section] == (gate.keyword_rules(), gate.pattern_rules())
+                for section, gate in zip(sections, self.gates)
+            ):
+                return scanner
+
+        keywords: dict[str, list[str]] = {}
+        folded: dict[str, list[str]] = {}
+        patterns: list[tuple[str, str, int]] = []
+        for index, gate in enumerate(self.gates):
+            target = folded if getattr(gate, "FOLD_KEYWORDS", False) else keywords
+            for category, words in gate.keyword_rules().items():
+                target[f"{index}:{category}"] = words
+            for category, pattern, flags in gate.pattern_rules():
+                patterns.append((f"{index}:{category}", pattern, flags))
+        return get_scanner(keywords, patterns, folded)
+
+    @property
+    def loader(self) -> ResourceLoader | None:
+        """The library loader the gates were built from."""
+        return self.gates[0].loader if self.gates else None
+
+    @property
+    def positional(self) -> bool:
+        """Whether any gate needs a positional density profile."""
+        return any(getattr(gate, "positional", False) for gate in self.gates)
+
+    def scan(self, content: str) -> list[MatchReport]:
+        """Scan once and split the hits into one report per gate."""
+        return self.split(self.scanner.scan(content))
+
+    def split(self, report: MatchReport) -> list[MatchReport]:
+        """Split a combined report into one report per gate."""
+        prefixes = self._prefixes
+        reports = [MatchReport() for _ in self.gates]
+        for hit in report.hits:
+            prefix, _, category = hit.category.partition(":")
+            reports[prefixes[prefix]].hits.append(
+                KeywordHit(hit.start, hit.end, hit.keyword, category)
+            )
+        for (full, keyword), count in report.omitted.items():
+            prefix, _, category = full.partition(":")
+            reports[prefixes[prefix]].omitted[category, keyword] = count
+        return reports
+
+    def audit(self, content: str, path: Path) -> list[Any]:
+        """Audit content with every gate, returning results in gate order."""
+        with metrics.timer("scan", mode="memory"):
+            report = self.scanner.scan(content)
+        registry = metrics.active()
+        if registry is not None and registry.rule_timing:
+            self.time_rules(content)
+        return self.audit_document(report, Document(content), path)
+
+    def audit_document(self, report: MatchReport, document: Document, path: Path) -> list[Any]:
+        """Build every gate's result from a combined report and shared document.
+
+        Each gate's ``gate`` timer covers only its own work here; the shared
+        scan that produced ``report`` is timed once, as ``scan``.
+        """
+        results = []
+        for gate, gate_report in zip(self.gates, self.split(report)):
+            if metrics.active() is not None:
+                for hit in gate_report.hits:
+                    metrics.count("rule_hits", gate=gate.name, category=hit.category,
+                                  rule=hit.keyword)
+                for (category, keyword), count in gate_report.omitted.items():
+                    metrics.count("rule_hits", count, gate=gate.name, category=category,
+                                  rule=keyword)
+            with metrics.timer("gate", gate=gate.name):
+                result = gate.audit_document(gate_report, document, path)
+            result.metrics["hits"] = [hit_record(hit) for hit in gate_report.hits]
+            if gate_report.omitted:
+                result.metrics["hits_omitted"] = sum(gate_report.omitted.values())
+            results.append(result)
+        return results
+
+    def time_rules(self, content: str) -> None:
+        """Time each keyword category and pattern rule on its own.
+
+        The shared scan cannot attribute time to single rules, so this runs
+        one extra scan per rule; it is only done when rule timing is on.
+        """
+        for gate in self.gates:
+            for category, words in gate.keyword_rules().items():
+                if getattr(gate, "FOLD_KEYWORDS", False):
+                    scanner = get_scanner({}, folded={category: words})
+                else:
+                    scanner = get_scanner({category: words})
+                with metrics.timer("rule", gate=gate.name, rule=category):
+                    scanner.scan(content)
+            for category, pattern, flags in gate.pattern_rules():
+                scanner = get_scanner({}, [(category, pattern, flags)])
+                with metrics.timer("rule", gate=gate.name, rule=pattern):
+                    scanner.scan(content)
@@ -1,10 +1,17 @@
 """Gate 1: Idea Generation and Validation."""
 
+import random
+import threading
+from collections import OrderedDict
 from dataclasses import dataclass
 from pathlib import Path
 from typing import Any
 
+from .. import metrics
 from ..library.loader import ResourceLoader
+from ..matcher import MatchReport, get_scanner
+from ..rules import RuleTable
+from .document import Document
 
 
 @dataclass
@@ -13,10 +20,13 @@ class GateResult:
     passed: bool
     content: str = ""
     issues: list[str] = None
+    metrics: dict[str, Any] = None
 
     def __post_init__(self) -> None:
         if self.issues is None:
             self.issues = []
+        if self.metrics is None:
+            self.metrics = {}
 
 
 class IdeaGate:
@@ -24,35 +34,110 @@ class IdeaGate:
 
     name = "Gate 1 - Idea (创意核审)"
 
-    def __init__(self, loader: ResourceLoader) -> None:
+    # Rule pack section holding this gate's tables (see maze.rules)
+    RULE_SECTION = "idea"
+
+    # Keywords a SPEC or idea document must not contain
+    AUDIT_PROHIBITED = RuleTable(["AI", "人工智能", "人工智慧", "大模型"])
+
+    # Keywords the constraints given to generate() must not contain
+    CONSTRAINT_PROHIBITED = RuleTable(["AI", "人工智能", "人工智慧", "大模型", "ChatGPT", "Claude"])
+
+    # Keywords are matched on normalized text (see maze.normalize)
+    FOLD_KEYWORDS = True
+
+    # Match category for the prohibited keywords
+    PROHIBITED_CATEGORY = "prohibited"
+
+    # Near-duplicates listed per audited document
+    MAX_DUPLICATES = 3
+
+    # Seeded SPECs remembered per process
+    SPEC_CACHE_SIZE = 256
+
+    def __init__(
+        self,
+        loader: ResourceLoader,
+        dedupe_index: Path | str | None = None,
+        dedupe_threshold: float | None = None,
+    ) -> None:
         self.loader = loader
+        self.dedupe_index = str(dedupe_index) if dedupe_index else None
+        self.dedupe_threshold = dedupe_threshold
+        self._index = None
+        if self.dedupe_index:
+            from ..dedupe import DEFAULT_THRESHOLD, DedupeIndex
+            self._index = DedupeIndex(Path(self.dedupe_index))
+            if self.dedupe_threshold is None:
+                self.dedupe_threshold = DEFAULT_THRESHOLD
 
     def generate(
         self,
         theme: str,
         constraints: str,
         formula: str = "auto",
+        seed: int | None = None,
     ) -> GateResult:
-        """Generate a story SPEC based on theme and constraints."""
+        """Generate a story SPEC based on theme and constraints.
+
+        With a ``seed`` the material sampling is reproducible: the same
+        request against the same library and rule pack always gives the same
+        SPEC, and repeats are served from an in-process LRU memo.
+        """
+        # Select formula
+        if formula == "auto":
+            formula = self._select_formula(theme)
+
+        if seed is None:
+            return self._generate(theme, constraints, formula, None)
+
+        key = (
+            theme, constraints, formula, seed,
+            str(self.loader.library_path), self.loader.snapshot.signature,
+            self.loader.rules.digest,
+        )
+        with _spec_lock:
+            cached = _spec_cache.get(key)
+            if cached is not None:
+                _spec_cache.move_to_end(key)
+        if cached is not None:
+            metrics.count("spec_cache_hits")
+            return _copy_result(cached)
+
+        rng = random.Random(f"{seed}\0{theme}\0{constraints}\0{formula}")
+        result = self._generate(theme, constraints, formula, rng, seed)
+        with _spec_lock:
+            _spec_cache[key] = _copy_result(result)
+            while len(_spec_cache) > self.SPEC_CACHE_SIZE:
+                _spec_cache.popitem(last=False)
+        return result
+
+    def _generate(
+        self,
+        theme: str,
+        constraints: str,
+        formula: str,
+        rng: random.Random | None,
+        seed: int | None = None,
+    ) -> GateResult:
+        """Build a SPEC, sampling materials from ``rng`` (or the global state)."""
         issues = []
 
         # Validate constraints
-        prohibited = ["AI", "人工智能", "大模型", "ChatGPT", "Claude"]
-        for word in prohibited:
-            if word.lower() in constraints.lower():
+        rules = {self.PROHIBITED_CATEGORY: self.CONSTRAINT_PROHIBITED}
+        found = get_scanner({}, folded=rules).scan(constraints).keywords(self.PROHIBITED_CATEGORY)
+        for word in self.CONSTRAINT_PROHIBITED:
+            if word in found:
                 issues.append(f"Prohibited keyword in constraints: {word}")
 
-        # Select formula
-        if formula == "auto":
-            formula = self._select_formula(theme)
-        elif formula not in self.loader.baits:
+        if formula not in self.loader.baits:
             issues.append(f"Unknown formula: {formula}")
             formula = "formula_cool"
 
         formula_data = self.loader.get_formula(formula)
 
         # Get random materials for injection
-        materials = self.loader.get_random_materials(3)
+        materials = self.loader.get_random_materials(3, rng)
 
         # Generate SPEC (simplified - in production, would call LLM)
         spec = {
@@ -65,6 +150,8 @@ class IdeaGate:
                 formula.replace("formula_", ""), []
             ),
         }
+        if seed is not None:
+            spec["seed"] = seed
 
         import json
         content = json.dumps(spec, ensure_ascii=False, indent=2)
@@ -77,18 +164,38 @@ class IdeaGate:
 
     def audit(self, content: str, path: Path) -> GateResult:
         """Audit an existing SPEC or idea document."""
+        return self.audit_document(self.scan(content), Document(content), path)
+
+    def scan(self, content: str) -> MatchReport:
+        """Locate prohibited keywords in a single pass over the content."""
+        return get_scanner({}, self.pattern_rules(), self.keyword_rules()).scan(content)
+
+    def keyword_rules(self) -> dict[str, list[str]]:
+        """Keyword lists by match category."""
+        return {self.PROHIBITED_CATEGORY: self.AUDIT_PROHIBITED}
+
+    def pattern_rules(self) -> list[tuple[str, str, int]]:
+        """Regex rules as (category, pattern, flags); idea uses keywords only."""
+        return []
+
+    def audit_document(
+        self, report: MatchReport, document: Document, path: Path
+    ) -> GateResult:
+        """Build the audit result from a finished rule scan."""
         issues = []
 
         # Check for prohibited content
-        prohibited = ["AI", "人工智能", "大模型"]
-        for word in prohibited:
-            if word in content:
+        found = report.keywords(self.PROHIBITED_CATEGORY)
+        for word in self.AUDIT_PROHIBITED:
+            if word in found:
                 issues.append(f"Contains prohibited keyword: {word}")
 
         # Check for required sections in SPEC
         import json
         try:
-            spec = json.loads(content)
+            if document.text is None:
+                raise json.JSONDecodeError("Document not held in memory", "", 0)
+            spec = json.loads(document.text)
             required = ["theme", "formula", "formula_stages"]
             for field in required:
                 if field not in spec:
@@ -96,20 +203,56 @@ class IdeaGate:
         except json.JSONDecodeError:
             issues.append("Invalid JSON format")
 
+        # Mutation Rule: flag premises and drafts too close to earlier ones
+        if self._index is not None and document.text is not None:
+            issues.extend(self._duplicate_issues(document.text, path))
+
         return GateResult(
             passed=len(issues) == 0,
             issues=issues,
         )
 
+    def cache_context(self, path: Path) -> str:
+        """What a cached audit of ``path`` depends on besides its content.
+
+        With a dedupe index the result depends on the file's own path (it is
+        excluded from the matches) and on the index as it is now, so both are
+        part of the cache key; see :class:`~maze.cache.AuditCache`.
+        """
+        if self._index is None:
+            return ""
+        return f"{path.resolve()}\0{self._index.revision}"
+
+    def _duplicate_issues(self, content: str, path: Path) -> list[str]:
+        """Near-duplicates of the content in the dedupe index, other than itself."""
+        from ..dedupe import document_text
+
+        kind, text = document_text(path, content)
+        matches = self._index.query(
+            text, kind, self.dedupe_threshold, exclude=str(path.resolve()),
+            limit=self.MAX_DUPLICATES,
+        )
+        return [
+            f"Near-duplicate {kind} of {match.key} (similarity {match.similarity:.2f})"
+            for match in matches
+        ]
+
     def _select_formula(self, theme: str) -> str:
-        """Auto-select formula based on theme keywords."""
-        theme_lower = theme.lower()
+        """Auto-select formula by scoring the theme against each formula's triggers."""
+        return self.loader.formula_selector.select(theme)
+
+
+# Seeded SPECs by request and library version, least recently used first
+_spec_cache: "OrderedDict[tuple, GateResult]" = OrderedDict()
+_spec_lock = threading.Lock()
+
+
+def _copy_result(result: GateResult) -> GateResult:
+    """A copy callers can modify without touching the memo."""
+    return GateResult(result.passed, result.content, list(result.issues), dict(result.metrics))
 
-        if any(w in theme_lower for w in ["甜", "爱", "恋", "甜宠"]):
-            return "formula_sweet"
-        if any(w in theme_lower for w in ["悔", "遗憾", "错", "救"]):
-            return "formula_regret"
-        if any(w in theme_lower for w in ["电竞", "比赛", "逆", "胜"]):
-            return "formula_esports"
 
-        return "formula_cool"
+def clear_spec_cache() -> None:
+    """Forget every memoized SPEC."""
+    with _spec_lock:
+        _spec_cache.clear()
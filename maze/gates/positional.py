@@ -0,0 +1,91 @@
+"""Positional analysis: formula stages, the ending, and sliding windows."""
+
+import re
+from dataclasses import dataclass
+from typing import Any
+
+from .document import DensityProfile
+
+# A stage ``range`` field such as "80-95%"
+STAGE_RANGE = re.compile(r"^\s*(\d+(?:\.\d+)?)\s*-\s*(\d+(?:\.\d+)?)\s*%\s*$")
+
+
+@dataclass
+class Window:
+    """Lexicon density over a span of the document."""
+    start: int
+    end: int
+    cjk_chars: int
+    lexicon_hits: int
+    per: int
+
+    @property
+    def density(self) -> float:
+        if not self.cjk_chars:
+            return 0.0
+        return self.lexicon_hits * self.per / self.cjk_chars
+
+
+def parse_range(value: str) -> tuple[float, float]:
+    """Fractions of the document covered by a range like ``"80-95%"``."""
+    match = STAGE_RANGE.match(value)
+    if match is None:
+        raise ValueError(f"Invalid stage range: {value!r}")
+    low, high = float(match.group(1)) / 100, float(match.group(2)) / 100
+    if not 0 <= low <= high <= 1:
+        raise ValueError(f"Invalid stage range: {value!r}")
+    return low, high
+
+
+def stage_offsets(stages: list[dict[str, Any]], length: int) -> list[tuple[str, str, int, int]]:
+    """Map each formula stage to ``(name, range, start, end)`` character offsets.
+
+    Stages without a ``range`` field are skipped.
+    """
+    spans = []
+    for stage in stages:
+        if "range" not in stage:
+            continue
+        low, high = parse_range(stage["range"])
+        spans.append((stage["name"], stage["range"], round(length * low), round(length * high)))
+    return spans
+
+
+def window_at(profile: DensityProfile, start: int, end: int, per: int) -> Window:
+    """Density over the blocks nearest to ``[start, end)``."""
+    first, last = profile.block_of(start), profile.block_of(end)
+    cjk_chars, hits = profile.count(first, last)
+    return Window(start, end, cjk_chars, hits, per)
+
+
+def weakest_window(profile: DensityProfile, size: int) -> Window | None:
+    """Sliding window of ``size`` characters with the lowest lexicon density.
+
+    The window moves one block at a time and each step reads two prefix
+    sums, so the sweep is linear in the document length. Windows without
+    CJK text are skipped; a document shorter than ``size`` is one window.
+    """
+    span = max(1, round(size / profile.block))
+    blocks = profile.blocks
+    if blocks <= span:
+        window = Window(0, profile.length, *profile.count(0, blocks), size)
+        return window if window.cjk_chars else None
+
+    cjk, hits = profile.cjk, profile.hits
+    best = None
+    best_key = None
+    for first in range(blocks - span + 1):
+        last = first + span
+        cjk_chars = cjk[last] - cjk[first]
+        if not cjk_chars:
+            continue
+        # Compare hits/cjk ratios without dividing
+        count = hits[last] - hits[first]
+        if best_key is None or count * best_key[1] < best_key[0] * cjk_chars:
+            best_key = (count, cjk_chars)
+            best = first
+    if best is None:
+        return None
+    start = best * profile.block
+    end = min(profile.length, (best + span) * profile.block)
+    return Window(start, end, best_key[1], best_key[0], size)
@@ -6,6 +6,10 @@ from pathlib import Path
 from typing import Any
 
 from ..library.loader import ResourceLoader
+from ..matcher import MatchReport, get_scanner
+from ..rules import RuleTable
+from .document import Document
+from .positional import stage_offsets, weakest_window, window_at
 
 
 @dataclass
@@ -14,10 +18,13 @@ class GateResult:
     passed: bool
     content: str = ""
     issues: list[str] = None
+    metrics: dict[str, Any] = None
 
     def __post_init__(self) -> None:
         if self.issues is None:
             self.issues = []
+        if self.metrics is None:
+            self.metrics = {}
 
 
 class QualityGate:
@@ -25,20 +32,27 @@ class QualityGate:
 
     name = "Gate 2 - Quality (质量检测)"
 
-    # Minimum lexicon density threshold
-    MIN_LEXICON_DENSITY = 0.005  # 0.5%
+    # Rule pack section holding this gate's tables (see maze.rules)
+    RULE_SECTION = "quality"
+
+    # Minimum lexicon density: 3 lexicon words per 500 characters
+    LEXICON_DENSITY_WINDOW = 500
+    MIN_LEXICON_DENSITY = 3
 
     # Forbidden patterns
-    FORBIDDEN_PATTERNS = [
+    FORBIDDEN_PATTERNS = RuleTable([
         (r"^#{1,6}\s+", "Markdown headers"),
         (r"第[一二三四五六七八九十百千]+章", "Chapter markers"),
         (r"第[一二三四五六七八九十百千]+节", "Section markers"),
         (r"\d+%\s*$", "Progress markers"),
         (r"^\s*\[\d+\]\s+", "Reference markers"),
-    ]
+    ])
+
+    # Positional mode only checks explanatory phrases in this final fraction
+    EXPLANATORY_TAIL = 0.1
 
     # Required at 90% - no explanatory phrases
-    EXPLANATORY_PATTERNS = [
+    EXPLANATORY_PATTERNS = RuleTable([
         r"因为",
         r"所以",
         r"于是",
@@ -47,10 +61,21 @@ class QualityGate:
         r"真相是",
         r"其实",
         r"也就是说",
-    ]
-
-    def __init__(self, loader: ResourceLoader) -> None:
+    ])
+
+    # Match categories for the pattern tables
+    FORBIDDEN_CATEGORY = "forbidden"
+    EXPLANATORY_CATEGORY = "explanatory"
+
+    def __init__(
+        self,
+        loader: ResourceLoader,
+        positional: bool = False,
+        formula: str | None = None,
+    ) -> None:
         self.loader = loader
+        self.positional = positional
+        self.formula = formula
 
     def generate(self, spec_content: str) -> GateResult:
         """Generate a draft from SPEC (simplified - would call LLM in production)."""
@@ -67,37 +92,156 @@ class QualityGate:
 
         return GateResult(passed=True, content=draft, issues=[])
 
+    def draft_prompt(self, spec_content: str) -> str:
+        """Prompt asking a generation backend to write the draft for a SPEC."""
+        return (
+            "根据以下 SPEC 按 formula_stages 写出完整故事草稿。"
+            "不要使用章节标记、Markdown 标题或结尾解释。\n\n"
+            f"{spec_content}"
+        )
+
+    async def generate_async(self, spec_content: str, backend: Any) -> GateResult:
+        """Generate a draft from SPEC through an async generation backend."""
+        from ..backend import BackendError
+
+        try:
+            draft = await backend.complete(self.draft_prompt(spec_content))
+        except BackendError as e:
+            return GateResult(passed=False, issues=[f"Generation backend failed: {e}"])
+        return GateResult(passed=True, content=draft, issues=[])
+
     def audit(self, content: str, path: Path) -> GateResult:
         """Audit a draft for quality and format compliance."""
+        return self.audit_document(self.scan(content), Document(content), path)
+
+    def scan(self, content: str) -> MatchReport:
+        """Match every format and explanatory pattern in one pass."""
+        return get_scanner(self.keyword_rules(), self.pattern_rules()).scan(content)
+
+    def keyword_rules(self) -> dict[str, list[str]]:
+        """Keyword lists by match category; quality uses patterns only."""
+        return {}
+
+    def pattern_rules(self) -> list[tuple[str, str, int]]:
+        """Regex rules as (category, pattern, flags)."""
+        rules = [
+            (self.FORBIDDEN_CATEGORY, pattern, re.MULTILINE)
+            for pattern, _ in self.FORBIDDEN_PATTERNS
+        ]
+        rules.extend(
+            (self.EXPLANATORY_CATEGORY, pattern, 0) for pattern in self.EXPLANATORY_PATTERNS
+        )
+        return rules
+
+    def audit_document(
+        self, report: MatchReport, document: Document, path: Path
+    ) -> GateResult:
+        """Build the audit result from a finished rule scan."""
         issues = []
 
         # Check format violations
-        for pattern, description in self.FORBIDDEN_PATTERNS:
-            if re.search(pattern, content, re.MULTILINE):
-                issues.append(f"Contains forbidden pattern: {description}")
+        issues.extend(self.format_issues(report))
+
+        if self.positional:
+            metrics = self._audit_positions(report, document, issues)
+            return GateResult(passed=len(issues) == 0, issues=issues, metrics=metrics)
 
         # Check lexicon density
-        lexicon_words = set()
-        for category in self.loader.lexicon.values():
-            lexicon_words.update(category)
-
-        words = set(re.findall(r"[\u4e00-\u9fff]+", content))
-        if words:
-            matched = words & lexicon_words
-            density = len(matched) / len(words)
+        if document.cjk_chars:
+            hits = document.lexicon_hits(self.loader.snapshot.segmenter)
+            density = hits * self.LEXICON_DENSITY_WINDOW / document.cjk_chars
             if density < self.MIN_LEXICON_DENSITY:
                 issues.append(
-                    f"Lexicon density too low: {density:.2%} "
-                    f"(minimum: {self.MIN_LEXICON_DENSITY:.1%})"
+                    f"Lexicon density too low: {density:.1f} per "
+                    f"{self.LEXICON_DENSITY_WINDOW} characters "
+                    f"(minimum: {self.MIN_LEXICON_DENSITY})"
                 )
 
-        # Check for explanatory language in final section
-        # (In production, would check last 10% only)
+        # Check for explanatory language anywhere in the draft
+        found = report.keywords(self.EXPLANATORY_CATEGORY)
         for pattern in self.EXPLANATORY_PATTERNS:
-            if re.search(pattern, content):
+            if pattern in found:
                 issues.append(f"Explanatory language found: '{pattern}'")
 
         return GateResult(
             passed=len(issues) == 0,
             issues=issues,
         )
+
+    def format_issues(self, report: MatchReport) -> list[str]:
+        """Forbidden format patterns found by a scan, in rule-table order."""
+        found = report.keywords(self.FORBIDDEN_CATEGORY)
+        return [
+            f"Contains forbidden pattern: {description}"
+            for pattern, description in self.FORBIDDEN_PATTERNS
+            if pattern in found
+        ]
+
+    def score(self, report: MatchReport, document: Document) -> float:
+        """Quality score in [0, 1] for ranking candidate drafts.
+
+        A draft exactly at the minimum lexicon density with no explanatory
+        phrases scores 0.5; twice the minimum scores 1.0. Each explanatory
+        phrase divides the score, and any format violation zeroes it.
+        """
+        if self.format_issues(report) or not document.cjk_chars:
+            return 0.0
+        hits = document.lexicon_hits(self.loader.snapshot.segmenter)
+        density = hits * self.LEXICON_DENSITY_WINDOW / document.cjk_chars
+        score = min(density / (2 * self.MIN_LEXICON_DENSITY), 1.0)
+        return score / (1 + report.counts.get(self.EXPLANATORY_CATEGORY, 0))
+
+    def _audit_positions(
+        self, report: MatchReport, document: Document, issues: list[str]
+    ) -> dict[str, Any]:
+        """Positional checks: the weakest density window and the ending.
+
+        Returns per-stage metrics for the formula, if one was given.
+        """
+        profile = document.profile(self.loader.snapshot.segmenter)
+        window = weakest_window(profile, self.LEXICON_DENSITY_WINDOW)
+        if window is not None and window.density < self.MIN_LEXICON_DENSITY:
+            issues.append(
+                f"Lexicon density too low at characters {window.start}-{window.end}: "
+                f"{window.density:.1f} per {self.LEXICON_DENSITY_WINDOW} characters "
+                f"(minimum: {self.MIN_LEXICON_DENSITY})"
+            )
+
+        tail_start = round(document.length * (1 - self.EXPLANATORY_TAIL))
+        explanatory = [
+            hit for hit in report.hits
+            if hit.category == self.EXPLANATORY_CATEGORY
+        ]
+        found = {hit.keyword for hit in explanatory if hit.start >= tail_start}
+        for pattern in self.EXPLANATORY_PATTERNS:
+            if pattern in found:
+                issues.append(f"Explanatory language in final section: '{pattern}'")
+
+        stages = []
+        formula = {}
+        if self.formula:
+            formula = self.loader.get_formula(self.formula) or self.loader.get_formula(
+                f"formula_{self.formula}"
+            )
+        for name, span, start, end in stage_offsets(formula.get("stages", []), document.length):
+            stage = window_at(profile, start, end, self.LEXICON_DENSITY_WINDOW)
+            stages.append({
+                "name": name,
+                "range": span,
+                "start": start,
+                "end": end,
+                "cjk_chars": stage.cjk_chars,
+                "lexicon_hits": stage.lexicon_hits,
+                "density": round(stage.density, 2),
+                "explanatory": sum(start <= hit.start < end for hit in explanatory),
+            })
+
+        return {
+            "tail_start": tail_start,
+            "weakest_window": None if window is None else {
+                "start": window.start,
+                "end": window.end,
+                "density": round(window.density, 2),
+            },
+            "stages": stages,
+        }
@@ -5,6 +5,9 @@ from pathlib import Path
 from typing import Any
 
 from ..library.loader import ResourceLoader
+from ..matcher import MatchReport, get_scanner
+from ..rules import RuleTable
+from .document import Document
 
 
 @dataclass
@@ -13,10 +16,13 @@ class GateResult:
     passed: bool
     content: str = ""
     issues: list[str] = None
+    metrics: dict[str, Any] = None
 
     def __post_init__(self) -> None:
         if self.issues is None:
             self.issues = []
+        if self.metrics is None:
+            self.metrics = {}
 
 
 class SafetyGate:
@@ -24,8 +30,11 @@ class SafetyGate:
 
     name = "Gate 3 - Safety (安全风控)"
 
+    # Rule pack section holding this gate's tables (see maze.rules)
+    RULE_SECTION = "safety"
+
     # Prohibited content categories
-    PROHIBITED_CATEGORIES = {
+    PROHIBITED_CATEGORIES = RuleTable({
         "extreme_violence": [
             "分尸", "肢解", "凌迟", "虐杀", "烹煮", "生吃",
         ],
@@ -38,58 +47,162 @@ class SafetyGate:
         "platform_restricted": [
             "中国", "领导人", "政治", "敏感",
         ],
-    }
+    })
 
     # Psychological safety warnings
-    PSYCHOLOGICAL_WARNINGS = [
+    PSYCHOLOGICAL_WARNINGS = RuleTable([
         "自杀", "自残", "安乐死", "抑郁症", "精神病",
-    ]
+    ])
+
+    # AI-related content (as specified in constraints)
+    AI_KEYWORDS = RuleTable(["AI", "人工智能", "人工智慧", "大模型", "ChatGPT", "Claude"])
+
+    # Keywords are matched on normalized text (see maze.normalize)
+    FOLD_KEYWORDS = True
+
+    # Match categories for the non-prohibited keyword lists
+    PSYCHOLOGICAL_CATEGORY = "psychological"
+    AI_CATEGORY = "ai_related"
+
+    # How review() rewrites each category's matches: MASK covers the span
+    # with MASK_CHAR, any other string replaces it, and None leaves it in
+    # place as a blocking issue that needs a new draft.
+    MASK = "mask"
+    MASK_CHAR = "*"
+    REDACTION_POLICY = RuleTable({
+        "extreme_violence": MASK,
+        "minors_involved": None,
+        "non_consent": None,
+        "platform_restricted": MASK,
+        PSYCHOLOGICAL_CATEGORY: MASK,
+        AI_CATEGORY: None,
+    })
 
     def __init__(self, loader: ResourceLoader) -> None:
         self.loader = loader
 
-    def review(self, content: str) -> GateResult:
-        """Review content for safety compliance."""
-        issues = self._scan_content(content)
-
-        if not issues:
-            return GateResult(passed=True, content=content)
+    def review(self, content: str, redact: bool = True) -> GateResult:
+        """Review content for safety compliance.
+
+        With ``redact``, matches in categories the redaction policy can
+        rewrite are masked or replaced, and only the remaining categories
+        fail the review. The revised text is the result's content and
+        ``metrics["changes"]`` logs every rewritten span.
+        """
+        report = self.scan(content)
+        if not redact:
+            issues = self._issues_from(report)
+            return GateResult(passed=not issues, content=content, issues=issues)
+
+        revised, changes = self.redact(content, report)
+        issues = self.blocking_issues(report)
+        return GateResult(
+            passed=not issues, content=revised, issues=issues, metrics={"changes": changes}
+        )
 
-        # Return content with safety revisions applied (simplified)
-        return GateResult(passed=False, content=content, issues=issues)
+    def blocking_issues(self, report: MatchReport) -> list[str]:
+        """Issues from the matches redaction cannot rewrite, as ``review`` reports them."""
+        return self._issues_from(MatchReport(hits=[
+            hit for hit in report.hits if self.REDACTION_POLICY.get(hit.category) is None
+        ]))
+
+    def redact(self, content: str, report: MatchReport) -> tuple[str, list[dict[str, Any]]]:
+        """Rewrite the policy's spans in one pass; return the text and change log.
+
+        Overlapping matches are merged into one span, rewritten by the policy
+        of its leftmost-longest match; the log then records the merged text
+        as the keyword. Change offsets refer to the original content.
+        """
+        hits = sorted(
+            (hit for hit in report.hits if self.REDACTION_POLICY.get(hit.category) is not None),
+            key=lambda hit: (hit.start, -hit.end),
+        )
+        spans = []
+        for hit in hits:
+            if spans and hit.start < spans[-1][1]:
+                first, end, _ = spans[-1]
+                if hit.end > end:
+                    spans[-1] = (first, hit.end, None)
+                continue
+            spans.append((hit, hit.end, hit.keyword))
+        if not spans:
+            return content, []
+
+        pieces = []
+        changes = []
+        pos = 0
+        for hit, end, keyword in spans:
+            action = self.REDACTION_POLICY[hit.category]
+            replacement = self.MASK_CHAR * (end - hit.start) if action == self.MASK else action
+            pieces.append(content[pos:hit.start])
+            pieces.append(replacement)
+            changes.append({
+                "start": hit.start,
+                "end": end,
+                "category": hit.category,
+                "keyword": content[hit.start:end] if keyword is None else keyword,
+                "replacement": replacement,
+            })
+            pos = end
+        pieces.append(content[pos:])
+        return "".join(pieces), changes
 
     def audit(self, content: str, path: Path) -> GateResult:
         """Audit content for safety issues."""
-        issues = self._scan_content(content)
+        return self.audit_document(self.scan(content), Document(content), path)
+
+    def audit_document(
+        self, report: MatchReport, document: Document, path: Path
+    ) -> GateResult:
+        """Build the audit result from a finished rule scan."""
+        issues = self._issues_from(report)
 
         return GateResult(
             passed=len(issues) == 0,
             issues=issues,
         )
 
+    def scan(self, content: str) -> MatchReport:
+        """Locate every safety keyword in a single pass over the content."""
+        return get_scanner({}, self.pattern_rules(), self.keyword_rules()).scan(content)
+
+    def pattern_rules(self) -> list[tuple[str, str, int]]:
+        """Regex rules as (category, pattern, flags); safety uses keywords only."""
+        return []
+
+    def keyword_rules(self) -> dict[str, list[str]]:
+        """Keyword lists by match category."""
+        rules = dict(self.PROHIBITED_CATEGORIES)
+        rules[self.PSYCHOLOGICAL_CATEGORY] = self.PSYCHOLOGICAL_WARNINGS
+        rules[self.AI_CATEGORY] = self.AI_KEYWORDS
+        return rules
+
     def _scan_content(self, content: str) -> list[str]:
         """Scan content for prohibited categories."""
+        return self._issues_from(self.scan(content))
+
+    def _issues_from(self, report: MatchReport) -> list[str]:
+        """Turn a match report into issues, in rule-table order."""
         issues = []
 
         # Check prohibited categories
         for category, keywords in self.PROHIBITED_CATEGORIES.items():
+            found = report.keywords(category)
             for keyword in keywords:
-                if keyword in content:
+                if keyword in found:
                     issues.append(f"Prohibited content ({category}): {keyword}")
 
         # Check psychological safety
-        warnings = []
-        for keyword in self.PSYCHOLOGICAL_WARNINGS:
-            if keyword in content:
-                warnings.append(keyword)
+        found = report.keywords(self.PSYCHOLOGICAL_CATEGORY)
+        warnings = [keyword for keyword in self.PSYCHOLOGICAL_WARNINGS if keyword in found]
 
         if warnings:
             issues.append(f"Psychological safety warnings: {', '.join(warnings)}")
 
         # Check for AI-related content (as specified in constraints)
-        ai_keywords = ["AI", "人工智能", "大模型", "ChatGPT", "Claude"]
-        for keyword in ai_keywords:
-            if keyword in content:
+        found = report.keywords(self.AI_CATEGORY)
+        for keyword in self.AI_KEYWORDS:
+            if keyword in found:
                 issues.append(f"AI-related content: {keyword}")
 
         return issues
@@ -0,0 +1,137 @@
+"""Theme-based formula selection from the trigger vocabulary in baits.json.
+
+Each formula may list the theme words that suggest it::
+
+    "formula_sweet": {"name": "...", "theme_triggers": {"甜宠": 2, "恋": 1}, ...}
+
+(a plain list gives every word a weight of 1; a formula without triggers
+is only chosen as the default). The selector inverts these
+into one keyword automaton over all formulas, so a theme is scored against
+every formula in a single pass, and a whole batch of themes in a single
+pass over their concatenation. Matching is on normalized text (see
+:mod:`maze.normalize`).
+"""
+
+from bisect import bisect_right
+from dataclasses import dataclass
+from typing import Any, Iterable, Mapping
+
+from ..matcher import FoldedMatcher
+
+# Formula chosen when no trigger matches (or the first formula, if absent)
+DEFAULT_FORMULA = "formula_cool"
+
+# Joins a batch of themes; it never occurs in a trigger, so no hit spans two
+SEPARATOR = "\0"
+
+
+@dataclass(frozen=True)
+class FormulaScore:
+    """A formula's score for one theme and the triggers that produced it."""
+    formula: str
+    score: float
+    triggers: tuple[str, ...] = ()
+
+
+class FormulaSelector:
+    """Ranks a library's formulas for themes by weighted trigger hits.
+
+    Every occurrence of a trigger adds its weight to each formula listing
+    it. Ties are broken by the formulas' order in baits.json.
+    """
+
+    def __init__(self, baits: Mapping[str, Any]) -> None:
+        self.formulas = list(baits)
+        self.default = (
+            DEFAULT_FORMULA if DEFAULT_FORMULA in baits or not self.formulas
+            else self.formulas[0]
+        )
+        self._order = {name: index for index, name in enumerate(self.formulas)}
+        # Inverted index: (trigger, formula) -> weight
+        self._weights: dict[tuple[str, str], float] = {}
+        rules: dict[str, list[str]] = {}
+        for name, data in baits.items():
+            for word, weight in _triggers(name, data.get("theme_triggers", [])).items():
+                if word and SEPARATOR not in word:
+                    rules.setdefault(name, []).append(word)
+                    self._weights[word, name] = weight
+        self._matcher = FoldedMatcher(rules)
+
+    def rank(self, theme: str) -> list[FormulaScore]:
+        """Every formula for one theme, best first."""
+        return self.rank_many([theme])[0]
+
+    def rank_many(self, themes: Iterable[str]) -> list[list[FormulaScore]]:
+        """Rank the formulas for each of a batch of themes in one scan."""
+        scores, matched = self._score(themes)
+        return [
+            self._ranked(theme_scores, theme_matched)
+            for theme_scores, theme_matched in zip(scores, matched)
+        ]
+
+    def _score(
+        self, themes: Iterable[str]
+    ) -> tuple[list[dict[str, float]], list[dict[str, list[str]]]]:
+        """Per theme, each matched formula's score and triggers."""
+        themes = [theme.replace(SEPARATOR, " ") for theme in themes]
+        starts = []
+        offset = 0
+        for theme in themes:
+            starts.append(offset)
+            offset += len(theme) + len(SEPARATOR)
+
+        scores: list[dict[str, float]] = [{} for _ in themes]
+        matched: list[dict[str, list[str]]] = [{} for _ in themes]
+        weights = self._weights
+        for hit in self._matcher.iter_hits(SEPARATOR.join(themes)):
+            index = bisect_right(starts, hit.start) - 1
+            theme_scores = scores[index]
+            theme_scores[hit.category] = (
+                theme_scores.get(hit.category, 0.0) + weights[hit.keyword, hit.category]
+            )
+            triggers = matched[index].setdefault(hit.category, [])
+            if hit.keyword not in triggers:
+                triggers.append(hit.keyword)
+        return scores, matched
+
+    def _ranked(
+        self, scores: dict[str, float], matched: dict[str, list[str]]
+    ) -> list[FormulaScore]:
+        order = self._order
+        ranked = sorted(self.formulas, key=lambda name: (-scores.get(name, 0.0), order[name]))
+        return [
+            FormulaScore(name, scores.get(name, 0.0), tuple(matched.get(name, ())))
+            for name in ranked
+        ]
+
+    def select(self, theme: str) -> str:
+        """Best formula for a theme, or the default if no trigger matches."""
+        return self.select_many([theme])[0]
+
+    def select_many(self, themes: Iterable[str]) -> list[str]:
+        """Best formula for each of a batch of themes."""
+        order = self._order
+        return [
+            min(theme_scores, key=lambda name: (-theme_scores[name], order[name]))
+            if theme_scores and max(theme_scores.values()) > 0 else self.default
+            for theme_scores in self._score(themes)[0]
+        ]
+
+
+def _triggers(formula: str, triggers: Any) -> dict[str, float]:
+    """A formula's triggers as word -> weight; raises ValueError if malformed."""
+    if isinstance(triggers, list) and all(isinstance(word, str) for word in triggers):
+        return dict.fromkeys(triggers, 1.0)
+    if not isinstance(triggers, Mapping):
+        raise ValueError(
+            f"theme_triggers of {formula} must be an object of weights or a list of words"
+        )
+    weights = {}
+    for word, weight in triggers.items():
+        if isinstance(weight, bool) or not isinstance(weight, (int, float)):
+            raise ValueError(
+                f"theme_triggers of {formula}: weight of {word!r} must be a number, "
+                f"not {weight!r}"
+            )
+        weights[word] = float(weight)
+    return weights
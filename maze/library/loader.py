@@ -1,47 +1,87 @@
 """Resource loader for narrative materials."""
 
-import json
+import time
 from pathlib import Path
-from typing import Any
+from typing import TYPE_CHECKING, Any
+
+from .snapshot import LibrarySnapshot, load_snapshot
+
+if TYPE_CHECKING:
+    import random
+
+    from ..rules import RulePack
+    from .formulas import FormulaSelector
 
 
 class ResourceLoader:
     """Loads and provides access to narrative resources."""
 
-    def __init__(self, library_path: Path | None = None) -> None:
+    def __init__(
+        self, library_path: Path | None = None, rule_pack: str | Path | None = None
+    ) -> None:
         self.library_path = library_path or Path(__file__).parent.parent.parent / "library"
-        self._baits: dict[str, Any] | None = None
-        self._lexicon: dict[str, list[str]] | None = None
-        self._materials: dict[str, Any] | None = None
+        self.rule_pack = rule_pack
+        self._snapshot: LibrarySnapshot | None = None
+        self._snapshot_expire = 0.0
+        self._rules: "RulePack | None" = None
+        self._rules_expire = 0.0
+
+    @property
+    def snapshot(self) -> LibrarySnapshot:
+        """The process-wide compiled library shared by all loaders.
+
+        Re-checked for changed resource files every few seconds, so
+        long-running processes pick up library edits.
+        """
+        now = time.monotonic()
+        if self._snapshot is None or now >= self._snapshot_expire:
+            from ..rules import RELOAD_INTERVAL
+
+            self._snapshot = load_snapshot(self.library_path)
+            self._snapshot_expire = now + RELOAD_INTERVAL
+        return self._snapshot
+
+    @property
+    def rules(self) -> "RulePack":
+        """The compiled rule pack, re-checked for changes every few seconds.
+
+        The pack is named by ``rule_pack``, else $MAZE_RULE_PACK, else
+        ``default`` (see :mod:`maze.rules`).
+        """
+        now = time.monotonic()
+        if self._rules is None or now >= self._rules_expire:
+            from ..rules import RELOAD_INTERVAL, load_rule_pack, rule_pack_path
+
+            self._rules = load_rule_pack(
+                rule_pack_path(self.library_path, self.rule_pack), self.library_path
+            )
+            self._rules_expire = now + RELOAD_INTERVAL
+        return self._rules
 
     @property
     def baits(self) -> dict[str, Any]:
         """Load and cache formula templates."""
-        if self._baits is None:
-            self._baits = self._load_json("baits.json")
-        return self._baits
+        return self.snapshot.baits
 
     @property
     def lexicon(self) -> dict[str, list[str]]:
         """Load and cache lexicon entries."""
-        if self._lexicon is None:
-            self._lexicon = self._load_json("lexicon.json")
-        return self._lexicon
+        return self.snapshot.lexicon
 
     @property
     def materials(self) -> dict[str, Any]:
         """Load and cache narrative materials."""
-        if self._materials is None:
-            self._materials = self._load_json("materials.json")
-        return self._materials
-
-    def _load_json(self, filename: str) -> dict[str, Any]:
-        """Load a JSON resource file."""
-        path = self.library_path / filename
-        if not path.exists():
-            return {}
-        with open(path, encoding="utf-8") as f:
-            return json.load(f)
+        return self.snapshot.materials
+
+    @property
+    def lexicon_words(self) -> frozenset[str]:
+        """Every lexicon word across all categories."""
+        return self.snapshot.lexicon_words
+
+    @property
+    def formula_selector(self) -> "FormulaSelector":
+        """Theme-to-formula ranking built from the formulas' triggers."""
+        return self.snapshot.formula_selector
 
     def get_lexicon_words(self, category: str) -> list[str]:
         """Get words from a specific lexicon category."""
@@ -51,8 +91,16 @@ class ResourceLoader:
         """Get a formula template by name."""
         return self.baits.get(name, {})
 
-    def get_random_materials(self, count: int = 3) -> list[str]:
-        """Get random materials for injection into SPEC."""
+    def get_random_materials(
+        self, count: int = 3, rng: "random.Random | None" = None
+    ) -> list[str]:
+        """Get random materials for injection into SPEC.
+
+        ``rng`` makes the sample reproducible; without one the global
+        :mod:`random` state is used.
+        """
         materials = self.materials.get("lock_memes", [])
-        import random
-        return random.sample(materials, min(count, len(materials)))
+        if rng is None:
+            import random
+            rng = random
+        return rng.sample(materials, min(count, len(materials)))
@@ -0,0 +1,145 @@
+"""Process-wide compiled snapshot of the narrative library."""
+
+import hashlib
+import json
+import os
+import pickle
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+from .. import signing
+from ..matcher import Segmenter
+from .formulas import FormulaSelector
+
+# Resource files making up a library
+LIBRARY_FILES = ("baits.json", "lexicon.json", "materials.json")
+
+# Bump when the pickled layout of LibrarySnapshot changes
+SNAPSHOT_FORMAT = 4
+
+
+@dataclass
+class LibrarySnapshot:
+    """Parsed library data plus everything derived from it.
+
+    A snapshot is immutable by convention: every loader in the process that
+    points at the same library shares one instance.
+    """
+    baits: dict[str, Any]
+    lexicon: dict[str, list[str]]
+    materials: dict[str, Any]
+    lexicon_words: frozenset[str]
+    segmenter: Segmenter
+    formula_selector: FormulaSelector
+    signature: str
+    origin: str = "json"
+
+
+def library_signature(library_path: Path) -> str:
+    """Cheap change signature from the size and mtime of each resource."""
+    parts = [f"format={SNAPSHOT_FORMAT}"]
+    for filename in LIBRARY_FILES:
+        try:
+            stat = (library_path / filename).stat()
+        except OSError:
+            parts.append(f"{filename}:missing")
+            continue
+        parts.append(f"{filename}:{stat.st_size}:{stat.st_mtime_ns}")
+    return hashlib.sha256("|".join(parts).encode("utf-8")).hexdigest()
+
+
+def build_snapshot(library_path: Path, signature: str) -> LibrarySnapshot:
+    """Parse the library JSON files and compile derived structures."""
+    data = {}
+    for filename in LIBRARY_FILES:
+        path = library_path / filename
+        if not path.exists():
+            data[filename] = {}
+            continue
+        with open(path, encoding="utf-8") as f:
+            data[filename] = json.load(f)
+
+    lexicon = data["lexicon.json"]
+    lexicon_words = frozenset(word for words in lexicon.values() for word in words)
+    return LibrarySnapshot(
+        baits=data["baits.json"],
+        lexicon=lexicon,
+        materials=data["materials.json"],
+        lexicon_words=lexicon_words,
+        segmenter=Segmenter(sorted(lexicon_words)),
+        formula_selector=FormulaSelector(data["baits.json"]),
+        signature=signature,
+    )
+
+
+def snapshot_cache_path(library_path: Path) -> Path:
+    """Binary snapshot file kept beside the library it was built from."""
+    return library_path / ".cache" / "snapshot.pickle"
+
+
+def _read_cached(path: Path, signature: str) -> LibrarySnapshot | None:
+    """Load a signed binary snapshot if it matches ``signature``.
+
+    The file is the signature line followed by the signed pickle (see
+    :mod:`maze.signing`); unsigned or foreign files are ignored.
+    """
+    try:
+        with open(path, "rb") as f:
+            if f.readline().rstrip(b"\n") != signature.encode("ascii"):
+                return None
+            snapshot = signing.loads(f.read())
+    except (OSError, ValueError, pickle.UnpicklingError, EOFError, AttributeError):
+        return None
+    snapshot.origin = "cache"
+    return snapshot
+
+
+def _write_cached(path: Path, snapshot: LibrarySnapshot) -> None:
+    """Write a signed binary snapshot atomically; failures only cost a re-parse."""
+    try:
+        blob = signing.dumps(snapshot)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(f".{os.getpid()}.tmp")
+        with open(tmp, "wb") as f:
+            f.write(snapshot.signature.encode("ascii") + b"\n")
+            f.write(blob)
+        os.replace(tmp, path)
+    except OSError:
+        pass
+
+
+_snapshots: dict[Path, LibrarySnapshot] = {}
+_lock = threading.Lock()
+
+
+def load_snapshot(library_path: Path) -> LibrarySnapshot:
+    """Return the shared snapshot for a library, rebuilding it when stale.
+
+    Lookup order: the in-process registry, the binary file beside the
+    library, and finally the JSON sources. Any size or mtime change of a
+    resource file invalidates both cached copies.
+    """
+    library_path = Path(library_path).resolve()
+    signature = library_signature(library_path)
+
+    with _lock:
+        snapshot = _snapshots.get(library_path)
+        if snapshot is not None and snapshot.signature == signature:
+            return snapshot
+
+        cache_path = snapshot_cache_path(library_path)
+        snapshot = _read_cached(cache_path, signature)
+        if snapshot is None:
+            snapshot = build_snapshot(library_path, signature)
+            _write_cached(cache_path, snapshot)
+
+        _snapshots[library_path] = snapshot
+        return snapshot
+
+
+def clear_snapshots() -> None:
+    """Forget every in-process snapshot (the binary files are kept)."""
+    with _lock:
+        _snapshots.clear()
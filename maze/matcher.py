@@ -0,0 +1,463 @@
+"""Multi-keyword matching for gate rule scans."""
+
+import re
+from collections import deque
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Iterable, Iterator, Mapping
+
+from .normalize import fold, normalize
+
+# All-ASCII keywords up to this length need a word boundary when matched by folding.
+SHORT_ASCII_KEYWORD = 3
+
+@dataclass(frozen=True)
+class KeywordHit:
+    """A single keyword occurrence in scanned text."""
+    start: int
+    end: int
+    keyword: str
+    category: str
+
+
+@dataclass
+class MatchReport:
+    """All rule hits found in one scan, in scan order.
+
+    A bounded scan may keep only some hits; ``omitted`` then counts the
+    hits it dropped per (category, keyword).
+    """
+    hits: list[KeywordHit] = field(default_factory=list)
+    omitted: dict[tuple[str, str], int] = field(default_factory=dict)
+
+    @property
+    def counts(self) -> dict[str, int]:
+        """Number of hits per category, omitted ones included."""
+        counts: dict[str, int] = {}
+        for hit in self.hits:
+            counts[hit.category] = counts.get(hit.category, 0) + 1
+        for (category, _), count in self.omitted.items():
+            counts[category] = counts.get(category, 0) + count
+        return counts
+
+    def keywords(self, category: str) -> set[str]:
+        """Distinct keywords of a category that occurred at least once."""
+        found = {hit.keyword for hit in self.hits if hit.category == category}
+        found.update(keyword for cat, keyword in self.omitted if cat == category)
+        return found
+
+    def offsets(self, category: str) -> list[tuple[int, int]]:
+        """Start/end offsets of every hit in a category."""
+        return [(hit.start, hit.end) for hit in self.hits if hit.category == category]
+
+
+class KeywordMatcher:
+    """Aho-Corasick automaton over a categorised keyword set.
+
+    The automaton is built once per rule set; scanning is a single pass over
+    the text regardless of how many keywords the rules contain. While the
+    automaton sits in its root state the scanner jumps straight to the next
+    offset where a keyword can start, so keyword-free stretches are skipped
+    at regex-engine speed.
+    """
+
+    # Above this many distinct first characters the skip pattern falls back
+    # from a full keyword trie to a first-character class, since the regex
+    # engine tries trie branches one by one.
+    MAX_TRIE_SKIP_BRANCHES = 64
+
+    def __init__(self, rules: Mapping[str, Iterable[str]]) -> None:
+        self._patterns: list[tuple[str, str]] = []
+        self._goto: list[dict[str, int]] = [{}]
+        self._fail: list[int] = [0]
+        self._out: list[tuple[int, ...]] = [()]
+        self._terminal: set[int] = set()
+
+        for category, keywords in rules.items():
+            for keyword in keywords:
+                if keyword:
+                    self._add(keyword, category)
+        self._link()
+        self._skip = self._skip_pattern()
+
+    def __len__(self) -> int:
+        return len(self._patterns)
+
+    @property
+    def max_length(self) -> int:
+        """Length of the longest keyword."""
+        return max((len(keyword) for keyword, _ in self._patterns), default=0)
+
+    def _add(self, keyword: str, category: str) -> None:
+        """Insert a keyword into the goto trie."""
+        state = 0
+        for char in keyword:
+            nxt = self._goto[state].get(char)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append(())
+                self._goto[state][char] = nxt
+            state = nxt
+        self._out[state] += (len(self._patterns),)
+        self._terminal.add(state)
+        self._patterns.append((keyword, category))
+
+    def _link(self) -> None:
+        """Compute failure links and merge outputs breadth-first."""
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, nxt in self._goto[state].items():
+                queue.append(nxt)
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                target = self._goto[fallback].get(char, 0)
+                self._fail[nxt] = target if target != nxt else 0
+                self._out[nxt] += self._out[self._fail[nxt]]
+
+    def _skip_pattern(self) -> "re.Pattern[str] | None":
+        """Compile the regex that finds the next offset a keyword can start at."""
+        root = self._goto[0]
+        if not root:
+            return None
+        if len(root) > self.MAX_TRIE_SKIP_BRANCHES:
+            return re.compile("[" + "".join(re.escape(char) for char in root) + "]")
+        return re.compile(self._trie_regex(0))
+
+    def _trie_regex(self, state: int) -> str:
+        """Regex matching any keyword prefix path that completes below ``state``."""
+        if state in self._terminal:
+            return ""
+        leaves = []
+        branches = []
+        for char, nxt in self._goto[state].items():
+            if nxt in self._terminal:
+                leaves.append(re.escape(char))
+            else:
+                branches.append(re.escape(char) + self._trie_regex(nxt))
+        if leaves:
+            branches.append(leaves[0] if len(leaves) == 1 else "[" + "".join(leaves) + "]")
+        return branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+
+    def iter_hits(self, text: str, pos: int = 0) -> Iterator[KeywordHit]:
+        """Yield every (possibly overlapping) keyword occurrence in ``text``.
+
+        Scanning starts at ``pos``; keywords beginning earlier are not reported.
+        """
+        if self._skip is None:
+            return
+        goto, fail, out, patterns = self._goto, self._fail, self._out, self._patterns
+        root = goto[0]
+        search = self._skip.search
+        state = 0
+        index = pos
+        length = len(text)
+
+        while index < length:
+            if state == 0:
+                match = search(text, index)
+                if match is None:
+                    return
+                index = match.start()
+                state = root[text[index]]
+            else:
+                char = text[index]
+                while True:
+                    nxt = goto[state].get(char)
+                    if nxt is not None:
+                        state = nxt
+                        break
+                    if state == 0:
+                        break
+                    state = fail[state]
+            index += 1
+            for pattern_id in out[state]:
+                keyword, category = patterns[pattern_id]
+                yield KeywordHit(index - len(keyword), index, keyword, category)
+
+    def scan(self, text: str) -> MatchReport:
+        """Collect all keyword hits in ``text``."""
+        return MatchReport(hits=list(self.iter_hits(text)))
+
+
+class FoldedMatcher:
+    """Keyword matching on normalized text, reporting original offsets.
+
+    Keywords and text are both normalized (see :mod:`maze.normalize`), so
+    width, case, variant and spacing tricks still match. Hits carry the
+    rule's own keyword and spans of the original text. A hit whose original
+    text is the keyword verbatim always counts, so ``OpenAI`` still contains
+    ``AI``. Short all-ASCII keywords found only after folding must sit on a
+    word boundary, since folding would otherwise find ``ai`` inside ``said``.
+    """
+
+    def __init__(self, rules: Mapping[str, Iterable[str]]) -> None:
+        folded: dict[str, list[str]] = {}
+        self._keywords: dict[tuple[str, str], str] = {}
+        for category, keywords in rules.items():
+            for keyword in keywords:
+                key = fold(keyword)
+                if key and (key, category) not in self._keywords:
+                    self._keywords[key, category] = keyword
+                    folded.setdefault(category, []).append(key)
+        self._matcher = KeywordMatcher(folded)
+
+    def __len__(self) -> int:
+        return len(self._matcher)
+
+    @property
+    def max_length(self) -> int:
+        """Length of the longest normalized keyword."""
+        return self._matcher.max_length
+
+    def iter_hits(self, text: str, pos: int = 0) -> Iterator[KeywordHit]:
+        """Yield keyword occurrences starting at or after ``pos`` in ``text``."""
+        if not len(self._matcher):
+            return
+        normalized = normalize(text)
+        folded = normalized.text
+        for hit in self._matcher.iter_hits(folded):
+            start, end = normalized.span(hit.start, hit.end)
+            if start < pos:
+                continue
+            keyword = self._keywords[hit.keyword, hit.category]
+            if text[start:end] != keyword and _needs_boundary(keyword):
+                if hit.start > 0 and _is_word(folded[hit.start - 1]):
+                    continue
+                if hit.end < len(folded) and _is_word(folded[hit.end]):
+                    continue
+            yield KeywordHit(start, end, keyword, hit.category)
+
+    def scan(self, text: str) -> MatchReport:
+        """Collect all keyword hits in ``text``."""
+        return MatchReport(hits=list(self.iter_hits(text)))
+
+
+def _is_word(char: str) -> bool:
+    return char.isascii() and char.isalnum()
+
+
+def _needs_boundary(keyword: str) -> bool:
+    return len(keyword) <= SHORT_ASCII_KEYWORD and all(map(_is_word, keyword))
+
+
+class Segmenter:
+    """Forward maximum-match segmenter over a word dictionary.
+
+    The dictionary trie is compiled into a regex whose branches extend
+    greedily, so each match is the longest word at the leftmost offset where
+    any word starts, and matching resumes after it. That is forward maximum
+    matching done in one pass by the regex engine.
+    """
+
+    def __init__(self, words: Iterable[str]) -> None:
+        trie: dict[str, dict] = {}
+        for word in words:
+            if not word:
+                continue
+            node = trie
+            for char in word:
+                node = node.setdefault(char, {})
+            node[""] = {}
+        self.max_length = max((len(word) for word in words if word), default=0)
+        self._regex = re.compile(self._trie_regex(trie)) if trie else None
+
+    @classmethod
+    def _trie_regex(cls, node: dict[str, dict]) -> str:
+        """Regex for a trie node, preferring the longest continuation."""
+        branches = [
+            re.escape(char) + cls._trie_regex(child)
+            for char, child in node.items() if char
+        ]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        if "" in node:
+            return f"(?:{body})?"
+        return body
+
+    def iter_spans(
+        self,
+        text: str,
+        pos: int = 0,
+        endpos: int | None = None,
+    ) -> Iterator[tuple[int, int]]:
+        """Yield (start, end) of each dictionary word in segmentation order.
+
+        Only words starting in ``[pos, endpos)`` are reported; a word may run
+        past ``endpos``.
+        """
+        if self._regex is None:
+            return
+        endpos = len(text) if endpos is None else endpos
+        for match in self._regex.finditer(text, pos):
+            if match.start() >= endpos:
+                return
+            yield match.span()
+
+    def segment(self, text: str) -> list[str]:
+        """Dictionary words of ``text`` in order."""
+        return [text[start:end] for start, end in self.iter_spans(text)]
+
+    def count(self, text: str) -> int:
+        """Number of dictionary words in ``text``."""
+        return sum(1 for _ in self.iter_spans(text))
+
+
+class PatternMatcher:
+    """Combined scan over a list of regular-expression rules.
+
+    All rules are joined into one non-capturing alternation that locates the
+    next offset where any rule matches, so the regex engine walks the text
+    once. At each such offset every rule is confirmed with an anchored match,
+    which keeps rules that share a start offset from shadowing each other.
+    Each rule reports non-overlapping matches, like ``re.finditer``.
+    """
+
+    _SCOPED_FLAGS = {re.IGNORECASE: "i", re.MULTILINE: "m", re.DOTALL: "s", re.VERBOSE: "x"}
+
+    def __init__(self, rules: Iterable[tuple[str, str, int]]) -> None:
+        rules = list(rules)
+        self._rules = [
+            (category, pattern, re.compile(pattern, flags))
+            for category, pattern, flags in rules
+        ]
+        self._combined: re.Pattern[str] | None = None
+        if rules:
+            try:
+                self._combined = re.compile("|".join(
+                    self._scoped(pattern, flags) for _, pattern, flags in rules
+                ))
+            except (re.error, ValueError):
+                self._combined = None
+
+    def __len__(self) -> int:
+        return len(self._rules)
+
+    @classmethod
+    def _scoped(cls, pattern: str, flags: int) -> str:
+        """Wrap a pattern so its flags only apply to its own alternative."""
+        letters = ""
+        for flag, letter in cls._SCOPED_FLAGS.items():
+            if flags & flag:
+                letters += letter
+                flags &= ~flag
+        if flags & ~re.UNICODE:
+            raise ValueError(f"Unsupported flags for combined pattern: {pattern}")
+        return f"(?{letters}:{pattern})" if letters else f"(?:{pattern})"
+
+    def iter_hits(
+        self,
+        text: str,
+        pos: int = 0,
+        endpos: int | None = None,
+        last_end: list[int] | None = None,
+    ) -> Iterator[KeywordHit]:
+        """Yield the matches of every rule in ``text``.
+
+        Only matches starting in ``[pos, endpos)`` are reported, but they may
+        extend past ``endpos`` and anchors see the text around the range.
+        ``last_end`` holds, per rule, the offset before which a new match may
+        not start; pass the same list to consecutive calls to keep matches
+        non-overlapping across them.
+        """
+        rules = self._rules
+        if last_end is None:
+            last_end = [0] * len(rules)
+        # An empty match at the very end of the text counts as in range.
+        limit = endpos if endpos is not None and endpos < len(text) else len(text) + 1
+
+        if self._combined is None:
+            for index, (category, pattern, compiled) in enumerate(rules):
+                start = max(pos, last_end[index])
+                while start < limit:
+                    match = compiled.search(text, start)
+                    if match is None or match.start() >= limit:
+                        break
+                    last_end[index] = max(match.end(), match.start() + 1)
+                    yield KeywordHit(match.start(), match.end(), pattern, category)
+                    start = last_end[index]
+            return
+
+        search = self._combined.search
+
+        while pos < limit:
+            candidate = search(text, pos)
+            if candidate is None or candidate.start() >= limit:
+                return
+            start = candidate.start()
+            for index, (category, pattern, compiled) in enumerate(rules):
+                if start < last_end[index]:
+                    continue
+                match = compiled.match(text, start)
+                if match is not None:
+                    last_end[index] = max(match.end(), start + 1)
+                    yield KeywordHit(start, match.end(), pattern, category)
+            pos = start + 1
+
+    def scan(self, text: str) -> MatchReport:
+        """Collect all rule matches in ``text``."""
+        return MatchReport(hits=list(self.iter_hits(text)))
+
+
+class RuleScanner:
+    """Scans text for keyword rules and pattern rules together.
+
+    Pattern rules that are plain literals without flags are folded into the
+    keyword automaton, so only genuine regular expressions go through the
+    pattern scan. ``folded`` keyword rules are matched on normalized text
+    by a :class:`FoldedMatcher`.
+    """
+
+    def __init__(
+        self,
+        keywords: Mapping[str, Iterable[str]],
+        patterns: Iterable[tuple[str, str, int]] = (),
+        folded: Mapping[str, Iterable[str]] | None = None,
+    ) -> None:
+        merged = {category: list(words) for category, words in keywords.items()}
+        regexes = []
+        for category, pattern, flags in patterns:
+            if not flags and pattern and re.escape(pattern) == pattern:
+                merged.setdefault(category, []).append(pattern)
+            else:
+                regexes.append((category, pattern, flags))
+
+        self.keywords = KeywordMatcher(merged)
+        self.folded = FoldedMatcher(folded or {})
+        self.patterns = PatternMatcher(regexes)
+
+    def scan(self, text: str) -> MatchReport:
+        """Collect keyword hits, then folded keyword hits, then pattern hits."""
+        report = self.keywords.scan(text)
+        report.hits.extend(self.folded.iter_hits(text))
+        report.hits.extend(self.patterns.iter_hits(text))
+        return report
+
+
+def get_matcher(rules: Mapping[str, Iterable[str]]) -> KeywordMatcher:
+    """Return the shared compiled matcher for a keyword rule set."""
+    return get_scanner(rules).keywords
+
+
+def get_scanner(
+    keywords: Mapping[str, Iterable[str]],
+    patterns: Iterable[tuple[str, str, int]] = (),
+    folded: Mapping[str, Iterable[str]] | None = None,
+) -> RuleScanner:
+    """Return the shared compiled scanner for a rule set."""
+    key = (
+        tuple((category, tuple(words)) for category, words in keywords.items()),
+        tuple(patterns),
+        tuple((category, tuple(words)) for category, words in (folded or {}).items()),
+    )
+    return _compile(key)
+
+
+@lru_cache(maxsize=32)
+def _compile(key: tuple) -> RuleScanner:
+    keywords, patterns, folded = key
+    return RuleScanner(dict(keywords), patterns, dict(folded))
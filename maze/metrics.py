@@ -0,0 +1,216 @@
+"""Optional timing and rule-hit instrumentation.
+
+Instrumentation is off unless :func:`enable` installs a :class:`Metrics`
+registry. While it is off, :func:`timer` hands back one shared no-op context
+manager and :func:`count` returns at once, so call sites cost a global
+lookup.
+"""
+
+import json
+import threading
+import time
+from pathlib import Path
+from typing import Any
+
+# Prefix for exported metric names
+PREFIX = "maze"
+
+LabelKey = tuple[str, tuple[tuple[str, str], ...]]
+
+
+def _key(name: str, labels: dict[str, Any]) -> LabelKey:
+    return name, tuple(sorted((label, str(value)) for label, value in labels.items()))
+
+
+class Metrics:
+    """Registry of timers and counters keyed by name and labels.
+
+    Timers accumulate calls, wall seconds and CPU seconds. With
+    ``rule_timing`` the fused audit also times every rule on its own.
+    Updates take a lock, so pipelines on many threads can share one
+    registry.
+
+    The ``scan`` timer covers the one fused keyword scan shared by all
+    gates; each ``gate`` timer covers only that gate's work on the scan's
+    report, so the scan is not counted in any of them.
+    """
+
+    def __init__(self, rule_timing: bool = False) -> None:
+        self.rule_timing = rule_timing
+        self.timers: dict[LabelKey, list[float]] = {}
+        self.counters: dict[LabelKey, float] = {}
+        self._lock = threading.Lock()
+
+    def __getstate__(self) -> dict[str, Any]:
+        # Registries come back from worker processes; the lock stays behind.
+        with self._lock:
+            state = self.__dict__.copy()
+        del state["_lock"]
+        return state
+
+    def __setstate__(self, state: dict[str, Any]) -> None:
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def add_time(self, name: str, wall: float, cpu: float, **labels: Any) -> None:
+        key = _key(name, labels)
+        with self._lock:
+            entry = self.timers.setdefault(key, [0, 0.0, 0.0])
+            entry[0] += 1
+            entry[1] += wall
+            entry[2] += cpu
+
+    def add(self, name: str, value: float = 1, **labels: Any) -> None:
+        key = _key(name, labels)
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def merge(self, other: "Metrics") -> None:
+        """Fold another registry, e.g. from a worker process, into this one."""
+        timers, counters = other._snapshot()
+        with self._lock:
+            for key, (calls, wall, cpu) in timers.items():
+                entry = self.timers.setdefault(key, [0, 0.0, 0.0])
+                entry[0] += calls
+                entry[1] += wall
+                entry[2] += cpu
+            for key, value in counters.items():
+                self.counters[key] = self.counters.get(key, 0) + value
+
+    def _snapshot(self) -> tuple[dict[LabelKey, list[float]], dict[LabelKey, float]]:
+        """Consistent copies of the timers and counters."""
+        with self._lock:
+            timers = {key: list(entry) for key, entry in self.timers.items()}
+            return timers, dict(self.counters)
+
+    def records(self) -> list[dict[str, Any]]:
+        """Every timer and counter as a plain dict, timers first."""
+        timers, counters = self._snapshot()
+        records = []
+        for (name, labels), (calls, wall, cpu) in sorted(timers.items()):
+            records.append({
+                "type": "timer",
+                "name": name,
+                "labels": dict(labels),
+                "calls": calls,
+                "wall_seconds": wall,
+                "cpu_seconds": cpu,
+            })
+        for (name, labels), value in sorted(counters.items()):
+            records.append({
+                "type": "counter",
+                "name": name,
+                "labels": dict(labels),
+                "value": value,
+            })
+        return records
+
+    def to_jsonl(self) -> str:
+        """One JSON object per line."""
+        return "".join(json.dumps(r, ensure_ascii=False) + "\n" for r in self.records())
+
+    def to_prometheus(self) -> str:
+        """Prometheus text exposition format."""
+        timers, counters = self._snapshot()
+        series: dict[str, list[str]] = {}
+        for (name, labels), (calls, wall, cpu) in sorted(timers.items()):
+            for suffix, value in (
+                ("calls_total", calls),
+                ("wall_seconds_total", wall),
+                ("cpu_seconds_total", cpu),
+            ):
+                metric = f"{PREFIX}_{name}_{suffix}"
+                series.setdefault(metric, []).append(f"{metric}{_labels(labels)} {value}")
+        for (name, labels), value in sorted(counters.items()):
+            metric = f"{PREFIX}_{name}_total"
+            series.setdefault(metric, []).append(f"{metric}{_labels(labels)} {value}")
+
+        lines = []
+        for metric, samples in series.items():
+            lines.append(f"# TYPE {metric} counter")
+            lines.extend(samples)
+        return "".join(line + "\n" for line in lines)
+
+    def write(self, path: Path) -> None:
+        """Write Prometheus text for ``.prom`` files, JSON lines otherwise."""
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        text = self.to_prometheus() if path.suffix == ".prom" else self.to_jsonl()
+        path.write_text(text, encoding="utf-8")
+
+
+def _labels(labels: tuple[tuple[str, str], ...]) -> str:
+    if not labels:
+        return ""
+    escaped = (
+        (name, value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+        for name, value in labels
+    )
+    return "{" + ",".join(f'{name}="{value}"' for name, value in escaped) + "}"
+
+
+class _Timer:
+    __slots__ = ("metrics", "name", "labels", "wall", "cpu")
+
+    def __init__(self, metrics: Metrics, name: str, labels: dict[str, Any]) -> None:
+        self.metrics = metrics
+        self.name = name
+        self.labels = labels
+
+    def __enter__(self) -> "_Timer":
+        self.wall = time.perf_counter()
+        self.cpu = time.process_time()
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.metrics.add_time(
+            self.name,
+            time.perf_counter() - self.wall,
+            time.process_time() - self.cpu,
+            **self.labels,
+        )
+
+
+class _NullTimer:
+    __slots__ = ()
+
+    def __enter__(self) -> "_NullTimer":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        pass
+
+
+_NULL_TIMER = _NullTimer()
+_active: Metrics | None = None
+
+
+def enable(metrics: Metrics | None = None) -> Metrics:
+    """Start recording into ``metrics`` (a new registry by default)."""
+    global _active
+    _active = metrics if metrics is not None else Metrics()
+    return _active
+
+
+def disable() -> None:
+    """Stop recording."""
+    global _active
+    _active = None
+
+
+def active() -> Metrics | None:
+    """The registry being recorded into, or None when disabled."""
+    return _active
+
+
+def timer(name: str, **labels: Any) -> Any:
+    """Context manager timing a block into ``name``; a no-op when disabled."""
+    if _active is None:
+        return _NULL_TIMER
+    return _Timer(_active, name, labels)
+
+
+def count(name: str, value: float = 1, **labels: Any) -> None:
+    """Add to counter ``name``; does nothing when disabled."""
+    if _active is not None:
+        _active.add(name, value, **labels)
@@ -0,0 +1,124 @@
+"""Text normalization for evasion-resistant keyword matching.
+
+Drafts can dodge a raw substring match with full-width letters (``ＡＩ``),
+case (``chatgpt``), invisible characters, spaces between CJK characters
+(``人 工 智 能``) or traditional characters (``殺``). :func:`normalize` folds
+all of these: ``str.lower`` folds case, a precomputed translation table
+handles width and variants on just the runs it changes, and one regex
+finds the characters to drop.
+The result keeps an offset map so spans found in the normalized text can
+be reported against the original.
+"""
+
+import re
+from bisect import bisect_right
+from dataclasses import dataclass, field
+
+# Invisible characters removed everywhere
+INVISIBLE = "\u00ad\u180e\u200b\u200c\u200d\u2060\u2061\u2062\u2063\u2064\ufeff"
+
+# Whitespace removed between two CJK characters
+SPACES = " \t\n\r\f\v\u3000"
+
+# Traditional characters folded to their simplified forms. Only one-to-one
+# mappings are listed, so folding never changes the text length.
+VARIANTS = (
+    ("屍遲殺學姦輪強藥國領導殘樂鬱體歲戀愛寵復說這個們來會時為",
+     "尸迟杀学奸轮强药国领导残乐郁体岁恋爱宠复说这个们来会时为"),
+    ("長開門聽見東車電話錢點麼後還過對現無發與問題種實頭氣動腦機",
+     "长开门听见东车电话钱点么后还过对现无发与问题种实头气动脑机"),
+    ("殤敗勝競賽憶醫療獄傷淚夢聲彈槍軍謀殲屬網絡語劇戲嚴態紀錄",
+     "殇败胜竞赛忆医疗狱伤泪梦声弹枪军谋歼属网络语剧戏严态纪录"),
+)
+
+_CJK = "\u3400-\u9fff\uf900-\ufaff"
+
+
+def _fold_table() -> dict[int, str]:
+    """Translation table folding full-width letters and digits, and variants.
+
+    Case is folded beforehand by ``str.lower``. Full-width punctuation is
+    left alone: no rule keyword contains any, and it is common enough in
+    Chinese text that folding it would be most of the work.
+    """
+    table: dict[int, str] = {}
+    for first, last in ((0xFF10, 0xFF19), (0xFF21, 0xFF3A), (0xFF41, 0xFF5A)):
+        for code in range(first, last + 1):
+            table[code] = chr(code - 0xFEE0).lower()
+    for traditional, simplified in VARIANTS:
+        assert len(traditional) == len(simplified)
+        table.update(str.maketrans(traditional, simplified))
+    return table
+
+
+FOLD_TABLE = _fold_table()
+
+# Runs of characters the table changes; only these are translated
+_FOLDABLE = re.compile(
+    "[" + "".join(re.escape(chr(code)) for code in sorted(FOLD_TABLE)) + "]+"
+)
+
+# Characters to drop. Each pattern starts with a plain character class, so
+# the regex engine can skip ahead to candidates; the lookbehind then checks
+# the character before. The simpler one is used when there are no
+# invisible characters, which is almost always.
+_SPACED = re.compile(f"[{SPACES}](?<=[{_CJK}].)[{SPACES}]*(?=[{_CJK}])")
+_DROP = re.compile(
+    f"[{SPACES}{INVISIBLE}](?<=[{_CJK}].)[{SPACES}{INVISIBLE}]*(?=[{_CJK}])|[{INVISIBLE}]+"
+)
+
+
+@dataclass
+class Normalized:
+    """Normalized text with a map from its offsets back to the original.
+
+    The text is stored as runs copied from the original; ``_starts[i]`` is
+    where run ``i`` begins in the normalized text and ``_origins[i]`` where
+    it began in the original.
+    """
+    text: str
+    _starts: list[int] = field(default_factory=lambda: [0])
+    _origins: list[int] = field(default_factory=lambda: [0])
+
+    def original(self, index: int) -> int:
+        """Offset in the original text of a normalized character."""
+        run = bisect_right(self._starts, index) - 1
+        return self._origins[run] + index - self._starts[run]
+
+    def span(self, start: int, end: int) -> tuple[int, int]:
+        """Original (start, end) covering a normalized span, dropped characters included."""
+        if end <= start:
+            origin = self.original(start)
+            return origin, origin
+        return self.original(start), self.original(end - 1) + 1
+
+
+def normalize(text: str) -> Normalized:
+    """Fold case, width and variants and drop invisible characters."""
+    folded = text.lower()
+    if len(folded) != len(text):
+        # A few characters lower-case to two; leave those as they are.
+        folded = "".join(char if len(char.lower()) != 1 else char.lower() for char in text)
+    folded = _FOLDABLE.sub(lambda match: match.group().translate(FOLD_TABLE), folded)
+
+    drop = _DROP if any(char in folded for char in INVISIBLE) else _SPACED
+    pieces = []
+    starts = [0]
+    origins = [0]
+    pos = 0
+    length = 0
+    for match in drop.finditer(folded):
+        pieces.append(folded[pos:match.start()])
+        length += match.start() - pos
+        pos = match.end()
+        starts.append(length)
+        origins.append(pos)
+    if not pieces:
+        return Normalized(folded)
+    pieces.append(folded[pos:])
+    return Normalized("".join(pieces), starts, origins)
+
+
+def fold(keyword: str) -> str:
+    """A rule keyword in normalized form."""
+    return normalize(keyword).text
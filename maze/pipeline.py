@@ -1,26 +1,55 @@
 """Story generation pipeline orchestrator."""
 
-from dataclasses import dataclass
+import itertools
+import os
+from dataclasses import dataclass, field
 from pathlib import Path
-from typing import Optional
+from typing import Any, Optional
 
+from . import metrics
+from .checkpoint import StoryState, artifact_path, load_state
 from .gates import IdeaGate, QualityGate, SafetyGate, GateResult
 from .library.loader import ResourceLoader
 
 
+# Story IDs handed out by this process; the counter keeps them distinct
+_story_ids = itertools.count(1)
+
+
+def new_story_id() -> str:
+    """A story ID unique across processes and runs.
+
+    It combines the start time, the process ID and a per-process counter,
+    so stories started in the same second never share files.
+    """
+    from datetime import datetime
+    return f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{os.getpid()}_{next(_story_ids):04d}"
+
+
 @dataclass
 class PipelineResult:
-    """Result of a pipeline execution."""
+    """Result of a pipeline execution.
+
+    ``redactions`` logs the spans the safety review rewrote in the final
+    text (see :meth:`~maze.gates.SafetyGate.review`).
+    """
     success: bool
     output_path: Optional[Path] = None
     error: Optional[str] = None
     spec_path: Optional[Path] = None
     draft_path: Optional[Path] = None
     final_path: Optional[Path] = None
+    story_id: Optional[str] = None
+    redactions: list[dict[str, Any]] = field(default_factory=list)
 
 
 class Pipeline:
-    """Orchestrates the 3-Gate story generation pipeline."""
+    """Orchestrates the 3-Gate story generation pipeline.
+
+    Each finished gate is checkpointed in ``state_<story_id>.json`` beside
+    its artifact, so a rerun with the same story ID resumes where the last
+    run stopped.
+    """
 
     def __init__(
         self,
@@ -28,68 +57,203 @@ class Pipeline:
         constraints: str,
         formula: str,
         output_dir: Path,
+        loader: Optional[ResourceLoader] = None,
+        story_id: Optional[str] = None,
+        candidates: int = 1,
+        min_score: Optional[float] = None,
+        seed: Optional[int] = None,
     ) -> None:
         self.theme = theme
         self.constraints = constraints
         self.formula = formula
         self.output_dir = output_dir
-        self.loader = ResourceLoader()
+        self.loader = loader or ResourceLoader()
+        self.story_id = story_id
+        self.candidates = candidates
+        self.min_score = min_score
+        self.seed = seed
+
+    @classmethod
+    def resume(
+        cls,
+        story_id: str,
+        output_dir: Path,
+        loader: Optional[ResourceLoader] = None,
+        **options: Any,
+    ) -> "Pipeline":
+        """Rebuild a pipeline from a story's checkpoint record.
+
+        Running it skips every stage that already finished and reuses that
+        stage's artifact. ``options`` are passed on to the constructor.
+        """
+        state = load_state(output_dir, story_id)
+        if state is None:
+            raise FileNotFoundError(f"No checkpoint for story {story_id} in {output_dir}")
+        return cls(
+            theme=state.theme,
+            constraints=state.constraints,
+            formula=state.formula,
+            output_dir=output_dir,
+            loader=loader,
+            story_id=story_id,
+            **options,
+        )
 
     def run(self) -> PipelineResult:
         """Execute the full generation pipeline."""
-        story_id = self._generate_story_id()
+        state = self._begin()
 
         # Gate 1: Idea Generation
-        idea_gate = IdeaGate(self.loader)
-        spec_result = idea_gate.generate(self.theme, self.constraints, self.formula)
+        spec_result = self._spec(state)
+        if not spec_result.passed:
+            return self._fail(state, f"Gate 1 failed: {', '.join(spec_result.issues)}")
+        self._complete(state, "spec", spec_result.content)
+
+        # Gate 2: Draft Generation & Quality Check
+        draft_result = self._checkpointed(state, "draft")
+        if draft_result is None:
+            with metrics.timer("stage", stage="draft"):
+                draft_result = QualityGate(self.loader).generate(spec_result.content)
+
+        return self._finish(state, draft_result)
 
+    async def run_async(self, backend: Any) -> PipelineResult:
+        """Execute the pipeline, generating the draft through an async backend.
+
+        ``backend`` is any object with an ``async complete(prompt)`` method,
+        usually a :class:`~maze.backend.LimitedBackend` shared by many
+        concurrent pipelines. With ``candidates`` above one the draft is the
+        winner of a best-of-N search (see :func:`~maze.best_of.best_of_n`).
+        """
+        state = self._begin()
+
+        # Gate 1: Idea Generation
+        spec_result = self._spec(state)
         if not spec_result.passed:
-            return PipelineResult(
-                success=False,
-                error=f"Gate 1 failed: {', '.join(spec_result.issues)}"
-            )
+            return self._fail(state, f"Gate 1 failed: {', '.join(spec_result.issues)}")
+        self._complete(state, "spec", spec_result.content)
 
-        spec_path = self.output_dir / f"SPEC_{story_id}.json"
-        spec_path.write_text(spec_result.content, encoding="utf-8")
+        # Gate 2: Draft Generation via the backend
+        draft_result = self._checkpointed(state, "draft")
+        if draft_result is None:
+            with metrics.timer("stage", stage="draft"):
+                if self.candidates > 1:
+                    draft_result = await self._best_draft(spec_result.content, backend)
+                else:
+                    quality_gate = QualityGate(self.loader)
+                    draft_result = await quality_gate.generate_async(spec_result.content, backend)
 
-        # Gate 2: Draft Generation & Quality Check
-        quality_gate = QualityGate(self.loader)
-        draft_result = quality_gate.generate(spec_result.content)
+        return self._finish(state, draft_result)
 
-        if not draft_result.passed:
-            return PipelineResult(
-                success=False,
-                error=f"Gate 2 failed: {', '.join(draft_result.issues)}",
-                spec_path=spec_path,
-            )
+    def _spec(self, state: StoryState) -> GateResult:
+        """The checkpointed SPEC, or a new one from Gate 1."""
+        spec_result = self._checkpointed(state, "spec")
+        if spec_result is None:
+            with metrics.timer("stage", stage="spec"):
+                spec_result = IdeaGate(self.loader).generate(
+                    self.theme, self.constraints, self.formula, seed=self.seed
+                )
+        return spec_result
+
+    async def _best_draft(self, spec_content: str, backend: Any) -> GateResult:
+        """Best of ``candidates`` drafts, or a failure listing why each was dropped."""
+        from .best_of import DEFAULT_MIN_SCORE, best_of_issues, best_of_n
 
-        draft_path = self.output_dir / f"draft_v1_{story_id}.txt"
-        draft_path.write_text(draft_result.content, encoding="utf-8")
+        min_score = DEFAULT_MIN_SCORE if self.min_score is None else self.min_score
+        result = await best_of_n(spec_content, backend, self.loader, self.candidates, min_score)
+        if result.best is None:
+            return GateResult(passed=False, issues=best_of_issues(result) or ["No draft produced"])
+        return GateResult(passed=True, content=result.best.content)
+
+    def _finish(self, state: StoryState, draft_result: GateResult) -> PipelineResult:
+        """Checkpoint the draft and run Gate 3 on it."""
+        if not draft_result.passed:
+            return self._fail(state, f"Gate 2 failed: {', '.join(draft_result.issues)}")
+        self._complete(state, "draft", draft_result.content)
 
         # Gate 3: Safety Review
         safety_gate = SafetyGate(self.loader)
-        final_result = safety_gate.review(draft_result.content)
+        with metrics.timer("stage", stage="final"):
+            final_result = safety_gate.review(draft_result.content)
+        changes = final_result.metrics.get("changes", [])
+        for change in changes:
+            metrics.count("redactions", category=change["category"])
 
         if not final_result.passed:
-            return PipelineResult(
-                success=False,
-                error=f"Gate 3 failed: {', '.join(final_result.issues)}",
-                spec_path=spec_path,
-                draft_path=draft_path,
+            return self._fail(state, f"Gate 3 failed: {', '.join(final_result.issues)}")
+        state.redactions = changes
+        self._complete(state, "final", final_result.content)
+
+        state.status = "done"
+        state.error = None
+        state.save(self.output_dir)
+        return self._result(state, success=True)
+
+    def _begin(self) -> StoryState:
+        """Load this story's checkpoint, or start a fresh one."""
+        if self.story_id is not None:
+            state = load_state(self.output_dir, self.story_id)
+            if state is not None:
+                state.status = "running"
+                return state
+        state = StoryState(
+            story_id=self.story_id or self._generate_story_id(),
+            theme=self.theme,
+            constraints=self.constraints,
+            formula=self.formula,
+        )
+        state.save(self.output_dir)
+        return state
+
+    def _checkpointed(self, state: StoryState, stage: str) -> Optional[GateResult]:
+        """A finished stage's artifact as a passing result, if still on disk."""
+        if not state.is_complete(stage):
+            return None
+        try:
+            content = artifact_path(self.output_dir, state.story_id, stage).read_text(
+                encoding="utf-8"
             )
+        except OSError:
+            # Artifact removed since: redo this stage and every later one.
+            del state.completed[state.completed.index(stage):]
+            return None
+        return GateResult(passed=True, content=content)
+
+    def _complete(self, state: StoryState, stage: str, content: str) -> None:
+        """Write a stage's artifact and record it in the checkpoint."""
+        if state.is_complete(stage):
+            return
+        path = artifact_path(self.output_dir, state.story_id, stage)
+        path.write_text(content, encoding="utf-8")
+        state.completed.append(stage)
+        state.save(self.output_dir)
 
-        final_path = self.output_dir / f"final_trap_{story_id}.txt"
-        final_path.write_text(final_result.content, encoding="utf-8")
+    def _fail(self, state: StoryState, error: str) -> PipelineResult:
+        """Record a failed run so a resume picks up at the failed stage."""
+        state.status = "failed"
+        state.error = error
+        state.save(self.output_dir)
+        return self._result(state, success=False, error=error)
 
+    def _result(
+        self, state: StoryState, success: bool, error: Optional[str] = None
+    ) -> PipelineResult:
+        """Pipeline result pointing at the artifacts of the finished stages."""
+        paths = {
+            stage: artifact_path(self.output_dir, state.story_id, stage)
+            for stage in state.completed
+        }
         return PipelineResult(
-            success=True,
-            output_path=final_path,
-            spec_path=spec_path,
-            draft_path=draft_path,
-            final_path=final_path,
+            success=success,
+            output_path=paths.get("final"),
+            error=error,
+            spec_path=paths.get("spec"),
+            draft_path=paths.get("draft"),
+            final_path=paths.get("final"),
+            story_id=state.story_id,
+            redactions=list(state.redactions),
         )
 
     def _generate_story_id(self) -> str:
-        """Generate a unique story ID based on timestamp."""
-        from datetime import datetime
-        return datetime.now().strftime("%Y%m%d_%H%M%S")
+        """Generate a unique story ID (see :func:`new_story_id`)."""
+        return new_story_id()
@@ -0,0 +1,214 @@
+"""Machine-readable audit records and the reports rendered from them.
+
+An audit produces a stream of JSON records:
+
+- one ``audit`` record naming the target and gate selection,
+- one ``result`` record per file per gate, with issues, hit offsets,
+  metrics and the file's audit time,
+- one ``error`` record per file that could not be read,
+- one closing ``summary`` record.
+
+Records are written as NDJSON or a JSON array and flushed one at a time, so
+consumers can start before a batch finishes. The Markdown report is
+rendered from the same records.
+"""
+
+import json
+from collections import Counter
+from datetime import datetime
+from pathlib import Path
+from typing import IO, Any, Iterable, Iterator
+
+from .batch import BatchSummary, FileAudit
+
+# Output formats accepted by ``maze audit --format``
+FORMATS = ("markdown", "json", "ndjson")
+
+# Default report file name per format
+REPORT_NAMES = {
+    "markdown": "Audit_Report.md",
+    "json": "audit.json",
+    "ndjson": "audit.ndjson",
+}
+
+
+def header_record(target: str, gate: str, batch: bool) -> dict[str, Any]:
+    """Opening record describing the audit run."""
+    return {
+        "type": "audit",
+        "target": target,
+        "gate": gate,
+        "batch": batch,
+        "date": datetime.now().isoformat(),
+    }
+
+
+def file_records(audit: FileAudit) -> list[dict[str, Any]]:
+    """One record per gate for an audited file, or one error record."""
+    path = str(audit.path)
+    seconds = round(audit.seconds, 6)
+    if audit.error is not None:
+        return [{"type": "error", "path": path, "error": audit.error, "seconds": seconds}]
+
+    records = []
+    for name, result in zip(audit.gate_names, audit.results):
+        details = dict(result.metrics)
+        hits = details.pop("hits", [])
+        records.append({
+            "type": "result",
+            "path": path,
+            "gate": name,
+            "passed": result.passed,
+            "issues": result.issues,
+            "hits": hits,
+            "metrics": details,
+            "seconds": seconds,
+        })
+    return records
+
+
+def summary_record(summary: BatchSummary, seconds: float) -> dict[str, Any]:
+    """Closing record with batch totals."""
+    return {
+        "type": "summary",
+        "files": summary.files,
+        "passed": summary.passed,
+        "failed": summary.failed,
+        "errors": summary.errors,
+        "seconds": round(seconds, 6),
+    }
+
+
+class RecordWriter:
+    """Writes records as NDJSON or a JSON array, flushing after each one."""
+
+    def __init__(self, f: IO[str], fmt: str = "ndjson") -> None:
+        if fmt not in ("json", "ndjson"):
+            raise ValueError(f"Unsupported record format: {fmt}")
+        self._file = f
+        self._array = fmt == "json"
+        self._count = 0
+
+    def write(self, record: dict[str, Any]) -> None:
+        line = json.dumps(record, ensure_ascii=False)
+        if self._array:
+            line = ("[\n" if self._count == 0 else ",\n") + line
+        else:
+            line += "\n"
+        self._file.write(line)
+        self._file.flush()
+        self._count += 1
+
+    def close(self) -> None:
+        """Finish the JSON array, if writing one."""
+        if self._array:
+            self._file.write("[]\n" if self._count == 0 else "\n]\n")
+            self._file.flush()
+
+
+def read_records(path: Path) -> Iterator[dict[str, Any]]:
+    """Records from an NDJSON file or a JSON array file."""
+    with open(path, encoding="utf-8") as f:
+        first = f.read(1)
+        while first.isspace():
+            first = f.read(1)
+        if first == "[":
+            yield from json.loads(first + f.read())
+            return
+        f.seek(0)
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def render_markdown(records: Iterable[dict[str, Any]]) -> Iterator[str]:
+    """The Markdown audit report for a stream of records, in pieces."""
+    batch = False
+    files = passed = failed = errors = 0
+    gate_failures: Counter = Counter()
+    issue_counts: Counter = Counter()
+    current_path = None
+    current_passed = True
+
+    def close_file() -> None:
+        nonlocal passed, failed
+        if current_path is None:
+            return
+        if current_passed:
+            passed += 1
+        else:
+            failed += 1
+
+    for record in records:
+        kind = record.get("type")
+        if kind == "audit":
+            batch = record["batch"]
+            title = record["target"] if batch else Path(record["target"]).name
+            yield f"# Audit Report: {title}\n\n"
+            yield f"**Date**: {record['date']}\n"
+            yield f"**Gate**: {record['gate']}\n\n---\n\n"
+
+        elif kind == "error":
+            close_file()
+            current_path = None
+            files += 1
+            errors += 1
+            yield f"## {record['path']}\n\n**Error**: {record['error']}\n\n"
+
+        elif kind == "result":
+            if record["path"] != current_path:
+                close_file()
+                current_path, current_passed = record["path"], True
+                files += 1
+                if batch:
+                    yield f"## {record['path']}\n\n"
+            current_passed = current_passed and record["passed"]
+            if not record["passed"]:
+                gate_failures[record["gate"]] += 1
+            issue_counts.update(record["issues"])
+
+            yield f"{'###' if batch else '##'} {record['gate']}\n\n"
+            yield f"**Status**: {'PASS' if record['passed'] else 'FAIL'}\n\n"
+            if record["issues"]:
+                yield "**Issues**:\n"
+                for issue in record["issues"]:
+                    yield f"- {issue}\n"
+            yield from _render_stages(record["metrics"])
+            yield "\n"
+
+    close_file()
+    if not batch:
+        return
+
+    yield "---\n\n## Summary\n\n"
+    yield f"- Files: {files}\n"
+    yield f"- Passed: {passed}\n"
+    yield f"- Failed: {failed}\n"
+    yield f"- Errors: {errors}\n"
+    for name, count in gate_failures.items():
+        yield f"- {name} failures: {count}\n"
+    if issue_counts:
+        yield "\n**Top Issues**:\n"
+        for issue, count in issue_counts.most_common(20):
+            yield f"- {issue} ({count})\n"
+
+
+def _render_stages(details: dict[str, Any]) -> Iterator[str]:
+    """Per-stage positional metrics, if the result has any."""
+    stages = details.get("stages")
+    if not stages:
+        return
+    yield "\n**Stages**:\n"
+    for stage in stages:
+        yield (
+            f"- {stage['name']} ({stage['range']}, characters {stage['start']}-{stage['end']}): "
+            f"density {stage['density']}, explanatory {stage['explanatory']}\n"
+        )
+
+
+def write_markdown(records: Iterable[dict[str, Any]], path: Path) -> None:
+    """Render records into a Markdown report file."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        for piece in render_markdown(records):
+            f.write(piece)
@@ -0,0 +1,367 @@
+"""External rule packs for the gates.
+
+A rule pack is a JSON file under ``library/rules/`` holding the gates'
+rule tables, one section per gate::
+
+    {
+      "name": "default",
+      "quality": {"forbidden_patterns": [["^#{1,6}\\\\s+", "Markdown headers"]], ...},
+      "safety": {"prohibited_categories": {...}, "psychological_warnings": [...]},
+      "idea": {"audit_prohibited": [...]}
+    }
+
+Keys name a gate's upper-case table; any table a pack leaves out keeps the
+gate's class default, which is the only copy of the built-in tables (the
+shipped ``default.json`` overrides nothing). A pack is checked when it is
+parsed: unknown sections or tables, and values not shaped like the default
+table, are rejected. Gates read their tables from the pack as soon as it
+is loaded. The first fused audit over every gate compiles the pack into a
+single combined scanner over all their rules. That compiled scanner is
+pickled beside the library, keyed by the hash of the pack's content and
+signed (see :mod:`maze.signing`), so later processes load it instead of
+recompiling. Loaders re-check the pack file at most every
+``RELOAD_INTERVAL`` seconds, which lets a long-running process pick up an
+edited or swapped pack without a restart.
+"""
+
+import hashlib
+import importlib
+import json
+import os
+import pickle
+import threading
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any
+
+from . import signing
+from .matcher import RuleScanner
+
+# Bump when the pickled layout of RulePack or the matcher classes changes
+RULES_FORMAT = 1
+
+# Pack used when none is named
+DEFAULT_RULE_PACK = "default"
+
+# Environment variable naming the pack (a name under library/rules/ or a path)
+RULE_PACK_ENV = "MAZE_RULE_PACK"
+
+# Seconds a loader keeps using a pack or library snapshot before checking
+# their files for changes
+RELOAD_INTERVAL = 1.0
+
+# Gate sections of a pack, in the order the combined scanner lists them;
+# each is also the name of its gate's module under maze.gates
+SECTIONS = ("idea", "quality", "safety")
+
+# Top-level pack keys besides the gate sections
+PACK_KEYS = ("name", "description")
+
+# Default of every rule table by section, filled in as gate classes are
+# defined (see RuleTable.__set_name__)
+_defaults: dict[str, dict[str, Any]] = {}
+
+
+@dataclass
+class RulePack:
+    """A parsed rule pack; its combined scanner is compiled on first use.
+
+    ``rules`` holds each section's effective (keyword rules, pattern rules)
+    and ``scanner`` matches all of them, with categories namespaced as
+    ``section:category``. Both are filled in by :meth:`compiled`.
+    """
+    name: str
+    digest: str
+    tables: dict[str, dict[str, Any]] = field(default_factory=dict)
+    signature: str = ""
+    cache_path: Path | None = None
+    rules: dict[str, tuple[dict[str, list[str]], list[tuple[str, str, int]]]] = field(
+        default_factory=dict
+    )
+    scanner: RuleScanner | None = None
+    origin: str = "json"
+
+    def table(self, section: str, name: str, default: Any) -> Any:
+        """A gate table from the pack, or ``default`` if the pack has none."""
+        return self.tables.get(section, {}).get(name, default)
+
+    def compiled(self) -> RuleScanner:
+        """The combined scanner, from the compiled file or built now."""
+        if self.scanner is None:
+            with _compile_lock:
+                if self.scanner is None:
+                    _load_or_compile(self)
+        return self.scanner
+
+
+class RuleTable:
+    """A gate rule table that the loader's rule pack may override.
+
+    Read through a gate instance, it returns the pack's table for the
+    gate's ``RULE_SECTION`` if there is one, else the class default. Read
+    through the class, it is always the default.
+    """
+
+    def __init__(self, default: Any) -> None:
+        self.default = default
+        self.name = ""
+
+    def __set_name__(self, owner: type, name: str) -> None:
+        self.name = name
+        _defaults.setdefault(owner.RULE_SECTION, {})[name] = self.default
+
+    def __get__(self, gate: Any, owner: type | None = None) -> Any:
+        if gate is None:
+            return self.default
+        pack = getattr(gate.loader, "rules", None) if gate.loader is not None else None
+        if not isinstance(pack, RulePack):
+            return self.default
+        return pack.table(gate.RULE_SECTION, self.name, self.default)
+
+    def __repr__(self) -> str:
+        return repr(self.default)
+
+
+def rule_pack_path(library_path: Path, rule_pack: str | Path | None = None) -> Path:
+    """File of a rule pack given by name or path; defaults to $MAZE_RULE_PACK."""
+    rule_pack = rule_pack or os.environ.get(RULE_PACK_ENV) or DEFAULT_RULE_PACK
+    path = Path(rule_pack)
+    if path.suffix == ".json" or len(path.parts) > 1:
+        return path
+    return Path(library_path) / "rules" / f"{rule_pack}.json"
+
+
+def pack_signature(path: Path) -> str:
+    """Cheap change signature from the pack file's size and mtime."""
+    try:
+        stat = path.stat()
+    except OSError:
+        return "missing"
+    return f"{stat.st_size}:{stat.st_mtime_ns}"
+
+
+def section_defaults(section: str) -> dict[str, Any]:
+    """Default tables of a section's gate, importing the gate if needed."""
+    importlib.import_module(f"{__package__}.gates.{section}")
+    return _defaults.get(section, {})
+
+
+def _fits(value: Any, default: Any) -> bool:
+    """Whether a pack value is shaped like a table's default.
+
+    Lists and objects may hold any number of items, each shaped like one of
+    the default's; a tuple stands for a list of exactly that shape.
+    """
+    if isinstance(default, dict):
+        return isinstance(value, dict) and all(
+            any(_fits(item, sample) for sample in default.values()) for item in value.values()
+        )
+    if isinstance(default, tuple):
+        return (
+            isinstance(value, list) and len(value) == len(default)
+            and all(map(_fits, value, default))
+        )
+    if isinstance(default, list):
+        return isinstance(value, list) and all(
+            any(_fits(item, sample) for sample in default) for item in value
+        )
+    if default is None:
+        return value is None
+    return isinstance(value, type(default)) and not isinstance(value, bool)
+
+
+def _shape(default: Any) -> str:
+    """Description of the JSON a table's default stands for."""
+    if isinstance(default, dict):
+        values = " or ".join(sorted({_shape(sample) for sample in default.values()}))
+        return f"an object of {values}"
+    if isinstance(default, tuple):
+        return "[" + ", ".join(_shape(sample) for sample in default) + "]"
+    if isinstance(default, list):
+        return "a list of " + " or ".join(sorted({_shape(sample) for sample in default}))
+    if default is None:
+        return "null"
+    return "string" if isinstance(default, str) else "number"
+
+
+def parse_tables(data: dict[str, Any]) -> dict[str, dict[str, Any]]:
+    """Gate tables by section, keyed by their upper-case attribute names.
+
+    Raises ValueError for unknown keys and for tables not shaped like the
+    gate's default.
+    """
+    for key in data:
+        if key not in SECTIONS and key not in PACK_KEYS:
+            raise ValueError(f"unknown section '{key}'")
+    tables = {}
+    for section in SECTIONS:
+        entries = data.get(section, {})
+        if not isinstance(entries, dict):
+            raise ValueError(f"section '{section}' must be an object")
+        defaults = section_defaults(section) if entries else {}
+        tables[section] = {}
+        for key, value in entries.items():
+            name = key.upper()
+            if name not in defaults:
+                raise ValueError(f"unknown table '{section}.{key}'")
+            if not _fits(value, defaults[name]):
+                raise ValueError(f"table '{section}.{key}' must be {_shape(defaults[name])}")
+            tables[section][name] = value
+    return tables
+
+
+class _PackLoader:
+    """Stand-in loader that lets gates read their tables from one pack."""
+
+    def __init__(self, pack: RulePack) -> None:
+        self.rules = pack
+
+
+def _gate_types() -> tuple[type, ...]:
+    from .gates.idea import IdeaGate
+    from .gates.quality import QualityGate
+    from .gates.safety import SafetyGate
+    return IdeaGate, QualityGate, SafetyGate
+
+
+def effective_rules(
+    pack: RulePack,
+) -> dict[str, tuple[dict[str, list[str]], list[tuple[str, str, int]]]]:
+    """Each gate's (keyword rules, pattern rules) with the pack applied."""
+    rules = {}
+    for gate_type in _gate_types():
+        gate = gate_type(_PackLoader(pack))
+        rules[gate.RULE_SECTION] = (gate.keyword_rules(), gate.pattern_rules())
+    return rules
+
+
+def compile_pack(pack: RulePack) -> None:
+    """Compute each section's effective rules and the combined scanner."""
+    folded_sections = {
+        gate_type.RULE_SECTION for gate_type in _gate_types()
+        if getattr(gate_type, "FOLD_KEYWORDS", False)
+    }
+    keywords: dict[str, list[str]] = {}
+    folded: dict[str, list[str]] = {}
+    patterns: list[tuple[str, str, int]] = []
+    pack.rules = effective_rules(pack)
+    for section, (keyword_rules, pattern_rules) in pack.rules.items():
+        target = folded if section in folded_sections else keywords
+        for category, words in keyword_rules.items():
+            target[f"{section}:{category}"] = words
+        for category, pattern, flags in pattern_rules:
+            patterns.append((f"{section}:{category}", pattern, flags))
+    pack.scanner = RuleScanner(keywords, patterns, folded)
+
+
+def _load_or_compile(pack: RulePack) -> None:
+    """Fill in a pack's scanner from its compiled file, or compile and save it.
+
+    The compiled file is keyed by the pack's content only, and the gates'
+    default tables may have changed since, so it is used only if its rules
+    still match.
+    """
+    rules = effective_rules(pack)
+    cached = _read_cached(pack.cache_path) if pack.cache_path is not None else None
+    if cached is not None and cached.get("digest") == pack.digest and cached["rules"] == rules:
+        pack.rules, pack.scanner = rules, cached["scanner"]
+        pack.origin = "cache"
+        return
+    compile_pack(pack)
+    if pack.cache_path is not None:
+        _write_cached(pack.cache_path, pack)
+
+
+def parse_pack(path: Path, data: bytes, signature: str, library_path: Path) -> RulePack:
+    """Parse a pack from its file content; compilation is left for later."""
+    try:
+        parsed = json.loads(data) if data else {}
+    except ValueError as e:
+        raise ValueError(f"Rule pack {path} is not valid JSON: {e}") from e
+    if not isinstance(parsed, dict):
+        raise ValueError(f"Rule pack {path} must be a JSON object")
+    try:
+        tables = parse_tables(parsed)
+    except ValueError as e:
+        raise ValueError(f"Rule pack {path}: {e}") from e
+    digest = hashlib.sha256(f"format={RULES_FORMAT}\0".encode("ascii") + data).hexdigest()
+    return RulePack(
+        name=str(parsed.get("name", path.stem)),
+        digest=digest,
+        tables=tables,
+        signature=signature,
+        cache_path=pack_cache_path(library_path, digest),
+    )
+
+
+def pack_cache_path(library_path: Path, digest: str) -> Path:
+    """Compiled pack file, kept with the library snapshot cache."""
+    return Path(library_path) / ".cache" / f"rules-{digest[:32]}.pickle"
+
+
+def _read_cached(path: Path) -> dict[str, Any] | None:
+    """Load a signed compiled pack; unsigned or foreign files are ignored."""
+    try:
+        cached = signing.loads(path.read_bytes())
+    except (OSError, ValueError, pickle.UnpicklingError, EOFError, AttributeError):
+        return None
+    return cached if isinstance(cached, dict) else None
+
+
+def _write_cached(path: Path, pack: RulePack) -> None:
+    """Write a signed compiled pack atomically; failures only cost a recompile."""
+    try:
+        blob = signing.dumps(
+            {"digest": pack.digest, "rules": pack.rules, "scanner": pack.scanner}
+        )
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(f".{os.getpid()}.tmp")
+        with open(tmp, "wb") as f:
+            f.write(blob)
+        os.replace(tmp, path)
+    except OSError:
+        pass
+
+
+_packs: dict[Path, RulePack] = {}
+_lock = threading.Lock()
+_compile_lock = threading.Lock()
+
+
+def load_rule_pack(path: Path, library_path: Path) -> RulePack:
+    """Return the shared parsed pack for a file, re-reading it only on change.
+
+    A missing file gives an empty pack, so every gate keeps its defaults.
+    While an edited pack fails to parse, the last good one stays in use.
+    """
+    path = Path(path).resolve()
+    signature = pack_signature(path)
+
+    with _lock:
+        pack = _packs.get(path)
+        if pack is not None and pack.signature == signature:
+            return pack
+
+        try:
+            data = path.read_bytes()
+        except OSError:
+            data = b""
+        try:
+            new_pack = parse_pack(path, data, signature, library_path)
+        except ValueError:
+            if pack is not None:
+                return pack
+            raise
+        if pack is not None and pack.digest == new_pack.digest:
+            # Touched but unchanged: keep the compiled scanner.
+            pack.signature = signature
+            return pack
+
+        _packs[path] = new_pack
+        return new_pack
+
+
+def clear_packs() -> None:
+    """Forget every in-process pack (the compiled files are kept)."""
+    with _lock:
+        _packs.clear()
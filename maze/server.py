@@ -0,0 +1,336 @@
+"""Long-running audit daemon behind ``maze serve``.
+
+The daemon keeps one :class:`ResourceLoader` and the compiled gate rules
+warm, and answers requests over a Unix socket or a localhost port. The
+protocol is one JSON object per line in each direction; a connection may
+send any number of requests. See :mod:`maze.client` for the client side.
+
+Requests::
+
+    {"op": "audit", "path": "/abs/draft.txt", "gate": "all"}
+    {"op": "audit", "content": "...", "name": "draft.txt"}
+    {"op": "generate", "theme": "...", "output": "/abs/output"}
+    {"op": "ping"}
+
+Every response has ``ok``; failed requests carry ``error`` instead of a
+result. ``generate`` writes only below the service's output root; a
+daemon on a port, which any local user can reach, refuses it unless an
+output root was configured.
+"""
+
+import asyncio
+import json
+import os
+import signal
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any
+
+from .batch import audit_file
+from .cache import AuditCache
+from .client import default_socket_path
+from .gates import FusedAudit, GateResult, select_gates
+from .library.loader import ResourceLoader
+from .pipeline import Pipeline
+
+# Longest request line accepted, in bytes
+MAX_REQUEST = 64 * 1024 * 1024
+
+
+class RequestError(Exception):
+    """A request was malformed or asked for something unknown."""
+
+
+def result_record(name: str, result: GateResult) -> dict[str, Any]:
+    """JSON form of one gate's result."""
+    return {
+        "gate": name,
+        "passed": result.passed,
+        "issues": result.issues,
+        "metrics": result.metrics,
+    }
+
+
+class AuditService:
+    """Request handlers sharing one warm library and compiled gate set.
+
+    Fused audits are built once per gate selection and reused; they only
+    read shared state, so requests can be handled on several threads.
+    """
+
+    def __init__(
+        self,
+        loader: ResourceLoader | None = None,
+        cache_dir: Path | None = None,
+        output_root: Path | None = None,
+        allow_generate: bool = True,
+    ) -> None:
+        self.loader = loader or ResourceLoader()
+        self.cache = AuditCache(cache_dir) if cache_dir is not None else None
+        self.output_root = Path(output_root).resolve() if output_root is not None else None
+        self.allow_generate = allow_generate
+        self._audits: dict[tuple[str, bool, str | None], FusedAudit] = {}
+        self._lock = threading.Lock()
+
+    def warm(self) -> None:
+        """Load the library and compile the default gate set up front."""
+        _ = self.loader.snapshot
+        self.fused("all", False, None).scan("")
+
+    def fused(self, gate: str, positional: bool, formula: str | None) -> FusedAudit:
+        """The shared fused audit for a gate selection."""
+        key = (gate, positional, formula)
+        with self._lock:
+            audit = self._audits.get(key)
+            if audit is None:
+                audit = FusedAudit(select_gates(self.loader, gate, positional, formula))
+                self._audits[key] = audit
+            return audit
+
+    def handle(self, request: dict[str, Any]) -> dict[str, Any]:
+        """Answer one request; errors become ``{"ok": false, "error": ...}``."""
+        handlers = {"audit": self.audit, "generate": self.generate, "ping": self.ping}
+        try:
+            if not isinstance(request, dict):
+                raise RequestError("Request must be a JSON object")
+            handler = handlers.get(request.get("op"))
+            if handler is None:
+                raise RequestError(f"Unknown op: {request.get('op')!r}")
+            response = {"ok": True, **handler(request)}
+        except (RequestError, OSError, UnicodeDecodeError, ValueError) as e:
+            response = {"ok": False, "error": str(e)}
+        except Exception as e:
+            # A bug in one request must not take the connection down with it.
+            response = {"ok": False, "error": f"Internal error: {e!r}"}
+        if isinstance(request, dict) and "id" in request:
+            response["id"] = request["id"]
+        return response
+
+    def ping(self, request: dict[str, Any]) -> dict[str, Any]:
+        return {"pid": os.getpid()}
+
+    def audit(self, request: dict[str, Any]) -> dict[str, Any]:
+        """Audit a file by path, or inline ``content``."""
+        gate = request.get("gate", "all")
+        if gate not in ("idea", "quality", "safety", "all"):
+            raise RequestError(f"Unknown gate: {gate}")
+        formula = request.get("formula")
+        if formula is not None and not self.known_formula(formula):
+            raise RequestError(f"Unknown formula: {formula!r}")
+        audit = self.fused(gate, bool(request.get("positional")), formula)
+
+        if "content" in request:
+            path = Path(request.get("name", "draft.txt"))
+            results = audit.audit(request["content"], path)
+        elif "path" in request:
+            path = Path(request["path"])
+            if not path.is_file():
+                raise RequestError(f"File not found: {path}")
+            results = audit_file(audit, path, self.cache)
+        else:
+            raise RequestError("Audit needs 'path' or 'content'")
+
+        return {
+            "path": str(path),
+            "passed": all(result.passed for result in results),
+            "results": [
+                result_record(g.name, result) for g, result in zip(audit.gates, results)
+            ],
+        }
+
+    def generate(self, request: dict[str, Any]) -> dict[str, Any]:
+        """Run one story through the pipeline."""
+        if not self.allow_generate:
+            raise RequestError("Generate is disabled on this daemon")
+        if not request.get("theme"):
+            raise RequestError("Generate needs a 'theme'")
+        result = Pipeline(
+            theme=request["theme"],
+            constraints=request.get("constraints", ""),
+            formula=request.get("formula", "auto"),
+            output_dir=self.output_dir(request.get("output", "./output")),
+            loader=self.loader,
+        ).run()
+        return {
+            "story_id": result.story_id,
+            "passed": result.success,
+            "error": result.error,
+            "spec_path": str(result.spec_path) if result.spec_path else None,
+            "draft_path": str(result.draft_path) if result.draft_path else None,
+            "final_path": str(result.final_path) if result.final_path else None,
+            "redactions": result.redactions,
+        }
+
+    def known_formula(self, formula: Any) -> bool:
+        """Whether ``formula`` names a library formula, with or without its prefix.
+
+        Fused audits are cached per formula, so only these names may key them.
+        """
+        baits = self.loader.baits
+        return isinstance(formula, str) and (formula in baits or f"formula_{formula}" in baits)
+
+    def output_dir(self, output: str) -> Path:
+        """Resolve a requested output directory, keeping it under the output root."""
+        if self.output_root is None:
+            return Path(output)
+        path = (self.output_root / output).resolve()
+        if not path.is_relative_to(self.output_root):
+            raise RequestError(f"Output must be under {self.output_root}: {output}")
+        return path
+
+
+class AuditServer:
+    """Asyncio server dispatching requests to an :class:`AuditService`.
+
+    Connections are served concurrently; each request runs on a thread pool
+    of ``workers`` so a long audit never blocks the event loop. With
+    ``port`` the server listens on localhost, otherwise on ``socket_path``.
+    """
+
+    def __init__(
+        self,
+        service: AuditService | None = None,
+        socket_path: Path | None = None,
+        port: int | None = None,
+        workers: int = 4,
+    ) -> None:
+        self.service = service or AuditService()
+        self.socket_path = None if port is not None else (socket_path or default_socket_path())
+        self.port = port
+        self.requests = 0
+        self._executor = ThreadPoolExecutor(max_workers=workers)
+        self._server: asyncio.AbstractServer | None = None
+        self._handlers: dict[asyncio.Task, asyncio.StreamWriter] = {}
+
+    @property
+    def address(self) -> str:
+        if self.socket_path is not None:
+            return str(self.socket_path)
+        return f"127.0.0.1:{self.port}"
+
+    async def start(self) -> None:
+        self.service.warm()
+        if self.socket_path is None:
+            self._server = await asyncio.start_server(
+                self._handle, "127.0.0.1", self.port, limit=MAX_REQUEST
+            )
+            self.port = self._server.sockets[0].getsockname()[1]
+            return
+
+        if self.socket_path.exists():
+            if await _listening(self.socket_path):
+                raise OSError(f"A daemon is already listening on {self.socket_path}")
+            self.socket_path.unlink()
+        # Create the socket private to this user; chmod afterwards would leave
+        # a window in which others could connect.
+        umask = os.umask(0o177)
+        try:
+            self._server = await asyncio.start_unix_server(
+                self._handle, str(self.socket_path), limit=MAX_REQUEST
+            )
+        finally:
+            os.umask(umask)
+        os.chmod(self.socket_path, 0o600)
+
+    async def serve_forever(self) -> None:
+        if self._server is None:
+            await self.start()
+        await self._server.serve_forever()
+
+    async def close(self) -> None:
+        """Stop listening, drop client connections and remove the socket."""
+        if self._server is None:
+            return
+        self._server.close()
+        for writer in self._handlers.values():
+            writer.close()
+        await asyncio.gather(*self._handlers, return_exceptions=True)
+        await self._server.wait_closed()
+        self._server = None
+        self._executor.shutdown(wait=False)
+        if self.socket_path is not None and self.socket_path.exists():
+            self.socket_path.unlink()
+
+    async def __aenter__(self) -> "AuditServer":
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.close()
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        task = asyncio.current_task()
+        self._handlers[task] = writer
+        loop = asyncio.get_running_loop()
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                try:
+                    request = json.loads(line)
+                except ValueError as e:
+                    response = {"ok": False, "error": f"Bad request: {e}"}
+                else:
+                    self.requests += 1
+                    response = await loop.run_in_executor(
+                        self._executor, self.service.handle, request
+                    )
+                writer.write(json.dumps(response, ensure_ascii=False).encode("utf-8") + b"\n")
+                await writer.drain()
+        except (ConnectionError, asyncio.LimitOverrunError, ValueError):
+            pass
+        finally:
+            del self._handlers[task]
+            writer.close()
+
+
+async def _listening(socket_path: Path) -> bool:
+    """Whether something accepts connections on a Unix socket path."""
+    try:
+        _, writer = await asyncio.open_unix_connection(str(socket_path))
+    except OSError:
+        return False
+    writer.close()
+    return True
+
+
+def serve(
+    socket_path: Path | None = None,
+    port: int | None = None,
+    workers: int = 4,
+    cache_dir: Path | None = None,
+    rule_pack: str | None = None,
+    output_root: Path | None = None,
+) -> None:
+    """Run the daemon in the foreground until interrupted.
+
+    Edits to the rule pack are picked up by requests without a restart.
+    On a port, ``generate`` is only served with an ``output_root``.
+    """
+    service = AuditService(
+        ResourceLoader(rule_pack=rule_pack),
+        cache_dir=cache_dir,
+        output_root=output_root,
+        allow_generate=port is None or output_root is not None,
+    )
+    server = AuditServer(service, socket_path, port, workers)
+
+    async def run() -> None:
+        await server.start()
+        print(f"[OK] maze serve listening on {server.address}", flush=True)
+        task = asyncio.current_task()
+        try:
+            asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, task.cancel)
+        except (NotImplementedError, AttributeError):
+            pass
+        try:
+            await server.serve_forever()
+        finally:
+            await server.close()
+
+    try:
+        asyncio.run(run())
+    except (KeyboardInterrupt, asyncio.CancelledError):
+        pass
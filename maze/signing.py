@@ -0,0 +1,74 @@
+"""Authenticated pickles for the compiled caches kept beside the library.
+
+The library snapshot and compiled rule packs are cached as pickles under
+``library/.cache``. Unpickling can run arbitrary code, and whoever can
+write to the library directory could plant such a file, so every cached
+pickle is prefixed with an HMAC-SHA256 under a per-user key. The key lives
+in the user's cache directory, readable by its owner only; a file that was
+not written with it is rejected and rebuilt from the JSON sources.
+"""
+
+import hashlib
+import hmac
+import os
+import pickle
+import secrets
+import threading
+from pathlib import Path
+from typing import Any
+
+# Length of the HMAC prefix
+MAC_SIZE = hashlib.sha256().digest_size
+
+_key: bytes | None = None
+_lock = threading.Lock()
+
+
+def key_path() -> Path:
+    """The per-user signing key, beside the audit cache."""
+    from .cache import default_cache_dir
+    return default_cache_dir().parent / "pickle.key"
+
+
+def _load_key() -> bytes:
+    """Read the signing key, creating it (mode 0600) on first use.
+
+    Raises OSError if the key file is not the user's own or others can
+    read or write it, since then it could have been forged.
+    """
+    global _key
+    with _lock:
+        if _key is not None:
+            return _key
+        path = key_path()
+        path.parent.mkdir(parents=True, exist_ok=True)
+        try:
+            fd = os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY, 0o600)
+        except FileExistsError:
+            pass
+        else:
+            with os.fdopen(fd, "wb") as f:
+                f.write(secrets.token_bytes(32))
+        stat = path.stat()
+        if stat.st_uid != os.getuid() or stat.st_mode & 0o077:
+            raise OSError(f"Refusing signing key not private to this user: {path}")
+        key = path.read_bytes()
+        if len(key) < 32:
+            raise OSError(f"Signing key is truncated: {path}")
+        _key = key
+        return _key
+
+
+def dumps(obj: Any) -> bytes:
+    """Pickle ``obj`` behind an HMAC of the pickled bytes."""
+    data = pickle.dumps(obj, protocol=pickle.HIGHEST_PROTOCOL)
+    return hmac.new(_load_key(), data, hashlib.sha256).digest() + data
+
+
+def loads(blob: bytes) -> Any:
+    """Unpickle data written by :func:`dumps`; raises ValueError if unsigned."""
+    mac, data = blob[:MAC_SIZE], blob[MAC_SIZE:]
+    expected = hmac.new(_load_key(), data, hashlib.sha256).digest()
+    if not hmac.compare_digest(mac, expected):
+        raise ValueError("Cached pickle has no valid signature")
+    return pickle.loads(data)
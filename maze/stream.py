@@ -0,0 +1,210 @@
+"""Streaming, chunked audit for very large documents."""
+
+import re
+from pathlib import Path
+from typing import Any
+
+from . import metrics
+from .gates.fused import FusedAudit
+from .gates.document import CJK_RUN, Document, ProfileBuilder, count_cjk
+from .matcher import KeywordHit, MatchReport
+from .normalize import INVISIBLE, SPACES
+
+# Characters owned by each scan window
+DEFAULT_CHUNK_SIZE = 1 << 20
+
+# Context characters kept on both sides of a window. Rule matches up to this
+# long that straddle a window boundary are still found.
+DEFAULT_OVERLAP = 4096
+
+# Files larger than this are audited by streaming rather than in memory
+STREAM_THRESHOLD_BYTES = 32 << 20
+
+# Documents that may be JSON are buffered for the idea gate up to this size
+MAX_SPEC_CHARS = 1 << 20
+
+# Rule hits kept in full per streamed document; past this only the last hit
+# of each keyword is kept and the others are counted
+MAX_STREAM_HITS = 10_000
+
+# First non-whitespace characters a JSON document can start with
+JSON_START = set('{["-0123456789tfn')
+
+# Characters normalization never drops (see maze.normalize)
+_KEPT = re.compile(f"[^{SPACES}{INVISIBLE}]")
+
+
+def should_stream(path: Path) -> bool:
+    """Whether a file is large enough to be audited by streaming."""
+    return path.stat().st_size > STREAM_THRESHOLD_BYTES
+
+
+def audit_stream(
+    audit: FusedAudit,
+    path: Path,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    overlap: int = DEFAULT_OVERLAP,
+    max_hits: int = MAX_STREAM_HITS,
+) -> list[Any]:
+    """Audit a file chunk by chunk, returning results in gate order."""
+    with metrics.timer("scan", mode="stream"):
+        report, document = scan_stream(audit, path, chunk_size, overlap, max_hits)
+    return audit.audit_document(report, document, path)
+
+
+def scan_stream(
+    audit: FusedAudit,
+    path: Path,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    overlap: int = DEFAULT_OVERLAP,
+    max_hits: int = MAX_STREAM_HITS,
+) -> tuple[MatchReport, Document]:
+    """Scan a file chunk by chunk for the rules of a fused audit.
+
+    Each window owns ``chunk_size`` characters and sees ``overlap`` more on
+    either side, so a match is reported exactly once, by the window its start
+    falls in, with the same offsets as an in-memory scan. The report keeps
+    the first ``max_hits`` hits; after that it keeps only the latest hit of
+    each keyword and counts the rest in ``omitted``, which is all the gates
+    need. Memory is then bounded by the window size and the rule set, plus a
+    per-block density profile when the quality gate runs in positional mode.
+
+    Normalized keywords may be spread out by any number of spaces or
+    invisible characters, so the right context is extended until it holds
+    as many kept characters as the longest normalized keyword.
+    """
+    keywords = audit.scanner.keywords
+    folded = audit.scanner.folded
+    patterns = audit.scanner.patterns
+    loader = audit.loader
+    segmenter = loader.snapshot.segmenter if loader is not None else None
+    overlap = max(
+        overlap, keywords.max_length, folded.max_length,
+        segmenter.max_length if segmenter else 0,
+    )
+
+    report = MatchReport()
+    latest: dict[tuple[str, str], KeywordHit] = {}
+
+    def add(hit: KeywordHit) -> None:
+        if len(report.hits) < max_hits:
+            report.hits.append(_shift(hit, win_start))
+            return
+        key = hit.category, hit.keyword
+        if key in latest:
+            report.omitted[key] = report.omitted.get(key, 0) + 1
+        latest[key] = _shift(hit, win_start)
+
+    last_end = [0] * len(patterns)
+    cjk_chars = 0
+    lexicon_hits = 0
+    lexicon_end = 0
+    profile = ProfileBuilder() if audit.positional else None
+    spec_parts: list[str] | None = []
+    spec_checked = False
+    length = 0
+
+    buffer = ""
+    buf_start = 0
+    start = 0
+    eof = False
+
+    with open(path, encoding="utf-8") as f:
+        while True:
+            fill_to = start + chunk_size + overlap
+            while True:
+                while not eof and buf_start + len(buffer) < fill_to:
+                    data = f.read(chunk_size)
+                    if not data:
+                        eof = True
+                        break
+                    length += len(data)
+                    buffer += data
+
+                    if spec_parts is not None:
+                        if not spec_checked and data.strip():
+                            spec_checked = True
+                            if data.lstrip()[0] not in JSON_START:
+                                spec_parts = None
+                        if spec_parts is not None:
+                            spec_parts.append(data)
+                            if length > MAX_SPEC_CHARS:
+                                spec_parts = None
+
+                buf_end = buf_start + len(buffer)
+                end = min(start + chunk_size, buf_end)
+                win_end = _context_end(buffer, end - buf_start, overlap, folded.max_length)
+                if win_end is not None or eof:
+                    break
+                fill_to = buf_end + chunk_size
+
+            win_end = buf_end if win_end is None else min(win_end + buf_start, buf_end)
+            win_start = max(buf_start, start - overlap)
+            window = buffer[win_start - buf_start:win_end - buf_start]
+            pos = start - win_start
+            endpos = end - win_start
+
+            for hit in keywords.iter_hits(window, pos):
+                if hit.start < endpos:
+                    add(hit)
+            for hit in folded.iter_hits(window, pos):
+                if hit.start < endpos:
+                    add(hit)
+
+            relative = [offset - win_start for offset in last_end]
+            for hit in patterns.iter_hits(window, pos, endpos, relative):
+                add(hit)
+            last_end = [offset + win_start for offset in relative]
+
+            cjk_chars += count_cjk(window, pos, endpos)
+            if segmenter is not None:
+                seg_pos = max(pos, lexicon_end - win_start)
+                for word_start, word_end in segmenter.iter_spans(window, seg_pos, endpos):
+                    lexicon_hits += 1
+                    lexicon_end = word_end + win_start
+                    if profile is not None:
+                        profile.add_hit(word_start + win_start)
+            if profile is not None:
+                for match in CJK_RUN.finditer(window, pos, endpos):
+                    profile.add_cjk(match.start() + win_start, match.end() + win_start)
+
+            if eof and end == buf_end:
+                break
+
+            start = end
+            keep_from = max(buf_start, start - overlap)
+            buffer = buffer[keep_from - buf_start:]
+            buf_start = keep_from
+
+    report.hits.extend(sorted(latest.values(), key=lambda hit: hit.start))
+    text = "".join(spec_parts) if spec_parts else None
+    document = Document(
+        text,
+        length=length,
+        cjk_chars=cjk_chars,
+        lexicon_hits=lexicon_hits,
+        profile=profile.finish(length) if profile is not None else None,
+    )
+    return report, document
+
+
+def _context_end(buffer: str, end: int, overlap: int, kept: int) -> int | None:
+    """End in ``buffer`` of the right context for a window owning up to ``end``.
+
+    The context is ``overlap`` characters, extended to hold ``kept``
+    characters that normalization keeps. None means the buffer ends first.
+    """
+    right = end + overlap
+    if kept:
+        for count, match in enumerate(_KEPT.finditer(buffer, end), 1):
+            if count == kept:
+                right = max(right, match.end())
+                break
+        else:
+            return None
+    return right if right <= len(buffer) else None
+
+
+def _shift(hit: KeywordHit, offset: int) -> KeywordHit:
+    """Move a window-relative hit to absolute document offsets."""
+    return KeywordHit(hit.start + offset, hit.end + offset, hit.keyword, hit.category)
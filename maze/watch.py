@@ -0,0 +1,333 @@
+"""Watch mode: re-audit drafts as they change.
+
+Changes are picked up through inotify where the C library offers it, and
+by polling file stats otherwise. Bursts of saves are debounced into one
+batch. Each changed file is re-audited by the gates that apply to it only,
+with one warm loader and compiled rule set for the whole session.
+"""
+
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import time
+from pathlib import Path
+from typing import Iterable
+
+from .batch import FileAudit, timed_audit
+from .cache import AuditCache
+from .gates.fused import FusedAudit, select_gates
+from .library.loader import ResourceLoader
+
+# Files watched when no pattern is given
+WATCH_PATTERNS = ("*.txt", "*.json")
+
+# Gates that apply to a file, by suffix; anything else is a draft
+GATES_BY_SUFFIX = {".json": ("idea",)}
+DRAFT_GATES = ("quality", "safety")
+
+# inotify event masks (linux/inotify.h)
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+WATCH_MASK = IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+
+EVENT_HEADER = struct.Struct("iIII")
+
+
+def _matches(path: Path, patterns: Iterable[str]) -> bool:
+    return any(path.match(pattern) for pattern in patterns)
+
+
+def _walk(root: Path) -> Iterable[tuple[Path, list[str]]]:
+    """Directories under ``root`` with their file names, in sorted order."""
+    for directory, dirs, files in os.walk(root):
+        dirs.sort()
+        yield Path(directory), sorted(files)
+
+
+class InotifyWatcher:
+    """Change notifications for a directory tree through Linux inotify.
+
+    Every directory is watched once at startup; directories created later
+    are added as they appear. Only a kernel queue overflow forces a walk of
+    the tree, since events were lost.
+    """
+
+    def __init__(self, root: Path, patterns: Iterable[str] = WATCH_PATTERNS) -> None:
+        self.root = Path(root)
+        self.patterns = tuple(patterns)
+        libc_name = ctypes.util.find_library("c")
+        if libc_name is None:
+            raise OSError("C library not found")
+        self._libc = ctypes.CDLL(libc_name, use_errno=True)
+        if not hasattr(self._libc, "inotify_init1"):
+            raise OSError("inotify is not available")
+        self._fd = self._libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self._dirs: dict[int, Path] = {}
+        for directory, _ in _walk(self.root):
+            self._add_watch(directory)
+
+    def _add_watch(self, directory: Path) -> None:
+        wd = self._libc.inotify_add_watch(self._fd, os.fsencode(directory), WATCH_MASK)
+        if wd >= 0:
+            self._dirs[wd] = directory
+
+    def _new_directory(self, directory: Path) -> set[Path]:
+        """Watch a new directory tree; return the drafts already in it."""
+        found = set()
+        for subdir, files in _walk(directory):
+            self._add_watch(subdir)
+            found.update(
+                subdir / name for name in files if _matches(subdir / name, self.patterns)
+            )
+        return found
+
+    def wait(self, timeout: float | None = None) -> set[Path]:
+        """Paths created, changed or removed within ``timeout`` seconds."""
+        ready, _, _ = select.select([self._fd], [], [], timeout)
+        if not ready:
+            return set()
+        try:
+            data = os.read(self._fd, 64 * 1024)
+        except BlockingIOError:
+            return set()
+
+        changed = set()
+        offset = 0
+        while offset < len(data):
+            wd, mask, _, length = EVENT_HEADER.unpack_from(data, offset)
+            name = data[offset + EVENT_HEADER.size:offset + EVENT_HEADER.size + length]
+            offset += EVENT_HEADER.size + length
+
+            if mask & IN_Q_OVERFLOW:
+                changed |= self._new_directory(self.root)
+                continue
+            if mask & IN_IGNORED:
+                self._dirs.pop(wd, None)
+                continue
+            directory = self._dirs.get(wd)
+            if directory is None:
+                continue
+            path = directory / os.fsdecode(name.rstrip(b"\0"))
+            if mask & IN_ISDIR:
+                if mask & (IN_CREATE | IN_MOVED_TO):
+                    changed |= self._new_directory(path)
+            elif _matches(path, self.patterns) and not mask & IN_CREATE:
+                changed.add(path)
+        return changed
+
+    def close(self) -> None:
+        if self._fd >= 0:
+            os.close(self._fd)
+            self._fd = -1
+
+
+class PollingWatcher:
+    """Change detection by comparing stats, for systems without inotify.
+
+    The tree is listed once at startup. After that each poll stats the
+    known files, and re-lists only directories whose mtime has changed.
+    """
+
+    def __init__(
+        self, root: Path, patterns: Iterable[str] = WATCH_PATTERNS, interval: float = 0.5
+    ) -> None:
+        self.root = Path(root)
+        self.patterns = tuple(patterns)
+        self.interval = interval
+        self._files: dict[Path, tuple[int, int]] = {}
+        self._dirs: dict[Path, int] = {}
+        self._scan_tree(self.root)
+
+    def _stat(self, path: Path) -> tuple[int, int] | None:
+        try:
+            stat = path.stat()
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def _scan_tree(self, root: Path) -> set[Path]:
+        """Record a directory tree; return the drafts found in it."""
+        found = set()
+        for directory, files in _walk(root):
+            stat = self._stat(directory)
+            if stat is not None:
+                self._dirs[directory] = stat[0]
+            for name in files:
+                path = directory / name
+                if _matches(path, self.patterns):
+                    stat = self._stat(path)
+                    if stat is not None:
+                        self._files[path] = stat
+                        found.add(path)
+        return found
+
+    def _poll(self) -> set[Path]:
+        changed = set()
+        for directory, mtime in list(self._dirs.items()):
+            stat = self._stat(directory)
+            if stat is None:
+                del self._dirs[directory]
+                continue
+            if stat[0] == mtime:
+                continue
+            self._dirs[directory] = stat[0]
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    path = Path(entry.path)
+                    if entry.is_dir() and path not in self._dirs:
+                        changed |= self._scan_tree(path)
+                    elif path not in self._files and _matches(path, self.patterns):
+                        stat = self._stat(path)
+                        if stat is not None:
+                            self._files[path] = stat
+                            changed.add(path)
+
+        for path, known in list(self._files.items()):
+            stat = self._stat(path)
+            if stat is None:
+                del self._files[path]
+                changed.add(path)
+            elif stat != known:
+                self._files[path] = stat
+                changed.add(path)
+        return changed
+
+    def wait(self, timeout: float | None = None) -> set[Path]:
+        """Paths created, changed or removed within ``timeout`` seconds."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            changed = self._poll()
+            if changed:
+                return changed
+            remaining = None if deadline is None else deadline - time.monotonic()
+            if remaining is not None and remaining <= 0:
+                return set()
+            time.sleep(self.interval if remaining is None else min(self.interval, remaining))
+
+    def close(self) -> None:
+        pass
+
+
+def open_watcher(
+    root: Path,
+    patterns: Iterable[str] = WATCH_PATTERNS,
+    poll: bool = False,
+    interval: float = 0.5,
+) -> InotifyWatcher | PollingWatcher:
+    """An inotify watcher where available, else a polling one."""
+    if not poll:
+        try:
+            return InotifyWatcher(root, patterns)
+        except (OSError, AttributeError):
+            pass
+    return PollingWatcher(root, patterns, interval)
+
+
+def gates_for(path: Path, selected: str = "all") -> tuple[str, ...]:
+    """Gates to re-run for a changed file, limited to the ``--gate`` choice."""
+    gates = GATES_BY_SUFFIX.get(path.suffix.lower(), DRAFT_GATES)
+    if selected == "all":
+        return gates
+    return tuple(gate for gate in gates if gate == selected)
+
+
+class AuditWatcher:
+    """Re-audits changed files under a directory with warm gates.
+
+    A fused audit is compiled once per gate combination and reused for the
+    whole session; the library is loaded once.
+    """
+
+    def __init__(
+        self,
+        root: Path,
+        loader: ResourceLoader | None = None,
+        gate: str = "all",
+        patterns: Iterable[str] = WATCH_PATTERNS,
+        positional: bool = False,
+        formula: str | None = None,
+        cache: AuditCache | None = None,
+        debounce: float = 0.2,
+        poll: bool = False,
+        interval: float = 0.5,
+        dedupe_index: str | None = None,
+    ) -> None:
+        self.root = Path(root)
+        self.loader = loader or ResourceLoader()
+        self.gate = gate
+        self.patterns = tuple(patterns)
+        self.positional = positional
+        self.formula = formula
+        self.dedupe_index = dedupe_index
+        self.cache = cache
+        self.debounce = debounce
+        self.watcher = open_watcher(self.root, self.patterns, poll, interval)
+        self._audits: dict[tuple[str, ...], FusedAudit] = {}
+
+    def fused(self, gates: tuple[str, ...]) -> FusedAudit:
+        """The session's fused audit for a gate combination."""
+        audit = self._audits.get(gates)
+        if audit is None:
+            selected = []
+            for name in gates:
+                selected.extend(select_gates(
+                    self.loader, name, self.positional, self.formula, self.dedupe_index
+                ))
+            audit = self._audits[gates] = FusedAudit(selected)
+        return audit
+
+    def audit(self, path: Path) -> FileAudit | None:
+        """Audit one file with the gates that apply to it, if any do."""
+        gates = gates_for(path, self.gate)
+        if not gates:
+            return None
+        return timed_audit(self.fused(gates), path, self.cache)
+
+    def initial(self) -> list[FileAudit]:
+        """Audit every watched file once, at startup."""
+        audits = []
+        for directory, files in _walk(self.root):
+            for name in files:
+                path = directory / name
+                if _matches(path, self.patterns):
+                    audit = self.audit(path)
+                    if audit is not None:
+                        audits.append(audit)
+        return audits
+
+    def changes(self, timeout: float | None = None) -> set[Path]:
+        """Wait for a change, then gather more until ``debounce`` seconds pass quietly."""
+        changed = self.watcher.wait(timeout)
+        if not changed:
+            return changed
+        while True:
+            more = self.watcher.wait(self.debounce)
+            if not more:
+                return changed
+            changed |= more
+
+    def next(self, timeout: float | None = None) -> tuple[list[FileAudit], list[Path]]:
+        """Audits of the next debounced batch of changes, plus removed paths."""
+        audits, removed = [], []
+        for path in sorted(self.changes(timeout)):
+            if not path.is_file():
+                removed.append(path)
+                continue
+            audit = self.audit(path)
+            if audit is not None:
+                audits.append(audit)
+        return audits, removed
+
+    def close(self) -> None:
+        self.watcher.close()
+
@@ -0,0 +1,428 @@
+"""Sharded audits through a work-queue directory.
+
+A coordinator splits a corpus into shards and writes them to a queue
+directory; any number of ``maze audit --worker`` processes, on one machine
+or on many sharing the directory over NFS, claim shards and write their
+records; a final merge turns the shard results into one report.
+
+Queue layout::
+
+    DIR/queue.json              manifest: target, gate options, shard count
+    DIR/shards/00000.json       the files of one shard
+    DIR/leases/00000.lease      held by the worker auditing the shard
+    DIR/results/00000.ndjson    records of a finished shard
+
+Claims rely only on exclusive file creation, rename and link, which local
+file systems and NFS all make atomic. Each claim writes a random token
+into its lease file. A worker refreshes its lease's mtime as it goes; a
+lease left alone for longer than the lease time belongs to a dead worker
+and is taken over. A lease is only ever deleted after it has been renamed
+aside and found to still hold the token its remover expected, so a slow
+worker never removes a lease that has since changed hands, and finds out
+at its next renewal that it lost the shard. File paths are stored
+absolute, so every node must see the corpus at the same path.
+
+The manifest records the digest of the rule pack the queue was created
+with; workers whose pack differs refuse to run.
+"""
+
+import json
+import os
+import secrets
+import socket
+import time
+from dataclasses import dataclass
+from itertools import islice
+from pathlib import Path
+from typing import Any, Iterable, Iterator
+
+# Bump when the queue layout or manifest changes
+QUEUE_FORMAT = 2
+
+# Files per shard when none is given
+DEFAULT_SHARD_SIZE = 200
+
+# Seconds without progress after which a lease counts as abandoned
+DEFAULT_LEASE_SECONDS = 300.0
+
+# Claims of one shard before it is recorded as failed instead of retried
+MAX_ATTEMPTS = 3
+
+# Seconds an idle worker waits before looking for expired leases again
+POLL_INTERVAL = 1.0
+
+
+class QueueError(Exception):
+    """The queue directory is missing, incomplete or already in use."""
+
+
+class LeaseLost(QueueError):
+    """Another worker took over a lease this worker still relied on."""
+
+
+def default_worker_id() -> str:
+    """Worker name recorded in leases: host and process id."""
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+
+def _write_atomic(path: Path, data: str) -> None:
+    tmp = path.with_name(f".{path.name}.{default_worker_id()}.tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+def _read_lease(path: Path) -> dict[str, Any]:
+    """A lease file's content; empty while its claimer has not written it yet."""
+    try:
+        held = json.loads(path.read_text(encoding="utf-8"))
+    except ValueError:
+        return {}
+    return held if isinstance(held, dict) else {}
+
+
+def _remove_lease(path: Path, token: str | None) -> bool:
+    """Delete a lease file if it still holds ``token``; return whether it did.
+
+    The file is renamed aside and checked there, so a lease that another
+    worker created in the meantime is linked back instead of deleted.
+    """
+    stale = path.with_name(f"{path.name}.{secrets.token_hex(8)}.stale")
+    try:
+        os.rename(path, stale)
+    except FileNotFoundError:
+        return False
+    try:
+        if _read_lease(stale).get("token") == token:
+            return True
+        try:
+            os.link(stale, path)
+        except OSError:
+            # A new claim got in first; the lease we moved is lost either way.
+            pass
+        return False
+    finally:
+        stale.unlink(missing_ok=True)
+
+
+@dataclass
+class Lease:
+    """A worker's claim on one shard, identified by the token in its file."""
+    shard: int
+    path: Path
+    worker: str
+    attempt: int
+    token: str
+
+    def held(self) -> bool:
+        """Whether the lease file is still this claim's."""
+        try:
+            return _read_lease(self.path).get("token") == self.token
+        except OSError:
+            return False
+
+    def renew(self) -> None:
+        """Mark the lease as still in use; raises LeaseLost if it was taken over."""
+        if not self.held():
+            raise LeaseLost(f"Lease on shard {self.shard} was taken over")
+        try:
+            os.utime(self.path)
+        except OSError:
+            pass
+
+
+class WorkQueue:
+    """A shard queue in a directory; see the module docstring for the layout."""
+
+    def __init__(self, directory: Path) -> None:
+        self.directory = Path(directory)
+        self._manifest: dict[str, Any] | None = None
+
+    @classmethod
+    def create(
+        cls,
+        directory: Path,
+        paths: Iterable[Path],
+        options: dict[str, Any],
+        shard_size: int = DEFAULT_SHARD_SIZE,
+    ) -> "WorkQueue":
+        """Partition files into shards and write a new queue.
+
+        ``options`` (target, gate and gate options) are stored in the
+        manifest so every worker audits with the same settings. The manifest
+        is written last, so workers never see a half-built queue.
+        """
+        queue = cls(directory)
+        if queue.manifest_path.exists():
+            raise QueueError(f"Queue already exists: {queue.directory}")
+        for name in ("shards", "leases", "results"):
+            (queue.directory / name).mkdir(parents=True, exist_ok=True)
+
+        files = (str(Path(path).resolve()) for path in paths)
+        shards = total = 0
+        while chunk := list(islice(files, shard_size)):
+            _write_atomic(queue.shard_path(shards), json.dumps(chunk, ensure_ascii=False))
+            shards += 1
+            total += len(chunk)
+
+        manifest = {
+            "format": QUEUE_FORMAT,
+            "shards": shards,
+            "files": total,
+            "shard_size": shard_size,
+            "created": time.time(),
+            **options,
+        }
+        _write_atomic(queue.manifest_path, json.dumps(manifest, ensure_ascii=False, indent=2))
+        queue._manifest = manifest
+        return queue
+
+    @property
+    def manifest_path(self) -> Path:
+        return self.directory / "queue.json"
+
+    @property
+    def manifest(self) -> dict[str, Any]:
+        if self._manifest is None:
+            try:
+                manifest = json.loads(self.manifest_path.read_text(encoding="utf-8"))
+            except (OSError, ValueError) as e:
+                raise QueueError(f"Not a work queue: {self.directory} ({e})") from e
+            if manifest.get("format") != QUEUE_FORMAT:
+                raise QueueError(f"Unsupported queue format in {self.directory}")
+            self._manifest = manifest
+        return self._manifest
+
+    def shard_path(self, shard: int) -> Path:
+        return self.directory / "shards" / f"{shard:05d}.json"
+
+    def lease_path(self, shard: int) -> Path:
+        return self.directory / "leases" / f"{shard:05d}.lease"
+
+    def result_path(self, shard: int) -> Path:
+        return self.directory / "results" / f"{shard:05d}.ndjson"
+
+    def shard_files(self, shard: int) -> list[Path]:
+        return [Path(name) for name in json.loads(self.shard_path(shard).read_text("utf-8"))]
+
+    def is_done(self, shard: int) -> bool:
+        return self.result_path(shard).exists()
+
+    def pending(self) -> list[int]:
+        """Shards without results, leased or not."""
+        return [shard for shard in range(self.manifest["shards"]) if not self.is_done(shard)]
+
+    def status(self) -> dict[str, int]:
+        """Counts of done, leased and waiting shards."""
+        pending = self.pending()
+        leased = sum(self.lease_path(shard).exists() for shard in pending)
+        return {
+            "shards": self.manifest["shards"],
+            "done": self.manifest["shards"] - len(pending),
+            "leased": leased,
+            "waiting": len(pending) - leased,
+        }
+
+    def claim(
+        self, worker: str | None = None, lease_seconds: float = DEFAULT_LEASE_SECONDS
+    ) -> Lease | None:
+        """Lease the first unfinished shard that is free or whose lease expired."""
+        worker = worker or default_worker_id()
+        for shard in self.pending():
+            lease = self._try_lease(shard, worker, lease_seconds)
+            if lease is not None:
+                return lease
+        return None
+
+    def _try_lease(self, shard: int, worker: str, lease_seconds: float) -> Lease | None:
+        path = self.lease_path(shard)
+        attempt = 0
+        try:
+            fd = os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY, 0o644)
+        except FileExistsError:
+            attempt = self._take_expired(path, worker, lease_seconds)
+            if attempt is None:
+                return None
+            try:
+                fd = os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY, 0o644)
+            except FileExistsError:
+                return None
+
+        lease = Lease(shard, path, worker, attempt + 1, secrets.token_hex(16))
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump({
+                "worker": worker, "attempt": lease.attempt, "token": lease.token,
+                "claimed": time.time(),
+            }, f)
+        if self.is_done(shard):
+            # Finished by another worker between listing and claiming.
+            self.release(lease)
+            return None
+        return lease
+
+    def _take_expired(self, path: Path, worker: str, lease_seconds: float) -> int | None:
+        """Remove an expired lease; return its attempt count, or None if it is live.
+
+        When several workers find the same expired lease only one of them
+        removes it; the others find a different token (see :func:`_remove_lease`).
+        """
+        try:
+            if time.time() - path.stat().st_mtime < lease_seconds:
+                return None
+            held = _read_lease(path)
+        except FileNotFoundError:
+            return 0
+        except OSError:
+            return None
+        if not _remove_lease(path, held.get("token")):
+            return None
+        return int(held.get("attempt", 1))
+
+    def complete(self, lease: Lease, records: Iterable[dict[str, Any]]) -> None:
+        """Publish a shard's records and give up its lease."""
+        lines = "".join(json.dumps(record, ensure_ascii=False) + "\n" for record in records)
+        _write_atomic(self.result_path(lease.shard), lines)
+        self.release(lease)
+
+    def release(self, lease: Lease) -> None:
+        """Give up a lease, unless another worker has taken it over since."""
+        _remove_lease(lease.path, lease.token)
+
+    def check_rules(self, loader: Any) -> None:
+        """Raise QueueError if ``loader``'s rule pack is not the queue's."""
+        expected = self.manifest.get("rules_digest")
+        if expected is not None and loader.rules.digest != expected:
+            raise QueueError(
+                f"Rule pack {loader.rules.name!r} differs from the one {self.directory} "
+                "was created with"
+            )
+
+    def results(self) -> Iterator[dict[str, Any]]:
+        """Records of every shard in shard order; all shards must be done."""
+        from .report import read_records
+
+        missing = self.pending()
+        if missing:
+            raise QueueError(
+                f"{len(missing)} of {self.manifest['shards']} shards are not finished "
+                f"(first: {missing[0]})"
+            )
+        for shard in range(self.manifest["shards"]):
+            yield from read_records(self.result_path(shard))
+
+
+def shard_records(
+    queue: WorkQueue,
+    lease: Lease,
+    loader: Any,
+    jobs: int | None = None,
+    cache_dir: Path | None = None,
+) -> Iterator[dict[str, Any]]:
+    """Audit one leased shard, renewing the lease after every file.
+
+    Raises LeaseLost, and stops, once another worker has taken the shard over.
+    """
+    from .batch import audit_paths
+    from .report import file_records
+
+    manifest = queue.manifest
+    files = queue.shard_files(lease.shard)
+    if lease.attempt > MAX_ATTEMPTS:
+        error = f"Shard {lease.shard} abandoned after {MAX_ATTEMPTS} failed attempts"
+        for path in files:
+            yield {"type": "error", "path": str(path), "error": error, "seconds": 0.0}
+        return
+
+    start = time.perf_counter()
+    for audit in audit_paths(
+        files, loader, manifest["gate"], jobs=jobs, cache_dir=cache_dir,
+        positional=manifest.get("positional", False), formula=manifest.get("formula"),
+        dedupe_index=manifest.get("dedupe_index"),
+    ):
+        yield from file_records(audit)
+        lease.renew()
+    yield {
+        "type": "shard",
+        "shard": lease.shard,
+        "worker": lease.worker,
+        "attempt": lease.attempt,
+        "seconds": round(time.perf_counter() - start, 6),
+    }
+
+
+def run_worker(
+    queue: WorkQueue,
+    loader: Any,
+    worker: str | None = None,
+    lease_seconds: float = DEFAULT_LEASE_SECONDS,
+    jobs: int | None = None,
+    cache_dir: Path | None = None,
+    poll_interval: float = POLL_INTERVAL,
+) -> list[int]:
+    """Claim and audit shards until every shard is done; return those done here.
+
+    While the remaining shards are leased by other workers, this one waits
+    and takes over any whose lease expires. A shard taken over from this
+    worker is left to its new holder. Raises QueueError if the loader's
+    rule pack is not the one the queue was created with.
+    """
+    worker = worker or default_worker_id()
+    done = []
+    while True:
+        queue.check_rules(loader)
+        lease = queue.claim(worker, lease_seconds)
+        if lease is None:
+            if not queue.pending():
+                return done
+            time.sleep(poll_interval)
+            continue
+        try:
+            records = list(shard_records(queue, lease, loader, jobs, cache_dir))
+        except LeaseLost:
+            continue
+        queue.complete(lease, records)
+        done.append(lease.shard)
+
+
+def merged_records(queue: WorkQueue) -> Iterator[dict[str, Any]]:
+    """The combined record stream of a finished queue, as one audit would write it.
+
+    ``shard`` bookkeeping records are dropped; the summary is rebuilt from
+    the file records and its time is the workers' total.
+    """
+    from .batch import BatchSummary
+    from .report import header_record, summary_record
+
+    manifest = queue.manifest
+    yield header_record(manifest["target"], manifest["gate"], True)
+    summary = BatchSummary()
+    seconds = 0.0
+    path = None
+    passed = True
+    for record in queue.results():
+        if record["type"] == "shard":
+            seconds += record["seconds"]
+            continue
+        if record["path"] != path:
+            if path is not None:
+                _count(summary, passed)
+            path, passed = record["path"], True
+        if record["type"] == "error":
+            passed = None
+        elif not record["passed"] and passed is not None:
+            passed = False
+        yield record
+    if path is not None:
+        _count(summary, passed)
+    yield summary_record(summary, seconds)
+
+
+def _count(summary: Any, passed: bool | None) -> None:
+    """Add one file to a summary: passed, failed, or None for an error."""
+    summary.files += 1
+    if passed is None:
+        summary.errors += 1
+    elif passed:
+        summary.passed += 1
+    else:
+        summary.failed += 1
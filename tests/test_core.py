@@ -25,6 +25,7 @@ def loader(tmp_path) -> ResourceLoader:
         },
         "formula_sweet": {
             "name": "Romance",
+            "theme_triggers": ["甜", "爱", "恋", "甜宠"],
             "stages": []
         }
     }
@@ -142,6 +143,46 @@ class TestQualityGate:
         assert result.passed is False
 
 
+    def test_positional_explanatory_tail(self, loader):
+        """Test that positional mode only flags explanations in the final 10%."""
+        gate = QualityGate(loader, positional=True)
+        body = "降维打击，碾压窒息。" * 20
+
+        result = gate.audit("因为" + body, Path("test.txt"))
+        assert result.passed is True
+
+        result = gate.audit(body + "因为", Path("test.txt"))
+        assert result.issues == ["Explanatory language in final section: '因为'"]
+
+    def test_positional_density_window(self, loader):
+        """Test that a lexicon-free stretch fails even when the total is dense."""
+        stages = [
+            {"name": name, "range": span}
+            for name, span in [("a", "0-15%"), ("b", "15-50%"), ("c", "50-80%"), ("d", "80-100%")]
+        ]
+        baits = {"formula_cool": {"name": "Power Fantasy", "stages": stages}}
+        (loader.library_path / "baits.json").write_text(__import__("json").dumps(baits))
+        gate = QualityGate(loader, positional=True, formula="cool")
+        content = "降维打击，碾压窒息。" * 100 + "他走了很远的路才回到家里。" * 80
+
+        assert QualityGate(loader).audit(content, Path("test.txt")).passed is True
+        result = gate.audit(content, Path("test.txt"))
+        assert result.passed is False
+        assert result.issues[0].startswith("Lexicon density too low at characters")
+
+        stages = result.metrics["stages"]
+        assert [stage["name"] for stage in stages] == ["a", "b", "c", "d"]
+        assert stages[0]["density"] > 3 and stages[-1]["density"] == 0
+
+    def test_parse_stage_range(self):
+        """Test that stage ranges map to document fractions."""
+        from maze.gates.positional import parse_range
+
+        assert parse_range("80-95%") == (0.8, 0.95)
+        with pytest.raises(ValueError):
+            parse_range("95-80%")
+
+
 class TestSafetyGate:
     """Tests for SafetyGate."""
 
@@ -192,3 +233,1655 @@ class TestResourceLoader:
         """Test getting random materials."""
         materials = loader.get_random_materials(1)
         assert len(materials) == 1
+
+
+class TestKeywordMatcher:
+    """Tests for the multi-keyword matcher."""
+
+    def test_overlapping_hits(self):
+        """Test that overlapping and nested keywords are all reported."""
+        from maze.matcher import KeywordMatcher
+
+        matcher = KeywordMatcher({"a": ["he", "she", "hers"], "b": ["his"]})
+        hits = [(h.start, h.end, h.keyword) for h in matcher.iter_hits("ushers his")]
+
+        assert hits == [(1, 4, "she"), (2, 4, "he"), (2, 6, "hers"), (7, 10, "his")]
+
+    def test_counts_per_category(self):
+        """Test hit counts and offsets grouped by category."""
+        from maze.matcher import KeywordMatcher
+
+        matcher = KeywordMatcher({"dark": ["深渊", "窒息"], "light": ["微光"]})
+        report = matcher.scan("深渊里的微光，深渊外的窒息")
+
+        assert report.counts == {"dark": 3, "light": 1}
+        assert report.offsets("dark") == [(0, 2), (7, 9), (11, 13)]
+        assert report.keywords("light") == {"微光"}
+
+    def test_segmenter_prefers_longest_word(self):
+        """Test that segmentation takes the longest lexicon word at each position."""
+        from maze.matcher import Segmenter
+
+        segmenter = Segmenter(["降维", "降维打击", "打击", "碾压"])
+        assert segmenter.segment("降维打击，碾压降维") == ["降维打击", "碾压", "降维"]
+        assert segmenter.count("降维打击") == 1
+
+    def test_safety_scan_reports_offsets(self, loader):
+        """Test that the safety scan exposes hit offsets per category."""
+        gate = SafetyGate(loader)
+        report = gate.scan("他说自杀不是答案，AI也不是")
+
+        assert report.offsets(gate.PSYCHOLOGICAL_CATEGORY) == [(2, 4)]
+        assert report.counts[gate.AI_CATEGORY] == 1
+        assert gate.audit("他说自杀不是答案，AI也不是", Path("t.txt")).issues == [
+            "Psychological safety warnings: 自杀",
+            "AI-related content: AI",
+        ]
+
+    def test_pattern_rules_sharing_an_offset(self):
+        """Test that regex rules starting at the same offset all report hits."""
+        import re
+        from maze.matcher import PatternMatcher
+
+        matcher = PatternMatcher([
+            ("a", r"第[一二三]+章", 0),
+            ("b", r"第一", 0),
+            ("c", r"^\d+%\s*$", re.MULTILINE),
+        ])
+        hits = [(h.category, h.start, h.end) for h in matcher.iter_hits("第一章\n50%\n")]
+
+        assert hits == [("a", 0, 3), ("b", 0, 2), ("c", 4, 8)]
+
+
+class TestFusedAudit:
+    """Tests for the fused single-pass audit."""
+
+    def test_matches_separate_audits(self, loader):
+        """Test that the fused audit reproduces every gate's own result."""
+        from maze.gates import FusedAudit
+
+        gates = [IdeaGate(loader), QualityGate(loader), SafetyGate(loader)]
+        fused = FusedAudit(gates)
+        samples = [
+            "# 标题\n因为AI，所以自杀。第一章\n[1] 注释\n99%",
+            '{"theme": "大模型", "formula": "formula_cool", "formula_stages": []}',
+            "降维打击让对手感到碾压式的窒息",
+            "",
+        ]
+
+        for content in samples:
+            expected = [gate.audit(content, Path("t.txt")) for gate in gates]
+            actual = fused.audit(content, Path("t.txt"))
+            assert [(r.passed, r.issues) for r in actual] == [
+                (r.passed, r.issues) for r in expected
+            ]
+
+
+class TestBatchAudit:
+    """Tests for the parallel batch audit."""
+
+    def test_iter_targets(self, tmp_path):
+        """Test directory walks and glob targets."""
+        from maze.batch import iter_targets
+
+        (tmp_path / "sub").mkdir()
+        (tmp_path / "a.txt").write_text("a", encoding="utf-8")
+        (tmp_path / "sub" / "b.txt").write_text("b", encoding="utf-8")
+        (tmp_path / "c.json").write_text("{}", encoding="utf-8")
+
+        names = [p.name for p in iter_targets(str(tmp_path))]
+        assert names == ["a.txt", "b.txt"]
+        names = [p.name for p in iter_targets(str(tmp_path / "*.json"))]
+        assert names == ["c.json"]
+
+    def test_parallel_matches_serial(self, loader, tmp_path):
+        """Test that pooled audits return the same results in input order."""
+        from maze.batch import BatchSummary, audit_paths
+
+        paths = []
+        for index, content in enumerate(["降维，碾压", "因为AI", "第一章 心跳"]):
+            path = tmp_path / f"d{index}.txt"
+            path.write_text(content, encoding="utf-8")
+            paths.append(path)
+
+        serial = list(audit_paths(paths, loader, "quality", jobs=1))
+        parallel = list(audit_paths(paths, loader, "quality", jobs=2, window=2))
+
+        assert [a.path for a in parallel] == paths
+        assert [[r.issues for r in a.results] for a in parallel] == [
+            [r.issues for r in a.results] for a in serial
+        ]
+
+        summary = BatchSummary()
+        for audit in parallel:
+            summary.add(audit)
+        assert (summary.files, summary.passed, summary.failed) == (3, 1, 2)
+
+    def test_worker_crash_fails_only_its_files(self, loader, tmp_path, monkeypatch):
+        """Test that a crashed worker becomes error results and the batch continues."""
+        from maze import batch
+
+        paths = []
+        for name in ["a", "crash", "b", "c", "d"]:
+            path = tmp_path / f"{name}.txt"
+            path.write_text("第一章 心跳", encoding="utf-8")
+            paths.append(path)
+        monkeypatch.setattr(batch, "_audit_file", _crash_on_marker)
+
+        audits = list(batch.audit_paths(paths, loader, "quality", jobs=2, window=1))
+
+        assert [a.path for a in audits] == paths
+        assert "Worker failed" in audits[1].error
+        assert audits[0].error is None and audits[-1].error is None
+
+
+def _crash_on_marker(path):
+    """Batch worker that dies on files named crash.txt."""
+    import os
+    from maze import batch
+
+    if path.name == "crash.txt":
+        os._exit(1)
+    return batch.FileAudit(path=path, seconds=0.0)
+
+
+class TestStreamingAudit:
+    """Tests for the chunked streaming audit."""
+
+    def test_matches_in_memory_audit(self, loader, tmp_path):
+        """Test that hits spanning chunk boundaries match the in-memory scan."""
+        from maze.gates import FusedAudit, select_gates
+        from maze.stream import audit_stream, scan_stream
+
+        content = "序言\n# 标题\n他说：因为降维，所以碾压。\n第十二章\n50%\n自杀与人工智能" * 3
+        path = tmp_path / "novel.txt"
+        path.write_text(content, encoding="utf-8")
+        fused = FusedAudit(select_gates(loader))
+
+        for chunk_size in (1, 5, 13, 1000):
+            report, document = scan_stream(fused, path, chunk_size=chunk_size, overlap=16)
+            expected = fused.scanner.scan(content)
+            assert sorted(report.hits, key=lambda h: (h.start, h.category)) == sorted(
+                expected.hits, key=lambda h: (h.start, h.category)
+            )
+            assert document.length == len(content)
+
+            results = audit_stream(fused, path, chunk_size=chunk_size, overlap=16)
+            assert [r.issues for r in results] == [
+                r.issues for r in fused.audit(content, path)
+            ]
+
+    def test_spaced_keyword_wider_than_overlap(self, loader, tmp_path):
+        """Test that a keyword spread out by spaces is found across a window edge."""
+        from maze.gates import FusedAudit, select_gates
+        from maze.stream import scan_stream
+
+        content = "序言。" * 5 + "人" + " " * 60 + "工\u200b智 能" + "。结尾" * 5
+        path = tmp_path / "novel.txt"
+        path.write_text(content, encoding="utf-8")
+        fused = FusedAudit(select_gates(loader))
+        expected = sorted(fused.scanner.scan(content).hits, key=lambda h: (h.start, h.category))
+        assert any(hit.keyword == "人工智能" for hit in expected)
+
+        for chunk_size in (1, 7, 16, 1000):
+            report, _ = scan_stream(fused, path, chunk_size=chunk_size, overlap=4)
+            assert sorted(report.hits, key=lambda h: (h.start, h.category)) == expected
+
+    def test_density_facts_match_in_memory(self, loader, tmp_path):
+        """Test that streamed CJK and lexicon counts match the in-memory document."""
+        from maze.gates import FusedAudit, select_gates
+        from maze.gates.document import Document
+        from maze.stream import scan_stream
+
+        content = "降维打击让对手感到碾压式的窒息，" * 7
+        path = tmp_path / "draft.txt"
+        path.write_text(content, encoding="utf-8")
+        fused = FusedAudit(select_gates(loader))
+        segmenter = loader.snapshot.segmenter
+        expected = Document(content)
+
+        for chunk_size in (1, 3, 7, 1000):
+            _, document = scan_stream(fused, path, chunk_size=chunk_size, overlap=4)
+            assert document.cjk_chars == expected.cjk_chars
+            assert document.lexicon_hits(segmenter) == expected.lexicon_hits(segmenter)
+
+    def test_hit_cap_keeps_gate_results(self, loader, tmp_path):
+        """Test that hits past the cap are counted, not kept, without changing results."""
+        from maze.gates import FusedAudit, select_gates
+        from maze.stream import audit_stream, scan_stream
+
+        content = "因为降维，所以碾压。" * 40 + "后来。" * 40 + "其实因为心跳。"
+        path = tmp_path / "novel.txt"
+        path.write_text(content, encoding="utf-8")
+        fused = FusedAudit(select_gates(loader, positional=True))
+
+        report, _ = scan_stream(fused, path, chunk_size=64, overlap=8, max_hits=5)
+        expected = fused.scanner.scan(content)
+        assert report.counts == expected.counts
+        assert len(report.hits) == 5 + len({(h.category, h.keyword) for h in report.hits[5:]})
+
+        results = audit_stream(fused, path, chunk_size=64, overlap=8, max_hits=5)
+        assert [r.issues for r in results] == [r.issues for r in fused.audit(content, path)]
+        assert sum(r.metrics.get("hits_omitted", 0) + len(r.metrics["hits"])
+                   for r in results) == len(expected.hits)
+
+    def test_small_spec_is_parsed(self, loader, tmp_path):
+        """Test that JSON SPECs are still validated when streamed."""
+        from maze.gates import FusedAudit
+        from maze.stream import audit_stream
+
+        path = tmp_path / "SPEC.json"
+        path.write_text('{"theme": "x", "formula": "formula_cool"}', encoding="utf-8")
+        [result] = audit_stream(FusedAudit([IdeaGate(loader)]), path, chunk_size=4)
+
+        assert result.issues == ["Missing required field: formula_stages"]
+
+
+class TestAuditCache:
+    """Tests for the on-disk audit result cache."""
+
+    def test_hit_and_library_invalidation(self, loader, tmp_path):
+        """Test that unchanged content hits and library edits invalidate."""
+        from maze.batch import audit_file
+        from maze.cache import AuditCache, hash_file
+        from maze.gates import FusedAudit
+
+        draft = tmp_path / "draft.txt"
+        draft.write_text("因为心跳", encoding="utf-8")
+        gate = QualityGate(loader)
+        audit = FusedAudit([gate])
+
+        first = audit_file(audit, draft, AuditCache(tmp_path / "cache"))
+        cache = AuditCache(tmp_path / "cache")
+        cached = cache.get(hash_file(draft), gate)
+        assert cached is not None and cached.issues == first[0].issues
+
+        lexicon = loader.library_path / "lexicon.json"
+        lexicon.write_text('{"emotional_sweet": ["心跳", "因为心跳"]}', encoding="utf-8")
+        assert AuditCache(tmp_path / "cache").get(hash_file(draft), gate) is None
+
+    def test_library_edit_in_long_running_process(self, loader, tmp_path, monkeypatch):
+        """Test that one service's cache stops serving results for an edited library."""
+        import os
+        from maze.server import AuditService
+
+        monkeypatch.setattr("maze.rules.RELOAD_INTERVAL", 0.0)
+        draft = tmp_path / "draft.txt"
+        draft.write_text("因为心跳，心跳，悸动", encoding="utf-8")
+        service = AuditService(loader, cache_dir=tmp_path / "cache")
+        request = {"path": str(draft), "gate": "quality"}
+
+        assert service.audit(request)["results"][0]["issues"] == [
+            "Explanatory language found: '因为'"
+        ]
+        lexicon = loader.library_path / "lexicon.json"
+        lexicon.write_text('{"industrial_cool": ["重构"]}', encoding="utf-8")
+        os.utime(lexicon, ns=(1, 1))
+
+        assert service.audit(request)["results"][0]["issues"][0].startswith(
+            "Lexicon density too low"
+        )
+
+    def test_size_based_eviction(self, loader, tmp_path):
+        """Test that the oldest entries are evicted past the size limit."""
+        import os
+        from maze.cache import AuditCache
+        from maze.gates import GateResult
+
+        gate = SafetyGate(loader)
+        cache = AuditCache(tmp_path / "cache", max_bytes=1000)
+        for index in range(20):
+            cache.put(f"{index:064x}", gate, GateResult(passed=True, issues=["x" * 50]))
+            for entry in (tmp_path / "cache").glob("*/*.json"):
+                os.utime(entry, (entry.stat().st_atime, entry.stat().st_mtime - 1))
+
+        total = sum(p.stat().st_size for p in (tmp_path / "cache").glob("*/*.json"))
+        assert total <= 1000
+        assert cache.get(f"{19:064x}", gate) is not None
+        assert cache.get(f"{0:064x}", gate) is None
+
+
+class TestLibrarySnapshot:
+    """Tests for the shared compiled library snapshot."""
+
+    def test_shared_across_loaders(self, loader):
+        """Test that loaders on one library share a single snapshot."""
+        other = ResourceLoader(library_path=loader.library_path)
+
+        assert other.snapshot is loader.snapshot
+        assert loader.lexicon_words == {"降维", "碾压", "心跳", "悸动"}
+
+    def test_binary_cache_and_invalidation(self, loader):
+        """Test reuse of the binary file and invalidation on file changes."""
+        from maze.library.snapshot import clear_snapshots, snapshot_cache_path
+
+        assert loader.snapshot.origin == "json"
+        assert snapshot_cache_path(loader.library_path.resolve()).exists()
+
+        clear_snapshots()
+        reloaded = ResourceLoader(library_path=loader.library_path)
+        assert reloaded.snapshot.origin == "cache"
+        assert reloaded.lexicon == loader.lexicon
+
+        (loader.library_path / "lexicon.json").write_text(
+            '{"industrial_cool": ["重构"]}', encoding="utf-8"
+        )
+        changed = ResourceLoader(library_path=loader.library_path)
+        assert changed.snapshot.origin == "json"
+        assert changed.lexicon_words == {"重构"}
+
+    def test_long_lived_loader_sees_changes(self, loader, monkeypatch):
+        """Test that an existing loader re-checks the library files."""
+        import os
+
+        monkeypatch.setattr("maze.rules.RELOAD_INTERVAL", 0.0)
+        assert "降维" in loader.lexicon_words
+        path = loader.library_path / "lexicon.json"
+        path.write_text('{"industrial_cool": ["重构"]}', encoding="utf-8")
+        os.utime(path, ns=(1, 1))
+
+        assert loader.lexicon_words == {"重构"}
+
+    def test_unsigned_snapshot_is_ignored(self, loader):
+        """Test that a planted pickle without the user's signature is not loaded."""
+        import pickle
+        from maze.library.snapshot import clear_snapshots, library_signature, snapshot_cache_path
+
+        library_path = loader.library_path.resolve()
+        forged = loader.snapshot
+        forged.lexicon_words = frozenset({"伪造"})
+        snapshot_cache_path(library_path).write_bytes(
+            library_signature(library_path).encode("ascii") + b"\n" + pickle.dumps(forged)
+        )
+
+        clear_snapshots()
+        fresh = ResourceLoader(library_path=loader.library_path)
+        assert fresh.snapshot.origin == "json"
+        assert "伪造" not in fresh.lexicon_words
+
+
+class TestBatchGenerate:
+    """Tests for concurrent batch story generation."""
+
+    def test_story_ids_do_not_collide(self, loader, tmp_path):
+        """Test that pipelines started together get distinct IDs."""
+        from maze.pipeline import Pipeline
+
+        ids = {
+            Pipeline("复仇", "", "auto", tmp_path, loader=loader)._generate_story_id()
+            for _ in range(100)
+        }
+        assert len(ids) == 100
+
+    def test_manifest_in_input_order(self, loader, tmp_path):
+        """Test that a theme file yields one ordered manifest record per theme."""
+        import json
+        from maze.batch_generate import generate_batch, read_themes, write_manifest
+
+        themes = tmp_path / "themes.txt"
+        themes.write_text("复仇\n\n# skipped\n甜宠爱情\n电竞逆袭\n", encoding="utf-8")
+        output = tmp_path / "out"
+        results = generate_batch(read_themes(themes), output, loader=loader, workers=3)
+        write_manifest(results, output / "manifest.jsonl")
+
+        records = [
+            json.loads(line)
+            for line in (output / "manifest.jsonl").read_text(encoding="utf-8").splitlines()
+        ]
+        assert [r["theme"] for r in records] == ["复仇", "甜宠爱情", "电竞逆袭"]
+        batch_ids = {r["story_id"].rsplit("_", 1)[0] for r in records}
+        assert len(batch_ids) == 1
+        assert [r["story_id"].rsplit("_", 1)[1] for r in records] == [
+            "000000", "000001", "000002"
+        ]
+        for record in records:
+            if record["spec_path"]:
+                assert Path(record["spec_path"]).exists()
+
+    def test_async_failures_keep_story_ids(self, loader, tmp_path):
+        """Test that async jobs failing unexpectedly still report their checkpoint's ID."""
+        import asyncio
+        from maze.batch_generate import StoryJob, generate_batch_async
+        from maze.checkpoint import load_state
+
+        class BrokenBackend:
+            async def complete(self, prompt):
+                raise RuntimeError("backend bug")
+
+        async def run():
+            jobs = [StoryJob(0, "复仇"), StoryJob(1, "甜宠爱情")]
+            return [item async for item in generate_batch_async(
+                jobs, tmp_path, BrokenBackend(), loader=loader
+            )]
+
+        results = asyncio.run(run())
+        assert [result.error for _, result in results] == ["Unexpected error: backend bug"] * 2
+        for job, result in results:
+            assert result.story_id.endswith(f"_{job.index:06d}")
+            assert load_state(tmp_path, result.story_id).completed == ["spec"]
+
+
+class TestAsyncPipeline:
+    """Tests for the async pipeline and generation backends."""
+
+    def test_concurrent_runs_overlap(self, loader, tmp_path):
+        """Test that pipelines sharing a backend wait on it concurrently."""
+        import asyncio
+        import time
+        from maze.backend import FakeBackend, LimitedBackend
+        from maze.pipeline import Pipeline
+
+        backend = LimitedBackend(FakeBackend(latency=0.1), concurrency=10)
+
+        async def run_all():
+            return await asyncio.gather(*(
+                Pipeline("复仇", "", "auto", tmp_path, loader=loader).run_async(backend)
+                for _ in range(10)
+            ))
+
+        start = time.perf_counter()
+        results = asyncio.run(run_all())
+        assert time.perf_counter() - start < 0.5
+        assert all(result.success for result in results)
+        assert len({result.story_id for result in results}) == 10
+
+    def test_retries_and_timeouts(self):
+        """Test that failures are retried and slow attempts time out."""
+        import asyncio
+        from maze.backend import BackendError, FakeBackend, LimitedBackend
+
+        flaky = FakeBackend(fail_first=2)
+        backend = LimitedBackend(flaky, retries=2, backoff=0.001)
+        assert asyncio.run(backend.complete("提示"))
+        assert flaky.calls == 3
+
+        slow = LimitedBackend(FakeBackend(latency=1.0), retries=1, timeout=0.01, backoff=0.001)
+        with pytest.raises(BackendError, match="timed out"):
+            asyncio.run(slow.complete("提示"))
+
+    def test_http_backend_reuses_connections(self):
+        """Test the pooled HTTP backend against the local stub server."""
+        import asyncio
+        from maze.backend import HTTPBackend, StubServer, stub_completion
+
+        async def exchange():
+            async with StubServer(latency=0.01) as server:
+                backend = HTTPBackend(server.url, pool_size=2)
+                texts = [await backend.complete(f"提示{i}") for i in range(5)]
+                await backend.close()
+                return texts, backend.connections_opened, server.requests
+
+        texts, opened, requests = asyncio.run(exchange())
+        assert texts == [stub_completion(f"提示{i}") for i in range(5)]
+        assert opened == 1 and requests == 5
+
+    def test_truncated_response_and_bad_spec(self):
+        """Test that a cut-off body is a BackendError and bad specs are ValueErrors."""
+        import asyncio
+        from maze.backend import BackendError, HTTPBackend, make_backend
+
+        async def truncated(reader, writer):
+            await reader.readuntil(b"\r\n\r\n")
+            writer.write(b"HTTP/1.1 200 OK\r\nContent-Length: 100\r\n\r\n{\"te")
+            await writer.drain()
+            writer.close()
+
+        async def exchange():
+            server = await asyncio.start_server(truncated, "127.0.0.1", 0)
+            port = server.sockets[0].getsockname()[1]
+            backend = HTTPBackend(f"http://127.0.0.1:{port}/")
+            try:
+                await backend.complete("提示")
+            finally:
+                await backend.close()
+                server.close()
+
+        with pytest.raises(BackendError):
+            asyncio.run(exchange())
+        with pytest.raises(ValueError, match="latency"):
+            make_backend("fake:x")
+
+
+class TestCheckpoints:
+    """Tests for checkpointed, resumable pipeline runs."""
+
+    def test_resume_skips_finished_gates(self, loader, tmp_path):
+        """Test that a resumed run reuses the checkpointed SPEC and draft."""
+        import asyncio
+        from maze.backend import FakeBackend
+        from maze.checkpoint import load_state
+        from maze.pipeline import Pipeline
+
+        first = FakeBackend(responder=lambda prompt: "他说人工智能会赢。")
+        result = asyncio.run(Pipeline("复仇", "", "auto", tmp_path, loader=loader).run_async(first))
+        assert result.success is False and result.error.startswith("Gate 3 failed")
+        state = load_state(tmp_path, result.story_id)
+        assert state.completed == ["spec", "draft"] and state.status == "failed"
+
+        retry = FakeBackend()
+        resumed = Pipeline.resume(result.story_id, tmp_path, loader)
+        assert asyncio.run(resumed.run_async(retry)).error == result.error
+        assert retry.calls == 0
+
+        result.draft_path.unlink()
+        resumed = Pipeline.resume(result.story_id, tmp_path, loader)
+        assert asyncio.run(resumed.run_async(retry)).success is True
+        assert retry.calls == 1
+        assert load_state(tmp_path, result.story_id).status == "done"
+
+    def test_batch_resume_selects_unfinished(self, loader, tmp_path):
+        """Test that batch resume only picks stories that did not finish."""
+        from maze.batch_generate import resume_jobs
+        from maze.checkpoint import load_state
+        from maze.pipeline import Pipeline
+
+        done = Pipeline("甜宠爱情", "", "auto", tmp_path, loader=loader).run()
+        interrupted = Pipeline("复仇", "", "auto", tmp_path, loader=loader).run()
+        state = load_state(tmp_path, interrupted.story_id)
+        state.completed = ["spec"]
+        state.status = "running"
+        state.save(tmp_path)
+
+        jobs = list(resume_jobs(tmp_path))
+        assert [job.story_id for job in jobs] == [interrupted.story_id]
+        assert done.story_id not in {job.story_id for job in jobs}
+
+
+class TestBestOfN:
+    """Tests for best-of-N draft generation."""
+
+    class ScriptedBackend:
+        """Streams a scripted (delay, text) pair per call, line by line."""
+
+        def __init__(self, scripts):
+            self.scripts = list(scripts)
+            self.lines_sent = 0
+            self.closed = 0
+
+        async def stream(self, prompt):
+            import asyncio
+
+            delay, text = self.scripts.pop(0)
+            try:
+                for line in text.splitlines(keepends=True):
+                    await asyncio.sleep(delay)
+                    self.lines_sent += 1
+                    yield line
+            finally:
+                self.closed += 1
+
+    def test_early_rejection_and_threshold_stop(self, loader):
+        """Test that unsafe drafts stop early and a good draft cancels the rest."""
+        import asyncio
+        from maze.best_of import best_of_n
+
+        backend = self.ScriptedBackend([
+            (0.01, "他说人工智能会赢。\n" + "后来的事没人知道。\n" * 50),
+            (0.01, "降维碾压，降维碾压。\n" * 3),
+            (0.5, "降维碾压。\n" * 50),
+        ])
+        result = asyncio.run(best_of_n("{}", backend, loader, n=3, min_score=0.9))
+
+        statuses = [candidate.status for candidate in result.candidates]
+        assert statuses == ["rejected", "scored", "cancelled"]
+        assert result.best is result.candidates[1] and result.best.score == 1.0
+        assert result.candidates[0].issues == ["AI-related content: 人工智能"]
+        assert backend.lines_sent < 10
+
+    def test_best_score_wins_below_threshold(self, loader):
+        """Test that without an early stop the highest-scoring draft is kept."""
+        import asyncio
+        from maze.best_of import best_of_n
+
+        backend = self.ScriptedBackend([
+            (0.01, "因为降维，所以碾压。\n"),
+            (0.02, "降维碾压。\n"),
+            (0.01, "# 标题\n降维碾压。\n"),
+        ])
+        result = asyncio.run(best_of_n("{}", backend, loader, n=3, min_score=2.0))
+
+        assert [candidate.status for candidate in result.candidates] == [
+            "scored", "scored", "rejected"
+        ]
+        assert result.best is result.candidates[1]
+
+    def test_rejected_stream_is_closed(self, loader):
+        """Test that a draft rejected mid-stream closes the backend stream at once."""
+        import asyncio
+        from maze.best_of import Candidate, _generate
+        from maze.gates import FusedAudit, QualityGate, SafetyGate
+
+        backend = self.ScriptedBackend([(0, "他说人工智能会赢。\n" + "后来。\n" * 50)])
+        audit = FusedAudit([SafetyGate(loader), QualityGate(loader)])
+        candidate = asyncio.run(_generate(Candidate(0), "{}", backend, audit))
+
+        assert candidate.status == "rejected"
+        assert backend.closed == 1 and backend.lines_sent == 1
+
+
+    def test_redactable_drafts_reach_the_review(self, loader, tmp_path):
+        """Test that drafts the final review would redact are kept and the redaction logged."""
+        import asyncio
+        import json
+        from maze.pipeline import Pipeline
+
+        backend = self.ScriptedBackend([
+            (0, "他想自杀，只因谈了政治。\n降维碾压。\n"),
+            (0, "他说起了AI。\n"),
+        ])
+        pipeline = Pipeline("甜宠", "", "auto", tmp_path, loader, candidates=2, min_score=0.0)
+        result = asyncio.run(pipeline.run_async(backend))
+
+        assert result.success
+        assert result.final_path.read_text(encoding="utf-8").startswith("他想**，只因谈了**。")
+        assert [change["keyword"] for change in result.redactions] == ["自杀", "政治"]
+        state = json.loads((tmp_path / f"state_{result.story_id}.json").read_text("utf-8"))
+        assert state["redactions"] == result.redactions
+
+class TestMetrics:
+    """Tests for the optional timing and rule-hit instrumentation."""
+
+    def test_disabled_records_nothing(self, loader):
+        """Test that timers are shared no-ops while metrics are off."""
+        from maze import metrics
+        from maze.gates import FusedAudit
+
+        metrics.disable()
+        assert metrics.timer("gate", gate="x") is metrics.timer("scan")
+        FusedAudit([QualityGate(loader)]).audit("因为降维", Path("t.txt"))
+        assert metrics.active() is None
+
+    def test_fused_audit_records_gates_and_rules(self, loader):
+        """Test gate timers, rule-hit counters and opt-in per-rule timers."""
+        from maze import metrics
+        from maze.gates import FusedAudit
+
+        registry = metrics.enable(metrics.Metrics(rule_timing=True))
+        try:
+            FusedAudit([QualityGate(loader), SafetyGate(loader)]).audit(
+                "因为降维，所以降维。", Path("t.txt")
+            )
+        finally:
+            metrics.disable()
+
+        records = registry.records()
+        gates = {r["labels"]["gate"] for r in records if r["name"] == "gate"}
+        assert gates == {QualityGate.name, SafetyGate.name}
+        hits = {
+            r["labels"]["rule"]: r["value"]
+            for r in records if r["name"] == "rule_hits"
+        }
+        assert hits["因为"] == 1 and hits["所以"] == 1
+        assert any(
+            r["name"] == "rule" and r["labels"]["rule"] == "其实" for r in records
+        )
+
+    def test_export_formats(self, tmp_path):
+        """Test Prometheus text and JSON lines output."""
+        import json
+        from maze.metrics import Metrics
+
+        registry = Metrics()
+        registry.add_time("gate", 0.5, 0.25, gate='say "hi"')
+        registry.add("rule_hits", 3, rule="因为")
+
+        registry.write(tmp_path / "m.prom")
+        text = (tmp_path / "m.prom").read_text(encoding="utf-8")
+        assert "# TYPE maze_gate_calls_total counter" in text
+        assert 'maze_gate_wall_seconds_total{gate="say \\"hi\\""} 0.5' in text
+        assert 'maze_rule_hits_total{rule="因为"} 3' in text
+
+        registry.write(tmp_path / "m.jsonl")
+        lines = (tmp_path / "m.jsonl").read_text(encoding="utf-8").splitlines()
+        records = [json.loads(line) for line in lines]
+        assert records[0]["type"] == "timer" and records[0]["cpu_seconds"] == 0.25
+        assert records[1] == {
+            "type": "counter", "name": "rule_hits", "labels": {"rule": "因为"}, "value": 3
+        }
+
+    def test_threads_share_registry(self):
+        """Test that concurrent updates from many threads are all counted."""
+        import pickle
+        from concurrent.futures import ThreadPoolExecutor
+        from maze.metrics import Metrics
+
+        registry = Metrics()
+
+        def work(_):
+            for _ in range(2000):
+                registry.add("hits")
+                registry.add_time("gate", 0.001, 0.0, gate="g")
+
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            list(executor.map(work, range(8)))
+
+        copy = pickle.loads(pickle.dumps(registry))
+        registry.merge(copy)
+        counters = {name: value for (name, _), value in registry.counters.items()}
+        assert counters["hits"] == 32000
+        assert registry.records()[0]["calls"] == 32000
+
+    def test_worker_metrics_merged(self, loader, tmp_path):
+        """Test that pooled audits report their metrics to the parent."""
+        from maze import metrics
+        from maze.batch import audit_paths
+
+        paths = []
+        for index in range(3):
+            path = tmp_path / f"d{index}.txt"
+            path.write_text("降维碾压", encoding="utf-8")
+            paths.append(path)
+
+        registry = metrics.enable()
+        try:
+            audits = list(audit_paths(paths, loader, "quality", jobs=2))
+        finally:
+            metrics.disable()
+
+        assert all(audit.metrics is None for audit in audits)
+        counters = {name: value for (name, _), value in registry.counters.items()}
+        assert counters["files_scanned"] == 3
+        assert counters["bytes_scanned"] == 3 * len("降维碾压".encode("utf-8"))
+
+
+class TestAuditDaemon:
+    """Tests for the audit daemon and its thin client."""
+
+    def test_served_matches_in_process(self, loader, tmp_path):
+        """Test that daemon responses equal the client's in-process fallback."""
+        import asyncio
+        from maze.client import call
+        from maze.server import AuditServer, AuditService
+
+        draft = tmp_path / "draft.txt"
+        draft.write_text("降维碾压。因为AI。", encoding="utf-8")
+        request = {"op": "audit", "path": str(draft), "gate": "all", "id": 7}
+        socket_path = tmp_path / "maze.sock"
+
+        async def run():
+            async with AuditServer(AuditService(loader), socket_path=socket_path) as server:
+                response = await asyncio.to_thread(call, request, socket_path)
+                return response, server.requests
+
+        served, requests = asyncio.run(run())
+        assert requests == 1 and not socket_path.exists()
+        local = call(request, socket_path)
+        assert served == local
+        assert served["id"] == 7 and served["passed"] is False
+        assert served["results"][2]["issues"] == ["AI-related content: AI"]
+
+    def test_concurrent_clients_and_errors(self, loader, tmp_path):
+        """Test concurrent requests over a localhost port, including bad ones."""
+        import asyncio
+        from maze.client import call
+        from maze.server import AuditServer, AuditService
+
+        requests = [
+            {"op": "audit", "content": "降维碾压", "gate": "quality"},
+            {"op": "audit", "content": "因为", "gate": "quality"},
+            {"op": "audit", "path": str(tmp_path / "missing.txt")},
+            {"op": "generate", "theme": "复仇", "output": "out"},
+            {"op": "explode"},
+            {"op": "generate", "theme": "复仇", "output": str(tmp_path.parent)},
+            {"op": "audit", "content": 42, "gate": "quality"},
+        ]
+
+        async def run():
+            service = AuditService(loader, output_root=tmp_path)
+            async with AuditServer(service, port=0) as server:
+                return await asyncio.gather(*(
+                    asyncio.to_thread(call, request, None, server.port) for request in requests
+                ))
+
+        responses = asyncio.run(run())
+        assert [r["ok"] for r in responses] == [True, True, False, True, False, False, False]
+        assert responses[0]["passed"] and not responses[1]["passed"]
+        assert responses[2]["error"].startswith("File not found")
+        assert Path(responses[3]["final_path"]).parent == tmp_path / "out"
+        assert responses[4]["error"] == "Unknown op: 'explode'"
+        assert responses[5]["error"].startswith("Output must be under")
+        assert responses[6]["error"].startswith("Internal error")
+
+    def test_tcp_refuses_generate_without_root(self, loader, tmp_path):
+        """Test that generate is refused when disabled, and the socket is private."""
+        import asyncio
+        import stat
+        from maze.client import call
+        from maze.server import AuditServer, AuditService
+
+        request = {"op": "generate", "theme": "复仇", "output": str(tmp_path)}
+        socket_path = tmp_path / "maze.sock"
+
+        async def run():
+            service = AuditService(loader, allow_generate=False)
+            async with AuditServer(service, socket_path=socket_path):
+                mode = stat.S_IMODE(socket_path.stat().st_mode)
+                return await asyncio.to_thread(call, request, socket_path), mode
+
+        response, mode = asyncio.run(run())
+        assert response == {"ok": False, "error": "Generate is disabled on this daemon"}
+        assert mode == 0o600
+
+
+    def test_unknown_formula_is_not_cached(self, loader):
+        """Test that only library formulas key the shared fused audits."""
+        from maze.server import AuditService
+
+        service = AuditService(loader)
+        audit = {"op": "audit", "content": "降维碾压", "gate": "quality", "positional": True}
+
+        responses = [
+            service.handle({**audit, "formula": formula})
+            for formula in ("cool", "formula_cool", "nope", ["x"])
+        ]
+        assert [r["ok"] for r in responses] == [True, True, False, False]
+        assert responses[2]["error"] == "Unknown formula: 'nope'"
+        assert {key[2] for key in service._audits} == {"cool", "formula_cool"}
+
+class TestStartup:
+    """Tests that CLI startup only imports what each command needs."""
+
+    # Generous ceiling on the cumulative import time of maze.core, in microseconds
+    CORE_IMPORT_BUDGET_US = 150_000
+
+    @staticmethod
+    def import_times(*args: str, cwd: Path | None = None) -> dict[str, int]:
+        """Cumulative import time per module from ``python -X importtime``."""
+        import subprocess
+        import sys
+
+        root = Path(__file__).resolve().parent.parent
+        proc = subprocess.run(
+            [sys.executable, "-X", "importtime", *args],
+            cwd=cwd or root,
+            env={"PYTHONPATH": str(root), "PATH": ""},
+            capture_output=True,
+            text=True,
+        )
+        times = {}
+        for line in proc.stderr.splitlines():
+            if not line.startswith("import time:") or "|" not in line:
+                continue
+            _, cumulative, name = line[len("import time:"):].split("|")
+            if cumulative.strip().isdigit():
+                times[name.strip()] = int(cumulative)
+        return times
+
+    def test_core_import_is_light(self):
+        """Test that importing the CLI loads no gates, pipeline or library."""
+        times = self.import_times("-c", "import maze.core")
+
+        assert "maze.core" in times
+        heavy = {"maze.pipeline", "maze.gates.idea", "maze.gates.quality",
+                 "maze.gates.safety", "maze.library.snapshot", "asyncio",
+                 "concurrent.futures"}
+        assert heavy.isdisjoint(times)
+        assert times["maze.core"] < self.CORE_IMPORT_BUDGET_US
+
+    def test_single_gate_audit_imports(self, tmp_path):
+        """Test that a quality-only audit skips the other gates and the pool."""
+        draft = tmp_path / "draft.txt"
+        draft.write_text("降维碾压", encoding="utf-8")
+        times = self.import_times(
+            "-m", "maze.core", "audit", "-f", str(draft), "--gate", "quality",
+            "-o", str(tmp_path / "reports"), "--no-cache",
+        )
+
+        assert "maze.gates.quality" in times
+        assert {"maze.gates.idea", "maze.gates.safety", "maze.pipeline",
+                "concurrent.futures.process"}.isdisjoint(times)
+
+    def test_client_import_is_stdlib_only(self):
+        """Test that the thin daemon client imports nothing else from maze."""
+        times = self.import_times("-c", "import maze.client")
+        assert {name for name in times if name.startswith("maze")} == {"maze", "maze.client"}
+
+
+class TestAuditRecords:
+    """Tests for JSON/NDJSON audit records and Markdown rendered from them."""
+
+    def test_records_carry_hits_and_timings(self, loader, tmp_path):
+        """Test result records with hit offsets, timings and read errors."""
+        from maze.batch import timed_audit
+        from maze.gates import FusedAudit
+        from maze.report import file_records
+
+        draft = tmp_path / "draft.txt"
+        draft.write_text("降维。因为AI", encoding="utf-8")
+        audit = FusedAudit([QualityGate(loader), SafetyGate(loader)])
+
+        quality, safety = file_records(timed_audit(audit, draft))
+        assert quality["type"] == "result" and quality["path"] == str(draft)
+        assert quality["hits"] == [
+            {"start": 3, "end": 5, "category": "explanatory", "keyword": "因为"}
+        ]
+        assert safety["hits"][0]["keyword"] == "AI" and safety["hits"][0]["start"] == 5
+        assert "hits" not in quality["metrics"] and quality["seconds"] > 0
+
+        (error,) = file_records(timed_audit(audit, tmp_path / "missing.txt"))
+        assert error["type"] == "error" and "missing.txt" in error["error"]
+
+    def test_cli_formats_and_markdown_post_processing(self, loader, tmp_path):
+        """Test that NDJSON and JSON hold the same records and render the same report."""
+        import json
+        from maze.core import create_parser, run_audit, run_report
+
+        drafts = tmp_path / "drafts"
+        drafts.mkdir()
+        (drafts / "a.txt").write_text("降维碾压", encoding="utf-8")
+        (drafts / "b.txt").write_text("因为所以", encoding="utf-8")
+        out = tmp_path / "out"
+
+        def audit(*extra):
+            args = create_parser().parse_args(
+                ["audit", "-f", str(drafts), "-o", str(out), "-g", "quality",
+                 "-j", "1", "--no-cache", *extra]
+            )
+            assert run_audit(args) == 0
+
+        audit("--format", "ndjson")
+        audit("--format", "json")
+        audit()
+
+        lines = (out / "audit.ndjson").read_text(encoding="utf-8").splitlines()
+        records = [json.loads(line) for line in lines]
+        array = json.loads((out / "audit.json").read_text(encoding="utf-8"))
+        assert [r["type"] for r in records] == ["audit", "result", "result", "summary"]
+        strip = lambda rs: [{k: v for k, v in r.items() if k not in ("date", "seconds")}
+                            for r in rs]
+        assert strip(records) == strip(array)
+        assert records[-1]["files"] == 2 and records[-1]["failed"] == 1
+
+        args = create_parser().parse_args(
+            ["report", str(out / "audit.ndjson"), "-o", str(tmp_path / "R.md")]
+        )
+        assert run_report(args) == 0
+        rendered = (tmp_path / "R.md").read_text(encoding="utf-8").splitlines()
+        direct = (out / "Audit_Report.md").read_text(encoding="utf-8").splitlines()
+        undated = lambda lines: [line for line in lines if not line.startswith("**Date**")]
+        assert undated(rendered) == undated(direct)
+        assert "- Failed: 1" in rendered
+
+
+    def test_cli_stdout_stream_with_metrics(self, tmp_path, capsys):
+        """Test that NDJSON on stdout holds only records when metrics are written."""
+        import json
+        import sys
+        from unittest.mock import patch
+        from maze.core import main
+
+        (tmp_path / "a.txt").write_text("因为所以", encoding="utf-8")
+        metrics_path = tmp_path / "m.jsonl"
+        argv = ["maze", "audit", "-f", str(tmp_path / "a.txt"), "-g", "quality",
+                "--format", "ndjson", "-o", "-", "--no-cache", "--metrics", str(metrics_path)]
+        with patch.object(sys, "argv", argv):
+            main()
+
+        captured = capsys.readouterr()
+        records = [json.loads(line) for line in captured.out.splitlines()]
+        assert [r["type"] for r in records] == ["audit", "result", "summary"]
+        assert metrics_path.exists() and "[OK] Metrics" in captured.err
+
+class TestWatchMode:
+    """Tests for audit --watch change detection and gate selection."""
+
+    def test_gates_for(self):
+        """Test that SPEC files get Gate 1 and drafts get Gates 2 and 3."""
+        from maze.watch import gates_for
+
+        assert gates_for(Path("SPEC_1.json")) == ("idea",)
+        assert gates_for(Path("draft.txt")) == ("quality", "safety")
+        assert gates_for(Path("draft.txt"), "safety") == ("safety",)
+        assert gates_for(Path("SPEC_1.json"), "quality") == ()
+
+    @pytest.mark.parametrize("poll", [False, True])
+    def test_reaudits_only_changed_files(self, loader, tmp_path, poll):
+        """Test that one debounced batch re-audits just the changed files."""
+        from maze.watch import AuditWatcher
+
+        drafts = tmp_path / "drafts"
+        drafts.mkdir()
+        (drafts / "a.txt").write_text("降维碾压", encoding="utf-8")
+        (drafts / "b.txt").write_text("降维碾压", encoding="utf-8")
+        (drafts / "gone.txt").write_text("降维", encoding="utf-8")
+        watcher = AuditWatcher(
+            drafts, loader, debounce=0.2, poll=poll, interval=0.05
+        )
+        try:
+            assert len(watcher.initial()) == 3
+            assert watcher.next(timeout=0.1) == ([], [])
+
+            (drafts / "a.txt").write_text("因为", encoding="utf-8")
+            (drafts / "a.txt").write_text("因为AI", encoding="utf-8")
+            (drafts / "gone.txt").unlink()
+            (drafts / "sub").mkdir()
+            (drafts / "sub" / "SPEC_1.json").write_text("{}", encoding="utf-8")
+            audits, removed = watcher.next(timeout=5)
+        finally:
+            watcher.close()
+
+        assert removed == [drafts / "gone.txt"]
+        by_name = {audit.path.name: audit for audit in audits}
+        assert set(by_name) == {"a.txt", "SPEC_1.json"}
+        assert by_name["a.txt"].gate_names == [QualityGate.name, SafetyGate.name]
+        assert by_name["a.txt"].results[1].issues == ["AI-related content: AI"]
+        assert by_name["SPEC_1.json"].gate_names == [IdeaGate.name]
+
+
+class TestDedupe:
+    """Tests for the near-duplicate index and its Gate 1 check."""
+
+    STORY = "深夜加班回家的路上，她发现电梯里多了一个按钮，按下以后整栋楼的人都消失了，只剩下楼道里的脚步声。"
+
+    def test_query_finds_near_duplicates(self, tmp_path):
+        """Test that a lightly edited draft matches and an unrelated one does not."""
+        from maze.dedupe import DedupeIndex
+
+        with DedupeIndex(tmp_path / "dedupe.db") as index:
+            index.add("original", self.STORY)
+            index.add("other", "少年在沙漠里捡到一把会说话的剑，剑告诉他王国即将覆灭。")
+
+            matches = index.query(self.STORY.replace("深夜", "凌晨"))
+            assert [match.key for match in matches] == ["original"]
+            assert matches[0].similarity >= 0.7
+            assert index.query(self.STORY, exclude="original") == []
+            assert index.query(self.STORY, kind="spec") == []
+
+    def test_index_persists(self, tmp_path):
+        """Test that documents and the revision survive reopening the index."""
+        from maze.dedupe import DedupeIndex
+
+        with DedupeIndex(tmp_path / "dedupe.db") as index:
+            assert index.revision == 0
+            index.add("original", self.STORY)
+            index.add("original", self.STORY)
+        with DedupeIndex(tmp_path / "dedupe.db") as index:
+            assert len(index) == 1
+            assert index.revision == 2
+            assert index.query(self.STORY)[0].key == "original"
+
+    def test_idea_gate_flags_duplicate_premise(self, loader, tmp_path):
+        """Test that Gate 1 reports SPECs whose premise is already indexed."""
+        import json
+        from maze.dedupe import DedupeIndex, premise_text
+
+        spec = {
+            "theme": self.STORY, "constraints": "", "formula": "cool",
+            "formula_stages": [], "injected_materials": [],
+        }
+        first = tmp_path / "SPEC_1.json"
+        with DedupeIndex(tmp_path / "dedupe.db") as index:
+            index.add(str(first.resolve()), premise_text(spec), "spec")
+
+        gate = IdeaGate(loader, dedupe_index=tmp_path / "dedupe.db")
+        content = json.dumps(spec, ensure_ascii=False)
+        assert gate.audit(content, first).passed
+        result = gate.audit(content, tmp_path / "SPEC_2.json")
+        assert not result.passed
+        assert result.issues == [f"Near-duplicate spec of {first.resolve()} (similarity 1.00)"]
+
+    def test_cached_audit_follows_path_and_index(self, loader, tmp_path):
+        """Test that cached Gate 1 results are not reused across copies or index changes."""
+        import json
+        from maze.batch import audit_file
+        from maze.cache import AuditCache
+        from maze.dedupe import DedupeIndex, premise_text
+        from maze.gates import FusedAudit
+
+        spec = {
+            "theme": self.STORY, "constraints": "", "formula": "cool",
+            "formula_stages": [], "injected_materials": [],
+        }
+        content = json.dumps(spec, ensure_ascii=False)
+        first, copy = tmp_path / "SPEC_1.json", tmp_path / "SPEC_2.json"
+        first.write_text(content, encoding="utf-8")
+        copy.write_text(content, encoding="utf-8")
+        other = tmp_path / "SPEC_3.json"
+
+        with DedupeIndex(tmp_path / "dedupe.db") as index:
+            index.add(str(first.resolve()), premise_text(spec), "spec")
+            audit = FusedAudit([IdeaGate(loader, dedupe_index=tmp_path / "dedupe.db")])
+            cache = AuditCache(tmp_path / "cache")
+
+            assert audit_file(audit, first, cache)[0].passed
+            assert not audit_file(audit, copy, cache)[0].passed
+
+            # The same long-lived gate sees documents indexed after it started.
+            index.add(str(other.resolve()), premise_text(spec), "spec")
+            (result,) = audit_file(audit, first, cache)
+            assert result.issues == [
+                f"Near-duplicate spec of {other.resolve()} (similarity 1.00)"
+            ]
+
+
+class TestSafetyRedaction:
+    """Tests for Gate 3 redaction in review()."""
+
+    def test_review_redacts_by_policy(self, loader):
+        """Test that maskable and replaceable spans are rewritten and logged."""
+        gate = SafetyGate(loader)
+        gate.REDACTION_POLICY = {**gate.REDACTION_POLICY, "platform_restricted": "时局"}
+        content = "他想自杀，只因谈了政治。"
+
+        result = gate.review(content)
+
+        assert result.passed
+        assert result.content == "他想**，只因谈了时局。"
+        assert result.metrics["changes"] == [
+            {"start": 2, "end": 4, "category": "psychological", "keyword": "自杀",
+             "replacement": "**"},
+            {"start": 9, "end": 11, "category": "platform_restricted", "keyword": "政治",
+             "replacement": "时局"},
+        ]
+        assert not gate.review(content, redact=False).passed
+
+    def test_review_blocks_unredactable_categories(self, loader):
+        """Test that blocked categories still fail while others are rewritten."""
+        gate = SafetyGate(loader)
+
+        result = gate.review("他被下药后，说起了政治和AI。")
+
+        assert not result.passed
+        assert result.issues == [
+            "Prohibited content (non_consent): 下药", "AI-related content: AI",
+        ]
+        assert result.content == "他被下药后，说起了**和AI。"
+
+    def test_overlapping_matches_use_longest(self, loader):
+        """Test that overlapping hits are rewritten once, leftmost-longest."""
+        from maze.matcher import get_scanner
+
+        gate = SafetyGate(loader)
+        gate.REDACTION_POLICY = {**gate.REDACTION_POLICY, "extra": gate.MASK}
+        rules = {**gate.keyword_rules(), "extra": ["杀人", "自杀人"]}
+        report = get_scanner(rules, []).scan("他自杀人了")
+
+        revised, changes = gate.redact("他自杀人了", report)
+
+        assert revised == "他***了"
+        assert [change["keyword"] for change in changes] == ["自杀人"]
+
+    def test_overlapping_matches_are_merged(self, loader):
+        """Test that a match overlapping the previous span's end extends that span."""
+        from maze.matcher import get_scanner
+
+        gate = SafetyGate(loader)
+        gate.REDACTION_POLICY = {**gate.REDACTION_POLICY, "extra": gate.MASK}
+        rules = {**gate.keyword_rules(), "extra": ["杀生吃"]}
+        report = get_scanner(rules, []).scan("他虐杀生吃了")
+
+        revised, changes = gate.redact("他虐杀生吃了", report)
+
+        assert revised == "他****了"
+        assert changes == [{
+            "start": 1, "end": 5, "category": "extreme_violence", "keyword": "虐杀生吃",
+            "replacement": "****",
+        }]
+
+
+class TestNormalizedMatching:
+    """Tests for normalized keyword matching in Gates 1 and 3."""
+
+    def test_normalize_keeps_offset_map(self):
+        """Test that folded and dropped characters map back to the original."""
+        from maze.normalize import normalize
+
+        normalized = normalize("说ＡＩ與人 ​工智能")
+
+        assert normalized.text == "说ai与人工智能"
+        assert normalized.span(1, 3) == (1, 3)
+        assert normalized.span(4, 8) == (4, 10)
+
+    def test_safety_catches_evasions(self, loader):
+        """Test that spaced, full-width, cased and variant keywords are found."""
+        gate = SafetyGate(loader)
+        content = "人 工 智 能，ＡＩ，chatgpt，人工智慧，自殺"
+
+        report = gate.scan(content)
+
+        assert [(hit.keyword, content[hit.start:hit.end]) for hit in report.hits] == [
+            ("人工智能", "人 工 智 能"), ("AI", "ＡＩ"), ("ChatGPT", "chatgpt"),
+            ("人工智慧", "人工智慧"), ("自杀", "自殺"),
+        ]
+        assert gate.review(content).content.endswith("，**")
+
+    def test_ascii_keywords_need_word_boundaries(self, loader):
+        """Test that case folding does not match ASCII keywords inside words."""
+        gate = IdeaGate(loader)
+
+        assert gate.scan("He said the trail was plain.").hits == []
+        assert gate.scan("故事里的ai说话了").keywords(gate.PROHIBITED_CATEGORY) == {"AI"}
+
+    def test_verbatim_keywords_inside_words(self, loader):
+        """Test that exact keywords still match when glued to other letters."""
+        safety = SafetyGate(loader)
+        idea = IdeaGate(loader)
+
+        for text, keyword in [("ChatGPT4", "ChatGPT"), ("OpenAI", "AI"), ("AIGC", "AI")]:
+            assert keyword in {hit.keyword for hit in safety.scan(f"他用{text}写的").hits}
+            issues = idea.generate("甜宠", f"不要{text}", seed=1).issues
+            assert f"Prohibited keyword in constraints: {keyword}" in issues
+        assert idea.scan("OpenAI，AIGC").keywords(idea.PROHIBITED_CATEGORY) == {"AI"}
+        assert "Claude" in {hit.keyword for hit in safety.scan("Claude3写的").hits}
+
+
+class TestRulePacks:
+    """Tests for rule packs overriding gate tables."""
+
+    def write_pack(self, loader, name, pack):
+        import json
+
+        rules_dir = loader.library_path / "rules"
+        rules_dir.mkdir(exist_ok=True)
+        path = rules_dir / f"{name}.json"
+        path.write_text(json.dumps(pack, ensure_ascii=False), encoding="utf-8")
+        return path
+
+    def test_pack_overrides_tables(self, loader):
+        """Test that pack tables replace class defaults for that loader only."""
+        self.write_pack(loader, "night", {"safety": {"psychological_warnings": ["失眠"]}})
+        gate = SafetyGate(ResourceLoader(loader.library_path, rule_pack="night"))
+
+        assert gate.audit("他失眠又想自杀", Path("d.txt")).issues == [
+            "Psychological safety warnings: 失眠"
+        ]
+        assert SafetyGate.PSYCHOLOGICAL_WARNINGS[0] == "自杀"
+        assert SafetyGate(loader).PSYCHOLOGICAL_WARNINGS == SafetyGate.PSYCHOLOGICAL_WARNINGS
+
+    def test_compiled_pack_is_cached_on_disk(self, loader):
+        """Test that a fresh process state loads the compiled scanner from disk."""
+        from maze.gates import FusedAudit, select_gates
+        from maze.rules import clear_packs
+
+        self.write_pack(loader, "default", {"quality": {"explanatory_patterns": ["总之"]}})
+        audit = FusedAudit(select_gates(loader))
+        assert audit.scanner is loader.rules.scanner
+        assert loader.rules.origin == "json"
+        assert list(loader.library_path.glob(".cache/rules-*.pickle"))
+
+        clear_packs()
+        fresh = ResourceLoader(loader.library_path)
+        results = FusedAudit(select_gates(fresh)).audit("总之，因为", Path("d.txt"))
+        assert fresh.rules.origin == "cache"
+        assert "Explanatory language found: '总之'" in results[1].issues
+        assert not any("因为" in issue for issue in results[1].issues)
+
+    def test_pack_hot_reload(self, loader, monkeypatch):
+        """Test that an edited pack applies to an existing fused audit."""
+        import os
+        from maze.gates import FusedAudit, select_gates
+
+        monkeypatch.setattr("maze.rules.RELOAD_INTERVAL", 0.0)
+        path = self.write_pack(loader, "default", {"idea": {"audit_prohibited": ["机器人"]}})
+        audit = FusedAudit(select_gates(loader, "idea"))
+        assert audit.audit("机器人", Path("d.txt"))[0].issues[0] == (
+            "Contains prohibited keyword: 机器人"
+        )
+
+        self.write_pack(loader, "default", {"idea": {"audit_prohibited": ["克隆人"]}})
+        os.utime(path, ns=(1, 1))
+        issues = audit.audit("机器人和克隆人", Path("d.txt"))[0].issues
+        assert issues[0] == "Contains prohibited keyword: 克隆人"
+        assert "Contains prohibited keyword: 机器人" not in issues
+
+    def test_malformed_packs_are_rejected(self, loader, tmp_path, capsys):
+        """Test that packs with unknown keys or misshapen tables fail with a clear error."""
+        from maze.core import create_parser, run_audit
+        from maze.rules import clear_packs, load_rule_pack
+
+        bad = {
+            "strings": {"safety": {"psychological_warnings": "自杀"}},
+            "unknown": {"safety": {"psychological": ["自杀"]}},
+            "pairs": {"quality": {"forbidden_patterns": [["^#"]]}},
+            "section": {"gates": {}},
+        }
+        errors = {}
+        for name, pack in bad.items():
+            path = self.write_pack(loader, name, pack)
+            with pytest.raises(ValueError) as excinfo:
+                load_rule_pack(path, loader.library_path)
+            errors[name] = str(excinfo.value).split(": ", 1)[1]
+        assert errors == {
+            "strings": "table 'safety.psychological_warnings' must be a list of string",
+            "unknown": "unknown table 'safety.psychological'",
+            "pairs": "table 'quality.forbidden_patterns' must be a list of [string, string]",
+            "section": "unknown section 'gates'",
+        }
+
+        clear_packs()
+        draft = tmp_path / "draft.txt"
+        draft.write_text("降维", encoding="utf-8")
+        args = create_parser().parse_args([
+            "audit", "-f", str(draft), "--no-cache",
+            "--rule-pack", str(loader.library_path / "rules" / "strings.json"),
+        ])
+        assert run_audit(args) == 1
+        assert capsys.readouterr().err.startswith("[ERROR] Rule pack ")
+
+    def test_unsigned_compiled_pack_is_ignored(self, loader):
+        """Test that a planted compiled pack without the user's signature is rebuilt."""
+        import pickle
+        from maze.gates import FusedAudit, select_gates
+        from maze.rules import clear_packs, pack_cache_path
+
+        self.write_pack(loader, "default", {"quality": {"explanatory_patterns": ["总之"]}})
+        assert FusedAudit(select_gates(loader)).scanner is loader.rules.scanner
+        digest = loader.rules.digest
+        assert pack_cache_path(loader.library_path, digest).exists()
+        pack_cache_path(loader.library_path, digest).write_bytes(
+            pickle.dumps({"digest": digest, "rules": loader.rules.rules, "scanner": None})
+        )
+
+        clear_packs()
+        fresh = ResourceLoader(loader.library_path)
+        assert FusedAudit(select_gates(fresh)).scanner is not None
+        assert fresh.rules.origin == "json"
+
+    def test_default_pack_keeps_gate_defaults(self):
+        """Test that the shipped default pack overrides no table; the gates hold the tables."""
+        import json
+
+        path = Path(__file__).resolve().parent.parent / "library" / "rules" / "default.json"
+        pack = json.loads(path.read_text(encoding="utf-8"))
+        assert set(pack) <= {"name", "description"}
+
+
+class TestShardedAudit:
+    """Tests for sharded audits through a work-queue directory."""
+
+    def make_queue(self, tmp_path, count, shard_size):
+        from maze.batch import iter_targets
+        from maze.workqueue import WorkQueue
+
+        corpus = tmp_path / "corpus"
+        corpus.mkdir()
+        for index in range(count):
+            content = "降维，碾压" if index % 3 == 0 else "第一章 心跳"
+            (corpus / f"d{index:02d}.txt").write_text(content, encoding="utf-8")
+        options = {"target": str(corpus), "gate": "quality", "positional": False}
+        return WorkQueue.create(
+            tmp_path / "queue", iter_targets(str(corpus)), options, shard_size=shard_size
+        )
+
+    def test_workers_and_merge_match_batch(self, loader, tmp_path):
+        """Test that several concurrent workers and a merge reproduce a direct batch."""
+        from concurrent.futures import ThreadPoolExecutor
+        from maze.batch import BatchSummary, audit_paths, iter_targets
+        from maze.workqueue import QueueError, WorkQueue, merged_records, run_worker
+
+        queue = self.make_queue(tmp_path, 11, 3)
+        assert queue.status() == {"shards": 4, "done": 0, "leased": 0, "waiting": 4}
+        with pytest.raises(QueueError):
+            list(merged_records(queue))
+
+        def work(name):
+            return run_worker(WorkQueue(queue.directory), loader, name, jobs=1,
+                              poll_interval=0.01)
+
+        with ThreadPoolExecutor(3) as pool:
+            done = [shard for shards in pool.map(work, "abc") for shard in shards]
+        assert sorted(done) == [0, 1, 2, 3]
+
+        records = list(merged_records(queue))
+        corpus = iter_targets(str(tmp_path / "corpus"))
+        direct = list(audit_paths(corpus, loader, "quality", jobs=1))
+        assert records[0]["type"] == "audit" and records[0]["batch"]
+        assert [(r["path"], r["issues"]) for r in records[1:-1]] == [
+            (str(audit.path.resolve()), audit.results[0].issues) for audit in direct
+        ]
+        expected = BatchSummary()
+        for audit in direct:
+            expected.add(audit)
+        summary = records[-1]
+        assert (summary["files"], summary["passed"], summary["failed"]) == (
+            expected.files, expected.passed, expected.failed
+        )
+
+    def test_expired_lease_is_retried(self, loader, tmp_path):
+        """Test that a live lease is left alone and an expired one is taken over."""
+        import os
+        from maze.workqueue import MAX_ATTEMPTS, shard_records
+
+        queue = self.make_queue(tmp_path, 2, 5)
+        lease = queue.claim("dead", lease_seconds=60)
+        assert lease.attempt == 1
+        assert queue.claim("other", lease_seconds=60) is None
+
+        os.utime(lease.path, (0, 0))
+        retry = queue.claim("other", lease_seconds=60)
+        assert (retry.shard, retry.worker, retry.attempt) == (0, "other", 2)
+        assert list(lease.path.parent.iterdir()) == [lease.path]
+
+        retry.attempt = MAX_ATTEMPTS + 1
+        queue.complete(retry, shard_records(queue, retry, loader))
+        assert queue.status()["done"] == 1 and not retry.path.exists()
+        assert all(r["type"] == "error" for r in queue.results())
+
+    def test_lease_taken_over_from_slow_worker(self, loader, tmp_path):
+        """Test that a slow holder loses its lease without deleting its successor's."""
+        import os
+        from maze.workqueue import LeaseLost, _remove_lease
+
+        queue = self.make_queue(tmp_path, 2, 5)
+        slow = queue.claim("slow", lease_seconds=60)
+        os.utime(slow.path, (0, 0))
+        successor = queue.claim("next", lease_seconds=60)
+        assert successor.shard == slow.shard and successor.held()
+
+        with pytest.raises(LeaseLost):
+            slow.renew()
+        queue.release(slow)
+        assert successor.held()
+
+        # A worker that read the expired lease's token before the successor
+        # replaced it moves the new lease aside, sees the wrong token, and
+        # puts it back.
+        assert not _remove_lease(successor.path, slow.token)
+        assert successor.held()
+        assert list(successor.path.parent.iterdir()) == [successor.path]
+
+        queue.release(successor)
+        assert not successor.path.exists()
+
+    def test_worker_refuses_other_rule_pack(self, loader, tmp_path):
+        """Test that workers stop when their rule pack is not the queue's."""
+        import json
+        from maze.workqueue import QueueError, WorkQueue, run_worker
+
+        queue = self.make_queue(tmp_path, 2, 5)
+        manifest = queue.manifest
+        manifest["rules_digest"] = "0" * 64
+        queue.manifest_path.write_text(json.dumps(manifest), encoding="utf-8")
+
+        with pytest.raises(QueueError, match="differs"):
+            run_worker(WorkQueue(queue.directory), loader, "w", poll_interval=0.01)
+        assert queue.status()["done"] == 0
+
+    def test_workers_use_queue_dedupe_index(self, loader, tmp_path):
+        """Test that the idea gate of queue workers consults the queue's dedupe index."""
+        import json
+        from maze.dedupe import DedupeIndex, premise_text
+        from maze.workqueue import WorkQueue, merged_records, run_worker
+
+        spec = {"theme": "重生复仇的落魄少爷", "formula": "cool", "formula_stages": []}
+        corpus = tmp_path / "specs"
+        corpus.mkdir()
+        for name in ("SPEC_1.json", "SPEC_2.json"):
+            (corpus / name).write_text(json.dumps(spec, ensure_ascii=False), encoding="utf-8")
+        with DedupeIndex(tmp_path / "dedupe.db") as index:
+            index.add(str((corpus / "SPEC_1.json").resolve()), premise_text(spec), "spec")
+
+        options = {"target": str(corpus), "gate": "idea",
+                   "dedupe_index": str(tmp_path / "dedupe.db")}
+        queue = WorkQueue.create(tmp_path / "queue", sorted(corpus.iterdir()), options)
+        run_worker(queue, loader, "w", jobs=1, poll_interval=0.01)
+
+        passed = [r["passed"] for r in merged_records(queue) if r["type"] == "result"]
+        assert passed == [True, False]
+
+    def test_cli_enqueue_worker_merge(self, loader, tmp_path):
+        """Test the --queue, --worker and --merge commands end to end."""
+        import sys
+        import json
+        from maze.core import main
+        from maze.report import read_records
+
+        corpus = tmp_path / "corpus"
+        corpus.mkdir()
+        for index in range(5):
+            (corpus / f"d{index}.txt").write_text("降维" * index, encoding="utf-8")
+        queue_dir = tmp_path / "queue"
+        out = tmp_path / "out"
+        commands = [
+            ["audit", "-f", str(corpus), "--queue", str(queue_dir), "--shard-size", "2",
+             "-g", "quality"],
+            ["audit", "--merge", str(queue_dir), "-o", str(out), "--format", "ndjson"],
+            ["audit", "--worker", str(queue_dir), "-j", "1", "--no-cache"],
+            ["audit", "--merge", str(queue_dir), "-o", str(out), "--format", "ndjson"],
+        ]
+        codes = []
+        for argv in commands:
+            with patch.object(sys, "argv", ["maze", *argv]):
+                codes.append(main())
+        assert codes == [0, 1, 0, 0]
+
+        records = list(read_records(out / "audit.ndjson"))
+        assert len(records) == 7 and records[-1]["files"] == 5
+        manifest = json.loads((queue_dir / "queue.json").read_text(encoding="utf-8"))
+        assert manifest["rules_digest"] == ResourceLoader().rules.digest
+
+
+class TestSeededSpecs:
+    """Tests for seeded, memoized SPEC generation."""
+
+    @pytest.fixture
+    def memes_loader(self, loader):
+        import json
+        from maze.gates.idea import clear_spec_cache
+
+        clear_spec_cache()
+        memes = [{"id": f"lm_{i:03d}", "content": f"物件{i}"} for i in range(12)]
+        (loader.library_path / "materials.json").write_text(
+            json.dumps({"lock_memes": memes}, ensure_ascii=False), encoding="utf-8"
+        )
+        yield ResourceLoader(loader.library_path)
+        clear_spec_cache()
+
+    def test_seed_reproduces_spec(self, memes_loader):
+        """Test that a seed fixes the sampled materials and is recorded in the SPEC."""
+        import json
+        from maze.gates.idea import clear_spec_cache
+
+        gate = IdeaGate(memes_loader)
+        first = gate.generate("雨夜", "", "formula_cool", seed=7)
+        clear_spec_cache()
+        again = IdeaGate(ResourceLoader(memes_loader.library_path)).generate(
+            "雨夜", "", "formula_cool", seed=7
+        )
+        assert again.content == first.content
+        assert json.loads(first.content)["seed"] == 7
+
+        picks = {
+            tuple(m["id"] for m in json.loads(
+                gate.generate("雨夜", "", "formula_cool", seed=seed).content
+            )["injected_materials"])
+            for seed in range(8)
+        }
+        assert len(picks) > 1
+
+    def test_memo_hits_and_copies(self, memes_loader):
+        """Test that repeats are served from the memo without sharing state."""
+        from maze import metrics
+
+        gate = IdeaGate(memes_loader)
+        registry = metrics.enable(metrics.Metrics())
+        try:
+            first = gate.generate("雨夜", "NO AI", "auto", seed=1)
+            first.issues.append("edited")
+            second = gate.generate("雨夜", "NO AI", "auto", seed=1)
+            gate.generate("雨夜", "NO AI", "auto")
+        finally:
+            metrics.disable()
+
+        assert second.content == first.content and "edited" not in second.issues
+        hits = [r for r in registry.records() if r["name"] == "spec_cache_hits"]
+        assert [r["value"] for r in hits] == [1]
+
+    def test_library_change_invalidates_memo(self, memes_loader):
+        """Test that editing the library gives a fresh SPEC for the same seed."""
+        import json
+        import os
+
+        first = IdeaGate(memes_loader).generate("雨夜", "", "formula_cool", seed=3)
+        path = memes_loader.library_path / "materials.json"
+        path.write_text(
+            json.dumps({"lock_memes": [{"id": "lm_new", "content": "新物件"}]}),
+            encoding="utf-8",
+        )
+        os.utime(path, ns=(1, 1))
+
+        second = IdeaGate(ResourceLoader(memes_loader.library_path)).generate(
+            "雨夜", "", "formula_cool", seed=3
+        )
+        assert second.content != first.content
+        assert json.loads(second.content)["injected_materials"][0]["id"] == "lm_new"
+
+
+class TestFormulaSelector:
+    """Tests for trigger-indexed formula selection."""
+
+    def test_rank_scores_every_formula(self):
+        """Test weighted trigger scores, ranking and the default formula."""
+        from maze.library.formulas import FormulaSelector
+
+        selector = FormulaSelector({
+            "formula_cool": {"theme_triggers": {"逆袭": 2}},
+            "formula_sweet": {"theme_triggers": ["甜", "恋"]},
+            "formula_esports": {"theme_triggers": {"电竞": 3, "逆": 1}},
+        })
+
+        ranked = selector.rank("电竞少年的逆袭之恋")
+        assert [(s.formula, s.score) for s in ranked] == [
+            ("formula_esports", 4.0), ("formula_cool", 2.0), ("formula_sweet", 1.0),
+        ]
+        assert ranked[0].triggers == ("电竞", "逆")
+        assert selector.select("ＬＯＶＥ甜 甜") == "formula_sweet"
+        assert selector.select("Action story") == "formula_cool"
+
+    def test_malformed_triggers_are_rejected(self):
+        """Test that trigger weights must be numbers and trigger lists hold words."""
+        from maze.library.formulas import FormulaSelector
+
+        with pytest.raises(ValueError, match="weight of '甜' must be a number, not 'high'"):
+            FormulaSelector({"formula_sweet": {"theme_triggers": {"甜": "high"}}})
+        with pytest.raises(ValueError, match="theme_triggers of formula_sweet must be"):
+            FormulaSelector({"formula_sweet": {"theme_triggers": "甜宠"}})
+        assert FormulaSelector({"formula_cool": {}}).select("甜宠") == "formula_cool"
+
+    def test_batch_matches_single_and_skips_missing_formulas(self, loader):
+        """Test batch ranking and that only formulas in baits.json are chosen."""
+        themes = ["电竞冠军", "甜宠故事", "", "悔恨与救赎", "Action story"]
+        selector = ResourceLoader().formula_selector
+
+        assert selector.rank_many(themes) == [selector.rank(theme) for theme in themes]
+        assert selector.select_many(themes) == [
+            "formula_esports", "formula_sweet", "formula_cool", "formula_regret",
+            "formula_cool",
+        ]
+        # The test library has no esports formula and only sweet has triggers.
+        assert loader.formula_selector.select_many(themes) == [
+            "formula_cool", "formula_sweet", "formula_cool", "formula_cool", "formula_cool",
+        ]
+
+    def test_batch_jobs_get_resolved_formulas(self, loader):
+        """Test that batch generation resolves auto formulas before running."""
+        from maze.batch_generate import StoryJob, classify_jobs
+
+        jobs = [
+            StoryJob(0, "甜宠故事"),
+            StoryJob(1, "甜宠故事", formula="formula_cool"),
+            StoryJob(2, "甜宠故事", story_id="abc"),
+            StoryJob(3, "雨夜"),
+        ]
+        formulas = [job.formula for job in classify_jobs(jobs, loader, chunk=2)]
+        assert formulas == ["formula_sweet", "formula_cool", "auto", "formula_cool"]